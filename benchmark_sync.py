@@ -0,0 +1,273 @@
+"""
+Benchmark de las transformaciones de sincronización con Google Sheets
+Compara la versión vectorizada (columna a columna) con la implementación
+original fila por fila (iterrows) sobre una hoja sintética, verifica que ambas
+generen los mismos registros e informa filas por segundo.
+Ejecutar: python benchmark_sync.py [--filas 20000]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.sheets.google_sheets_sync import (
+    MAPEO_CAMPO,
+    MAPEO_FUERZA,
+    MAPEO_MEDICO,
+    MAPEO_NUTRICION,
+    transformar_datos_campo,
+    transformar_datos_fuerza,
+    transformar_datos_medicos,
+    transformar_datos_nutricion,
+)
+
+URL_PRUEBA = "https://docs.google.com/spreadsheets/d/benchmark"
+
+# ==========================================
+# HOJAS SINTÉTICAS
+# ==========================================
+
+def generar_hojas(filas, semilla=42):
+    """Hojas médica, nutricional, de fuerza y de campo con vacíos y comas decimales"""
+    rng = np.random.default_rng(semilla)
+    jugadores = np.array([f"Jugador {i}" for i in range(500)] + ['', ' '], dtype=object)
+    divisiones = np.array(['M15', 'M17', 'M19', 'Primera', 'Intermedia'], dtype=object)
+
+    def elegir(valores):
+        return rng.choice(np.asarray(valores, dtype=object), filas)
+
+    def numeros(bajo, alto, vacios=0.1):
+        valores = rng.uniform(bajo, alto, filas).round(1).astype(str).astype(object)
+        valores[rng.random(filas) < vacios] = ''
+        return np.char.replace(valores.astype(str), '.', ',').astype(object) if rng.random() < 0.5 else valores
+
+    medica = pd.DataFrame({
+        'Jugador': elegir(jugadores),
+        'Division': elegir(divisiones),
+        'Lesion': elegir(['Esguince', 'Contractura', 'Fractura', '']),
+        'Severidad': elegir(['Leve', 'Moderada', 'Grave']),
+        'Fecha': elegir(['2024-03-01', '2024-04-15', '']),
+        'Estado': elegir(['Activa', 'En tratamiento', 'Alta']),
+        'Observaciones': elegir(['', 'Control semanal', ' kinesiología ']),
+    })
+    nutricion = pd.DataFrame({
+        'Nombre': elegir(jugadores),
+        'Categoria': elegir(divisiones),
+        'Plan': elegir(['Volumen', 'Definición', '']),
+        'Calorias': numeros(2000, 4000),
+        'Proteinas': numeros(100, 250),
+        'Peso': numeros(60, 120),
+        'Altura': numeros(160, 200),
+        'Objetivo': elegir(['Subir masa', 'Bajar grasa']),
+    })
+    fuerza = pd.DataFrame({
+        'Jugador': elegir(jugadores),
+        'Division': elegir(divisiones),
+        'Fecha': elegir(['2024-05-01', '2024-06-10']),
+        'Ejercicio': elegir(['Bench Press', 'Sentadilla', 'Peso Muerto']),
+        'Peso': numeros(40, 200),
+        'Reps': elegir(['1', '3', '5', '8', '0', '40', '', 'x']),
+        'Series': elegir(['1', '3', '4', '']),
+        'Peso Corporal': numeros(60, 120, vacios=0.4),
+        'Grasa Corporal': numeros(8, 25, vacios=0.5),
+    })
+    campo = pd.DataFrame({
+        'Jugador': elegir(jugadores),
+        'Division': elegir(divisiones),
+        'Prueba': elegir(['Sprint 40m', 'Salto vertical', 'Yo-Yo IR1', 'Cooper', 'Agilidad']),
+        'Resultado': numeros(1, 3000),
+        'Unidad': elegir(['', '', 'seg']),
+        'Clima': elegir(['Soleado', 'Lluvia', '']),
+        'Temperatura': numeros(5, 35, vacios=0.3),
+    })
+    return {'medica': medica, 'nutricion': nutricion, 'fuerza': fuerza, 'campo': campo}
+
+# ==========================================
+# IMPLEMENTACIÓN ORIGINAL (FILA POR FILA)
+# ==========================================
+
+def safe_float(value, default=0):
+    try:
+        if pd.isna(value) or value == '':
+            return default
+        return float(str(value).replace(',', '.'))
+    except:
+        return default
+
+
+def _preparar(df, mapeo):
+    df = df.copy()
+    df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
+    return df.rename(columns=mapeo)
+
+
+def medicos_fila_por_fila(df, doctor_name, sheet_url, ahora):
+    registros = []
+    for index, row in _preparar(df, MAPEO_MEDICO).iterrows():
+        if pd.notna(row.get('player_name')) and row.get('player_name').strip():
+            registros.append({
+                "id": f"gs_{ahora.strftime('%Y%m%d_%H%M%S')}_{index}",
+                "player_name": str(row.get('player_name', '')).strip(),
+                "division": str(row.get('division', '')).strip(),
+                "injury_type": str(row.get('injury_type', '')).strip(),
+                "severity": str(row.get('severity', 'Moderada')).strip(),
+                "date_occurred": str(row.get('date_occurred', ahora.date())),
+                "expected_recovery": str(row.get('expected_recovery', '')),
+                "status": str(row.get('status', 'En tratamiento')).strip(),
+                "treatment": str(row.get('treatment', '')).strip(),
+                "doctor": doctor_name,
+                "notes": str(row.get('notes', '')).strip(),
+                "sync_source": "Google Sheets",
+                "sync_date": ahora.isoformat(),
+                "sheet_url": sheet_url
+            })
+    return registros
+
+
+def nutricion_fila_por_fila(df, nutritionist_name, sheet_url, ahora):
+    registros = []
+    for index, row in _preparar(df, MAPEO_NUTRICION).iterrows():
+        if pd.notna(row.get('player_name')) and row.get('player_name').strip():
+            registros.append({
+                "id": f"gs_nut_{ahora.strftime('%Y%m%d_%H%M%S')}_{index}",
+                "player_name": str(row.get('player_name', '')).strip(),
+                "division": str(row.get('division', '')).strip(),
+                "plan_type": str(row.get('plan_type', 'Plan General')).strip(),
+                "calories_target": safe_float(row.get('calories_target', 2500)),
+                "protein_target": safe_float(row.get('protein_target', 150)),
+                "carbs_target": safe_float(row.get('carbs_target', 300)),
+                "fat_target": safe_float(row.get('fat_target', 80)),
+                "current_weight": safe_float(row.get('current_weight', 0)),
+                "height": safe_float(row.get('height', 0)),
+                "goal": str(row.get('goal', 'Mantener peso')).strip(),
+                "nutritionist": nutritionist_name,
+                "notes": str(row.get('notes', '')).strip(),
+                "created_date": ahora.date().isoformat(),
+                "sync_source": "Google Sheets",
+                "sync_date": ahora.isoformat(),
+                "sheet_url": sheet_url
+            })
+    return registros
+
+
+def fuerza_fila_por_fila(df, trainer_name, sheet_url, ahora):
+    registros = []
+    for index, row in _preparar(df, MAPEO_FUERZA).iterrows():
+        if pd.notna(row.get('player_name')) and row.get('player_name').strip():
+            weight = safe_float(row.get('weight', 0))
+            reps = max(1, int(safe_float(row.get('repetitions', 1))))
+            one_rm = weight * (36 / (37 - reps)) if reps < 37 else weight
+            registros.append({
+                "id": f"gs_str_{ahora.strftime('%Y%m%d_%H%M%S')}_{index}",
+                "player_name": str(row.get('player_name', '')).strip(),
+                "division": str(row.get('division', '')).strip(),
+                "test_date": str(row.get('test_date', ahora.date())),
+                "test_type": str(row.get('test_type', 'Bench Press')).strip(),
+                "weight": weight,
+                "repetitions": reps,
+                "series": max(1, int(safe_float(row.get('series', 1)))),
+                "one_rm_estimated": round(one_rm, 1),
+                "body_weight": safe_float(row.get('body_weight', 0)) or None,
+                "height": safe_float(row.get('height', 0)) or None,
+                "body_fat": safe_float(row.get('body_fat', 0)) or None,
+                "muscle_mass": safe_float(row.get('muscle_mass', 0)) or None,
+                "tester": trainer_name,
+                "notes": str(row.get('notes', '')).strip(),
+                "sync_source": "Google Sheets",
+                "sync_date": ahora.isoformat(),
+                "sheet_url": sheet_url,
+                "created_at": ahora.isoformat()
+            })
+    return registros
+
+
+def campo_fila_por_fila(df, trainer_name, sheet_url, ahora):
+    registros = []
+    for index, row in _preparar(df, MAPEO_CAMPO).iterrows():
+        if pd.notna(row.get('player_name')) and row.get('player_name').strip():
+            test_type = str(row.get('test_type', '')).strip()
+            unit = str(row.get('unit', ''))
+            if not unit:
+                if "sprint" in test_type.lower() or "velocidad" in test_type.lower():
+                    unit = "segundos"
+                elif "salto" in test_type.lower():
+                    unit = "cm"
+                elif "yo-yo" in test_type.lower() or "cooper" in test_type.lower():
+                    unit = "metros"
+                else:
+                    unit = "unidades"
+            registros.append({
+                "id": f"gs_field_{ahora.strftime('%Y%m%d_%H%M%S')}_{index}",
+                "player_name": str(row.get('player_name', '')).strip(),
+                "division": str(row.get('division', '')).strip(),
+                "test_date": str(row.get('test_date', ahora.date())),
+                "test_type": test_type,
+                "result": safe_float(row.get('result', 0)),
+                "unit": unit,
+                "weather": str(row.get('weather', 'No especificado')).strip(),
+                "temperature": safe_float(row.get('temperature', 0)) or None,
+                "surface": str(row.get('surface', 'No especificado')).strip(),
+                "humidity": safe_float(row.get('humidity', 0)) or None,
+                "tester": trainer_name,
+                "notes": str(row.get('notes', '')).strip(),
+                "sync_source": "Google Sheets",
+                "sync_date": ahora.isoformat(),
+                "sheet_url": sheet_url,
+                "created_at": ahora.isoformat()
+            })
+    return registros
+
+# ==========================================
+# MEDICIÓN
+# ==========================================
+
+CASOS = [
+    ('medica', 'Médicos', medicos_fila_por_fila, transformar_datos_medicos),
+    ('nutricion', 'Nutrición', nutricion_fila_por_fila, transformar_datos_nutricion),
+    ('fuerza', 'Fuerza', fuerza_fila_por_fila, transformar_datos_fuerza),
+    ('campo', 'Campo', campo_fila_por_fila, transformar_datos_campo),
+]
+
+
+def medir(funcion, *args):
+    inicio = time.perf_counter()
+    resultado = funcion(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de transformaciones de sync")
+    parser.add_argument('--filas', type=int, default=20000)
+    args = parser.parse_args()
+
+    hojas = generar_hojas(args.filas)
+    ahora = datetime.now()
+    todo_ok = True
+
+    print("=" * 70)
+    print(f"BENCHMARK SYNC GOOGLE SHEETS - {args.filas:,} filas por hoja")
+    print("=" * 70)
+    print(f"{'Hoja':<12}{'Fila por fila':>16}{'Vectorizado':>16}{'Aceleración':>14}  Resultado")
+
+    for clave, nombre, original, vectorizada in CASOS:
+        hoja = hojas[clave]
+        esperado, t_original = medir(original, hoja, "Benchmark", URL_PRUEBA, ahora)
+        obtenido, t_vectorizado = medir(vectorizada, hoja, "Benchmark", URL_PRUEBA, ahora)
+        iguales = esperado == obtenido
+        todo_ok = todo_ok and iguales
+        print(
+            f"{nombre:<12}{len(hoja) / t_original:>11,.0f} f/s{len(hoja) / t_vectorizado:>11,.0f} f/s"
+            f"{t_original / t_vectorizado:>13.1f}x  {'[OK]' if iguales else '[X] registros distintos'}"
+        )
+
+    print("=" * 70)
+    print("[OK] Ambas implementaciones generan los mismos registros" if todo_ok
+          else "[X] Las implementaciones no coinciden")
+    return 0 if todo_ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+"""
+Servidor Ollama falso para probar el Asistente AI sin modelos instalados
+Responde /api/chat, /api/generate y /api/tags con el mismo formato NDJSON que Ollama,
+incluyendo las métricas de tiempos (prompt_eval_*, eval_*, load_duration).
+Ejecutar: python fake_ollama.py [--puerto 11434] [--demora 0.05] [--tokens 40]
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPUESTA_BASE = (
+    "Respuesta de prueba del servidor Ollama falso. "
+    "Los tokens llegan de a uno para verificar el streaming en la interfaz. "
+)
+
+
+def crear_handler(demora, cantidad_tokens):
+    """Handler HTTP configurado con la demora entre tokens y el largo de la respuesta"""
+
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, formato, *args):
+            print(f"[fake-ollama] {formato % args}")
+
+        def _enviar_json(self, codigo, cuerpo):
+            datos = json.dumps(cuerpo).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self._enviar_json(200, {"models": [{"name": "llama3.1"}, {"name": "mistral"}]})
+            else:
+                self._enviar_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            largo = int(self.headers.get("Content-Length", 0))
+            try:
+                payload = json.loads(self.rfile.read(largo) or b"{}")
+            except json.JSONDecodeError:
+                self._enviar_json(400, {"error": "invalid json"})
+                return
+
+            if self.path not in ("/api/generate", "/api/chat"):
+                self._enviar_json(404, {"error": "not found"})
+                return
+
+            es_chat = self.path == "/api/chat"
+            modelo = payload.get("model", "llama3.1")
+            palabras = (RESPUESTA_BASE * (cantidad_tokens // 10 + 1)).split()[:cantidad_tokens]
+            prompt = json.dumps(payload.get("messages", payload.get("prompt", "")))
+            inicio = time.perf_counter_ns()
+
+            def fragmento(texto, listo=False):
+                base = {"model": modelo, "done": listo}
+                if es_chat:
+                    base["message"] = {"role": "assistant", "content": texto}
+                else:
+                    base["response"] = texto
+                return base
+
+            def metricas():
+                total = time.perf_counter_ns() - inicio
+                return {
+                    "done_reason": "stop",
+                    "total_duration": total,
+                    "load_duration": 0,
+                    "prompt_eval_count": len(prompt.split()),
+                    "prompt_eval_duration": int(demora * 1e9),
+                    "eval_count": len(palabras),
+                    "eval_duration": max(total - int(demora * 1e9), 1),
+                }
+
+            if not payload.get("stream", True):
+                time.sleep(demora * len(palabras))
+                self._enviar_json(200, {**fragmento(" ".join(palabras), True), **metricas()})
+                return
+
+            # Streaming NDJSON con transferencia chunked, igual que Ollama
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for palabra in palabras:
+                    time.sleep(demora)
+                    self._enviar_chunk(fragmento(palabra + " "))
+                self._enviar_chunk({**fragmento("", True), **metricas()})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente canceló la respuesta
+                print("[fake-ollama] cliente desconectado (cancelado)")
+
+        def _enviar_chunk(self, objeto):
+            linea = (json.dumps(objeto) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(linea):X}\r\n".encode("ascii") + linea + b"\r\n")
+            self.wfile.flush()
+
+    return FakeOllamaHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Ollama falso para pruebas locales")
+    parser.add_argument("--puerto", type=int, default=11434)
+    parser.add_argument("--demora", type=float, default=0.05, help="segundos entre tokens")
+    parser.add_argument("--tokens", type=int, default=40, help="cantidad de tokens por respuesta")
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.puerto), crear_handler(args.demora, args.tokens))
+    print(f"[OK] Ollama falso escuchando en http://127.0.0.1:{args.puerto}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -498,6 +498,10 @@ def main_dashboard():
     if st.sidebar.button("📝 Reporte Médico", use_container_width=True):
         st.session_state.current_page = "reporte_medico"
         st.rerun()
+    
+    if st.sidebar.button("🩺 Disponibilidad", use_container_width=True):
+        st.session_state.current_page = "disponibilidad"
+        st.rerun()
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 🤖 Asistente")
@@ -550,6 +554,9 @@ def main_dashboard():
     elif page == "reporte_medico":
         from src.modules.reportemedico import main_reporte_medico
         main_reporte_medico()
+    elif page == "disponibilidad":
+        from src.modules.disponibilidad import main_disponibilidad
+        main_disponibilidad()
     elif page == "bot":
         from src.modules.bot import main_bot
         main_bot()
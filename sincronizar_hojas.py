@@ -0,0 +1,78 @@
+"""
+Sincronización programada de todas las hojas de Google Sheets configuradas
+Sincroniza en paralelo las fuentes de data/sync_config.json (médicas,
+nutricionales, de fuerza y de campo) sin abrir Streamlit; pensado para cron.
+Con --compactar también borra físicamente las filas con borrado lógico de la
+hoja de registros médicos (GoogleSheetsManager.compactar_eliminados).
+Ejecutar: python sincronizar_hojas.py [--hilos 4] [--lecturas-por-minuto 60] [--compactar]
+Cron (compactación cada 6 h): 0 */6 * * * cd <proyecto> && python sincronizar_hojas.py --compactar
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src', 'sheets'))
+
+from almacen_registros import ALMACENES, obtener_almacen  # noqa: E402
+from google_sheets_sync import LECTURAS_POR_MINUTO, GoogleSheetsCAR, LimitadorCuota, load_sync_config  # noqa: E402
+from sincronizador import HILOS, fuentes_configuradas, sincronizar_todas  # noqa: E402
+from src.sheets.google_sheets_manager import GoogleSheetsManager  # noqa: E402
+
+
+def mostrar_evento(evento):
+    """Avance de cada fuente a medida que llega"""
+    if evento['estado'] == 'ok':
+        print(f"[OK] {evento['etiqueta']}: {evento['nuevos']} nuevos / {evento['filas']} filas "
+              f"en {evento['segundos']:.1f}s ({evento['filas_por_segundo']:.0f} filas/s)")
+    elif evento['estado'] == 'error':
+        print(f"[X] {evento['etiqueta']}: {evento['error']}")
+    elif evento['estado'] == 'esperando cuota':
+        print(f"[!] {evento['etiqueta']}: cuota de la API agotada, reintento {evento['intento']}")
+    else:
+        print(f"[>] {evento['etiqueta']}: {evento['estado']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincronizar todas las hojas configuradas")
+    parser.add_argument('--hilos', type=int, default=HILOS)
+    parser.add_argument('--lecturas-por-minuto', type=int, default=LECTURAS_POR_MINUTO)
+    parser.add_argument('--compactar', action='store_true', help="Compactar los almacenes y la hoja de registros médicos al terminar")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SINCRONIZACION DE GOOGLE SHEETS")
+    print("=" * 70)
+
+    fuentes = fuentes_configuradas(load_sync_config())
+    if not fuentes:
+        print("[!] No hay fuentes configuradas en data/sync_config.json")
+        return 0
+
+    gs = GoogleSheetsCAR(limitador=LimitadorCuota(args.lecturas_por_minuto))
+    if gs.client is None:
+        print("[X] Error: no se encontraron credenciales de Google")
+        print("[!] Configura .streamlit/secrets.toml o data/car_google_credentials.json")
+        return 1
+
+    print(f"[*] {len(fuentes)} fuente(s), {args.hilos} hilo(s), {args.lecturas_por_minuto} lecturas/min")
+    _, resumen = sincronizar_todas(gs, hilos=args.hilos, al_progresar=mostrar_evento)
+
+    if args.compactar:
+        for nombre in ALMACENES:
+            eliminadas = obtener_almacen(nombre).compactar()
+            if eliminadas:
+                print(f"[OK] {nombre}: {eliminadas} lineas obsoletas compactadas")
+        gestor = GoogleSheetsManager()
+        if gestor.credentials_loaded:
+            ok, mensaje = gestor.compactar_eliminados()
+            print(f"[{'OK' if ok else 'X'}] Registros_Medicos: {mensaje}")
+
+    print("=" * 70)
+    print(f"[*] {resumen['ok']}/{resumen['fuentes']} fuentes OK, {resumen['nuevos']} registros nuevos, "
+          f"{resumen['filas']} filas en {resumen['segundos']:.1f}s ({resumen['filas_por_segundo']:.0f} filas/s)")
+    return 1 if resumen['errores'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
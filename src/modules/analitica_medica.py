@@ -0,0 +1,221 @@
+"""
+Analítica Médica - Club Universitario de La Plata
+Prepara una sola vez los registros del Área Médica (fechas parseadas, severidad
+como categórico ordenado, región corporal) y precalcula los agregados que usan
+los filtros, las métricas y los gráficos: lesiones por semana, por categoría,
+por severidad, por región y duraciones de recuperación.
+"""
+
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .catalogo_tests import normalizar_texto
+from .reportemedico import parsear_fechas_medicas
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+
+# Columnas posibles en las distintas versiones del formulario médico
+COLUMNAS_SEVERIDAD = ['Severidad de la lesión', 'Severidad de la Lesión']
+COLUMNAS_CATEGORIA = ['Categoría', 'Categoria']
+COLUMNAS_JUGADOR = ['Nombre del Paciente', 'Nombre y Apellido']
+COLUMNAS_FECHA_LESION = ['Fecha', '¿Cuándo ocurrió la lesión?', 'Fecha de Atención', 'Marca temporal']
+COLUMNAS_PARTE = ['Parte del Cuerpo Afectada', 'Parte del cuerpo afectada']
+COLUMNA_PROXIMA_EVALUACION = 'Fecha de Próxima Evaluación'
+
+# Severidad canónica, de menor a mayor
+NIVELES_SEVERIDAD = ['Leve', 'Moderada', 'Grave', 'Muy grave']
+TIPO_SEVERIDAD = pd.CategoricalDtype(NIVELES_SEVERIDAD, ordered=True)
+
+# Región corporal -> partes del cuerpo (sin tildes, en minúsculas)
+REGIONES_CORPORALES = {
+    'Cabeza y cuello': ['cabeza', 'cuello', 'oreja', 'ojo', 'nariz'],
+    'Miembro superior': ['hombro', 'brazo', 'codo', 'antebrazo', 'muneca', 'mano', 'dedos'],
+    'Tronco': ['pecho', 'espalda', 'costillas', 'columna', 'cadera'],
+    'Miembro inferior': ['muslo', 'rodilla', 'pierna', 'tobillo', 'pie'],
+}
+SIN_REGION = 'Otro'
+TIPO_REGION = pd.CategoricalDtype(list(REGIONES_CORPORALES) + [SIN_REGION])
+_REGION_POR_PARTE = {parte: region for region, partes in REGIONES_CORPORALES.items() for parte in partes}
+
+
+def _primera_columna(df, candidatas):
+    """Primera columna existente de la lista de candidatas"""
+    return next((c for c in candidatas if c in df.columns), None)
+
+
+# ==========================================
+# PREPARACIÓN (UNA SOLA VEZ POR VERSIÓN DE DATOS)
+# ==========================================
+
+def clasificar_severidad(serie):
+    """
+    Convierte el texto de severidad ('Leve (1-7 días)', 'Grave', ...) en el
+    categórico ordenado NIVELES_SEVERIDAD. Clasifica cada valor distinto una sola vez.
+    """
+    codigos = serie.astype('category')
+    textos = normalizar_texto(pd.Series(codigos.cat.categories, dtype=object))
+    canonicas = np.select(
+        [
+            textos.str.contains('muy grave').to_numpy(),
+            textos.str.contains('grave').to_numpy(),
+            textos.str.contains('moderada').to_numpy(),
+            textos.str.contains('leve').to_numpy(),
+        ],
+        NIVELES_SEVERIDAD[::-1],
+        default=None
+    )
+    mapa = dict(zip(codigos.cat.categories, canonicas))
+    return codigos.map(mapa).astype(TIPO_SEVERIDAD)
+
+
+def clasificar_region(serie):
+    """Agrupa la parte del cuerpo afectada en una región corporal (categórico)"""
+    codigos = serie.astype('category')
+    partes = normalizar_texto(pd.Series(codigos.cat.categories, dtype=object)).str.strip()
+    mapa = dict(zip(codigos.cat.categories, partes.map(_REGION_POR_PARTE).fillna(SIN_REGION)))
+    return codigos.map(mapa).astype(TIPO_REGION).fillna(SIN_REGION)
+
+
+def preparar_datos_medicos(df):
+    """
+    DataFrame normalizado para analítica, con columnas:
+    fecha, semana, categoria, jugador, severidad, region, dias_recuperacion.
+    """
+    columnas = ['fecha', 'semana', 'categoria', 'jugador', 'severidad', 'region', 'dias_recuperacion']
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columnas)
+
+    n = len(df)
+    vacia = pd.Series([''] * n, index=df.index, dtype=object)
+
+    # Primera fecha no vacía según prioridad
+    textos_fecha = pd.Series(np.nan, index=df.index, dtype=object)
+    for col in COLUMNAS_FECHA_LESION:
+        if col in df.columns:
+            faltantes = textos_fecha.isna()
+            textos_fecha[faltantes] = df.loc[faltantes, col].replace('', np.nan)
+    fecha = parsear_fechas_medicas(textos_fecha.to_numpy())
+
+    col_cat = _primera_columna(df, COLUMNAS_CATEGORIA)
+    col_jug = _primera_columna(df, COLUMNAS_JUGADOR)
+    col_sev = _primera_columna(df, COLUMNAS_SEVERIDAD)
+    col_parte = _primera_columna(df, COLUMNAS_PARTE)
+
+    datos = pd.DataFrame({
+        'fecha': fecha.to_numpy(),
+        'categoria': (df[col_cat] if col_cat else vacia).astype(str).str.strip().replace('', 'Sin Categoría').to_numpy(),
+        'jugador': (df[col_jug] if col_jug else vacia).astype(str).str.strip().to_numpy(),
+        'severidad': clasificar_severidad(df[col_sev] if col_sev else vacia).reset_index(drop=True),
+        'region': clasificar_region(df[col_parte] if col_parte else vacia).reset_index(drop=True),
+    })
+    datos['categoria'] = datos['categoria'].astype('category')
+    datos['semana'] = datos['fecha'].dt.to_period('W-SUN').dt.start_time
+
+    # Duración estimada de recuperación: desde la lesión hasta la próxima evaluación
+    if COLUMNA_PROXIMA_EVALUACION in df.columns:
+        proxima = parsear_fechas_medicas(df[COLUMNA_PROXIMA_EVALUACION].replace('', np.nan).to_numpy())
+        dias = (proxima.to_numpy() - datos['fecha'].to_numpy()) / np.timedelta64(1, 'D')
+        datos['dias_recuperacion'] = np.where(dias >= 0, dias, np.nan)
+    else:
+        datos['dias_recuperacion'] = np.nan
+
+    return datos[columnas]
+
+
+def version_datos(df):
+    """
+    Huella del contenido completo del dataset, en orden de filas, para invalidar
+    cachés cuando cambia la hoja (las máscaras de filtros son posicionales).
+    """
+    if df is None or df.empty:
+        return '0'
+    huella = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()).hexdigest()
+    return f"{len(df)}-{'|'.join(map(str, df.columns))}-{huella}"
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def datos_preparados(_df, version):
+    """preparar_datos_medicos cacheado por versión de datos (el DataFrame no se hashea)"""
+    return preparar_datos_medicos(_df)
+
+
+# ==========================================
+# AGREGADOS
+# ==========================================
+
+def mascara_filtros(datos, categoria='Todas', severidad='Todas', jugador='Todos'):
+    """Máscara booleana NumPy para los filtros de categoría, severidad y jugador"""
+    mascara = np.ones(len(datos), dtype=bool)
+    if categoria != 'Todas':
+        mascara &= (datos['categoria'] == categoria).to_numpy()
+    if severidad != 'Todas':
+        mascara &= (datos['severidad'] == severidad).to_numpy()
+    if jugador != 'Todos':
+        mascara &= (datos['jugador'] == jugador).to_numpy()
+    return mascara
+
+
+# ==========================================
+# FACETAS DE FILTROS
+# ==========================================
+
+@st.cache_data(ttl=600, show_spinner=False)
+def facetas_medicas(_datos, version):
+    """
+    Valores y conteos de cada filtro, calculados una vez por versión de datos
+    (`version` debe ser version_datos del DataFrame del que salen `_datos`):
+    - 'categoria': conteo por categoría (orden alfabético)
+    - 'severidad': conteo por nivel (orden de severidad)
+    - 'jugadores': {'Todas' | categoría: lista ordenada de jugadores}
+    """
+    con_jugador = _datos[_datos['jugador'] != '']
+    por_categoria = con_jugador.groupby('categoria', observed=True)['jugador'].unique()
+    jugadores = {categoria: sorted(nombres) for categoria, nombres in por_categoria.items()}
+    jugadores['Todas'] = sorted(con_jugador['jugador'].unique())
+    return {
+        'categoria': _datos['categoria'].value_counts().sort_index(),
+        'severidad': _datos['severidad'].value_counts(sort=False).reindex(NIVELES_SEVERIDAD, fill_value=0),
+        'jugadores': jugadores,
+    }
+
+
+def etiqueta_faceta(conteos, todos='Todas'):
+    """format_func para selectbox: muestra el conteo junto a cada opción"""
+    def formatear(opcion):
+        if opcion == todos or opcion not in conteos.index:
+            return opcion
+        return f"{opcion} ({conteos[opcion]})"
+    return formatear
+
+
+def calcular_agregados(datos):
+    """Todos los agregados del tablero médico en un diccionario"""
+    severidad = datos['severidad'].value_counts(sort=False).reindex(NIVELES_SEVERIDAD, fill_value=0)
+    recuperacion = (
+        datos.dropna(subset=['dias_recuperacion'])
+        .groupby('severidad', observed=False)['dias_recuperacion']
+        .agg(['count', 'mean', 'median'])
+        .reindex(NIVELES_SEVERIDAD)
+    )
+    return {
+        'total': len(datos),
+        'por_semana': datos.dropna(subset=['semana']).groupby('semana').size(),
+        'por_categoria': datos['categoria'].value_counts(),
+        'por_severidad': severidad,
+        'por_region': datos['region'].value_counts(),
+        'por_jugador': datos.loc[datos['jugador'] != '', 'jugador'].value_counts(),
+        'recuperacion': recuperacion,
+        'ultima_fecha': datos['fecha'].max(),
+    }
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def agregados_medicos(_datos, version, categoria='Todas', severidad='Todas'):
+    """Agregados para una combinación de filtros; se reutilizan entre reruns por versión"""
+    datos = _datos[mascara_filtros(_datos, categoria, severidad)]
+    return calcular_agregados(datos)
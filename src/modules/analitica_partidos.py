@@ -0,0 +1,203 @@
+"""
+Factores de Victoria - Club Universitario de La Plata
+Análisis batch del historial de partidos: matriz de correlaciones y regresión
+logística (IRLS con penalización L2, solo NumPy) entre los indicadores del
+partido y el resultado. Los KPIs se guardan por huella de partido y solo se
+calculan para los partidos nuevos o editados; las sumas suficientes se
+actualizan de forma incremental y la regresión solo se reajusta cuando cambia
+el conjunto de partidos.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .motor_kpi import RUTA_PARTIDOS, AlmacenPartidos, calcular_kpis, partidos_para_mostrar
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+
+FACTORES = ['Efectividad_Tackle', 'Eficiencia_22m', 'Efectividad_Scrum', 'Efectividad_Line', 'Penales_Cometidos']
+NOMBRES_FACTORES = {
+    'Efectividad_Tackle': 'Tackle %',
+    'Eficiencia_22m': 'Puntos por entrada a 22m',
+    'Efectividad_Scrum': 'Scrum %',
+    'Efectividad_Line': 'Line %',
+    'Penales_Cometidos': 'Penales cometidos',
+    'Victoria': 'Victoria',
+}
+PARTIDOS_MINIMOS = 4
+
+# Regresión logística
+PENALIZACION_L2 = 1.0
+MAX_ITERACIONES = 50
+TOLERANCIA = 1e-8
+
+# ==========================================
+# ESTADÍSTICAS INCREMENTALES
+# ==========================================
+
+class EstadisticasPartidos:
+    """
+    Sumas suficientes de [factores..., victoria]: n, Σx y Σxxᵀ.
+    Si el historial nuevo es el anterior más partidos agregados al final, solo
+    se suman las filas nuevas; si cambió algo previo, se recalcula desde cero.
+    Guarda además la fila de KPIs de cada partido (por huella) y el último
+    análisis con el conjunto de huellas sobre el que se ajustó.
+    """
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+        self._lock = threading.Lock()
+        self.kpis = {}
+        self.resultado = None
+        self.huellas_ajuste = None
+        self.reiniciar()
+
+    def reiniciar(self):
+        p = len(self.columnas)
+        self.n = 0
+        self.suma = np.zeros(p)
+        self.productos = np.zeros((p, p))
+        self.huellas = np.array([], dtype=np.uint64)
+        self.coeficientes = None  # arranque en caliente de la regresión
+        self.filas_agregadas = 0
+
+    def actualizar(self, matriz, huellas):
+        """Incorpora las filas nuevas de `matriz` (una fila por partido, en orden de carga)"""
+        with self._lock:
+            previas = len(self.huellas)
+            if previas > len(huellas) or not np.array_equal(self.huellas, huellas[:previas]):
+                self.reiniciar()
+                previas = 0
+            nuevas = matriz[previas:]
+            self.n += len(nuevas)
+            self.suma += nuevas.sum(axis=0)
+            self.productos += nuevas.T @ nuevas
+            self.huellas = huellas.copy()
+            self.filas_agregadas = len(nuevas)
+
+    def filas_kpi(self, partidos, huellas):
+        """Filas [factores..., victoria] en el orden de `partidos`; calcula los KPIs solo de las huellas nuevas"""
+        with self._lock:
+            faltan = np.array([h not in self.kpis for h in huellas.tolist()], dtype=bool)
+            if faltan.any():
+                nuevos = partidos.iloc[np.flatnonzero(faltan)].reset_index(drop=True)
+                kpis = calcular_kpis(nuevos.reset_index().rename(columns={'index': '_orden'})).sort_values('_orden')
+                self.kpis.update(zip(huellas[faltan].tolist(), kpis[self.columnas].to_numpy(dtype=float)))
+            # Solo se conservan las filas de los partidos vigentes
+            self.kpis = {h: self.kpis[h] for h in huellas.tolist()}
+            return np.array([self.kpis[h] for h in huellas.tolist()], dtype=float).reshape(-1, len(self.columnas))
+
+    def medias(self):
+        return self.suma / self.n
+
+    def covarianzas(self):
+        media = self.medias()
+        return (self.productos - self.n * np.outer(media, media)) / (self.n - 1)
+
+    def correlaciones(self):
+        cov = self.covarianzas()
+        desvio = np.sqrt(np.clip(np.diag(cov), 0, None))
+        denominador = np.outer(desvio, desvio)
+        corr = np.divide(cov, denominador, out=np.full_like(cov, np.nan), where=denominador > 0)
+        return pd.DataFrame(corr, index=self.columnas, columns=self.columnas)
+
+
+@st.cache_resource
+def obtener_estadisticas(ruta=RUTA_PARTIDOS):
+    """Estadísticas incrementales del historial, una por archivo de partidos"""
+    return EstadisticasPartidos(FACTORES + ['Victoria'])
+
+# ==========================================
+# REGRESIÓN LOGÍSTICA (IRLS)
+# ==========================================
+
+def regresion_logistica(x, y, penalizacion=PENALIZACION_L2, inicial=None):
+    """
+    Regresión logística por IRLS (Newton) con penalización L2 sobre las pendientes.
+    `x` ya estandarizada, sin columna de unos. Devuelve (coeficientes con el
+    intercepto primero, iteraciones). La penalización evita coeficientes infinitos
+    cuando los partidos ganados y perdidos se separan perfectamente.
+    """
+    n, p = x.shape
+    diseno = np.column_stack([np.ones(n), x])
+    beta = np.zeros(p + 1) if inicial is None or len(inicial) != p + 1 else inicial.copy()
+    penal = np.full(p + 1, penalizacion)
+    penal[0] = 0.0
+
+    for iteracion in range(1, MAX_ITERACIONES + 1):
+        prob = 1.0 / (1.0 + np.exp(-np.clip(diseno @ beta, -30, 30)))
+        pesos = prob * (1 - prob)
+        gradiente = diseno.T @ (y - prob) - penal * beta
+        hessiano = (diseno * pesos[:, None]).T @ diseno + np.diag(penal) + 1e-9 * np.eye(p + 1)
+        paso = np.linalg.solve(hessiano, gradiente)
+        beta += paso
+        if np.max(np.abs(paso)) < TOLERANCIA:
+            break
+    return beta, iteracion
+
+
+def analizar_factores(partidos, estadisticas):
+    """
+    Matriz de correlaciones y ranking de factores de victoria.
+    `partidos` en el orden del almacén (sin reordenar) para el cálculo incremental.
+    """
+    if len(partidos) < PARTIDOS_MINIMOS:
+        return None
+
+    huellas = pd.util.hash_pandas_object(partidos, index=False).to_numpy()
+    conjunto = np.sort(huellas)
+    if estadisticas.huellas_ajuste is not None and np.array_equal(conjunto, estadisticas.huellas_ajuste):
+        # Mismos partidos: no se recalculan KPIs ni se reajusta la regresión
+        return estadisticas.resultado and {**estadisticas.resultado, 'filas_agregadas': 0}
+
+    matriz = estadisticas.filas_kpi(partidos, huellas)
+    estadisticas.actualizar(matriz, huellas)
+    estadisticas.huellas_ajuste = conjunto
+    estadisticas.resultado = None
+
+    victorias = matriz[:, -1]
+    if victorias.min() == victorias.max():
+        return None
+
+    # Estandarización con las medias y desvíos de las sumas suficientes
+    media = estadisticas.medias()[:-1]
+    desvio = np.sqrt(np.clip(np.diag(estadisticas.covarianzas())[:-1], 0, None))
+    desvio[desvio == 0] = 1.0
+    x = (matriz[:, :-1] - media) / desvio
+
+    beta, iteraciones = regresion_logistica(x, victorias, inicial=estadisticas.coeficientes)
+    estadisticas.coeficientes = beta
+
+    prob = 1.0 / (1.0 + np.exp(-np.clip(np.column_stack([np.ones(len(x)), x]) @ beta, -30, 30)))
+    correlaciones = estadisticas.correlaciones()
+    ranking = pd.DataFrame({
+        'Factor': [NOMBRES_FACTORES[f] for f in FACTORES],
+        'Coeficiente': beta[1:],
+        'Odds por +1 desvío': np.exp(beta[1:]),
+        'Correlación con victoria': correlaciones.loc[FACTORES, 'Victoria'].to_numpy(),
+    })
+    ranking['Efecto'] = np.where(ranking['Coeficiente'] >= 0, 'Favorece la victoria', 'Perjudica')
+    ranking = ranking.reindex(ranking['Coeficiente'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+    estadisticas.resultado = {
+        'correlaciones': correlaciones.rename(index=NOMBRES_FACTORES, columns=NOMBRES_FACTORES),
+        'ranking': ranking,
+        'intercepto': beta[0],
+        'exactitud': float(((prob >= 0.5) == (victorias == 1)).mean()),
+        'partidos': estadisticas.n,
+        'iteraciones': iteraciones,
+        'filas_agregadas': estadisticas.filas_agregadas,
+    }
+    return estadisticas.resultado
+
+
+@st.cache_data(show_spinner=False)
+def factores_victoria(version, ruta=RUTA_PARTIDOS):
+    """Análisis de factores cacheado por versión del historial de partidos"""
+    partidos, _ = partidos_para_mostrar(AlmacenPartidos(ruta))
+    return analizar_factores(partidos, obtener_estadisticas(ruta))
@@ -1,6 +1,7 @@
 import streamlit as st
 import json
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
 import plotly.express as px
 import plotly.graph_objects as go
@@ -9,6 +10,9 @@ import gspread
 from google.oauth2.service_account import Credentials
 import os
 
+from .catalogo_tests import asignar_codigos, grupo_posicion_categorico, id_grupo
+from .percentiles_fisicos import MotorPercentiles
+
 # ==========================================
 # GESTIÓN DE CREDENCIALES Y CONEXIÓN
 # ==========================================
@@ -105,35 +109,123 @@ def cargar_hoja(sheet_id: str, nombre_hoja: str, rutas_credenciales=None) -> pd.
         st.error(f"❌ Error al cargar la hoja: {e}")
         return pd.DataFrame()
 
+# ==========================================
+# CARGA Y PREPARACIÓN DE LA BASE TEST
+# ==========================================
+
+# Columnas de la hoja "Base Test"
+CATEGORIA_COL = "Categoría"
+JUGADOR_COL = "Nombre y Apellido"
+TEST_COL = "Test"
+SUBTEST_COL = "Subtest"
+VALOR_COL = "valor"
+POSICION_COL = "Posición del jugador"
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cargar_base_test(sheet_id: str, nombre_hoja: str):
+    """
+    Carga la hoja 'Base Test' y la deja lista para filtrar:
+    - valores numéricos convertidos una sola vez
+    - códigos del catálogo y columna categórica 'grupo_posicion'
+    - cascada categoría → test → grupo → posiciones precalculada
+    Devuelve (df, cascada).
+    """
+    df = cargar_hoja(sheet_id, nombre_hoja)
+    if df.empty:
+        return df, {}
+    
+    df = asignar_codigos(df, test_col=TEST_COL, subtest_col=SUBTEST_COL)
+    df['grupo_posicion'] = grupo_posicion_categorico(df['grupo_id'])
+    
+    if VALOR_COL in df.columns:
+        df[VALOR_COL] = pd.to_numeric(df[VALOR_COL].astype(str).str.replace(',', '.'), errors='coerce')
+    
+    # Columnas de filtro como categóricas: cada cambio de filtro es una comparación de códigos
+    for col in [CATEGORIA_COL, TEST_COL, POSICION_COL]:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    
+    return df, construir_cascada_filtros(df)
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def obtener_motor_base_test(sheet_id: str, nombre_hoja: str) -> MotorPercentiles:
+    """Motor de percentiles de la Base Test, compartido entre sesiones y reruns"""
+    df, _ = cargar_base_test(sheet_id, nombre_hoja)
+    return MotorPercentiles(
+        df, jugador_col=JUGADOR_COL, test_col=TEST_COL, subtest_col=SUBTEST_COL,
+        categoria_col=CATEGORIA_COL, valor_col=VALOR_COL
+    )
+
+def construir_cascada_filtros(df) -> Dict:
+    """
+    Arma las listas de opciones de los filtros en cascada:
+    {categoría: {test: {'Todos'|'Forwards'|'Backs': [posiciones]}}}
+    Sin columna de posición los tests quedan sin grupos ({test: {}}).
+    """
+    if CATEGORIA_COL not in df.columns or TEST_COL not in df.columns:
+        return {}
+    con_posicion = POSICION_COL in df.columns
+    columnas = [CATEGORIA_COL, TEST_COL] + (['grupo_posicion', POSICION_COL] if con_posicion else [])
+    
+    combinaciones = df[columnas].dropna(subset=[CATEGORIA_COL, TEST_COL]).drop_duplicates()
+    cascada = {}
+    for categoria, test, *grupo_posicion in combinaciones.itertuples(index=False):
+        grupos = cascada.setdefault(categoria, {}).setdefault(test, {})
+        if not con_posicion:
+            continue
+        grupo, posicion = grupo_posicion
+        grupos.setdefault('Todos', set())
+        posicion = str(posicion)
+        grupos['Todos'].add(posicion)
+        grupos.setdefault(str(grupo), set()).add(posicion)
+    
+    # Ordenar todos los niveles una sola vez
+    return {
+        categoria: {
+            test: {grupo: sorted(posiciones) for grupo, posiciones in grupos.items()}
+            for test, grupos in sorted(tests.items())
+        }
+        for categoria, tests in sorted(cascada.items())
+    }
+
 # ==========================================
 # FUNCIONES DE VISUALIZACIÓN Y ESTILO
 # ==========================================
 
-def resaltar_valores(s):
+def resaltar_valores(s, cuartiles=None):
     """
-    Genera estilos CSS condicionales para una serie de datos
+    Genera estilos CSS condicionales para una serie de datos.
+    Si se pasan cuartiles precalculados (ej. MotorPercentiles.cuartiles) no se recalculan.
     """
     # Reemplaza coma por punto y convierte a float
     s_float = pd.to_numeric(s.astype(str).str.replace(',', '.'), errors='coerce')
-    is_high = s_float > s_float.quantile(0.75)
-    is_low = s_float < s_float.quantile(0.25)
+    q1, q3 = cuartiles if cuartiles else (s_float.quantile(0.25), s_float.quantile(0.75))
+    is_high = s_float > q3
+    is_low = s_float < q1
     return ['background-color: #b6fcd5' if h else 'background-color: #ffb6b6' if l else '' for h, l in zip(is_high, is_low)]
 
-def mostrar_grafico_top_bottom(df_filtrado, jugador_col, valor_col):
+def mostrar_grafico_top_bottom(df_filtrado, jugador_col, valor_col, ranking=None):
     """
-    Crea visualización de alto impacto mostrando TOP 3 y BOTTOM 3 jugadores en contenedores separados
+    Crea visualización de alto impacto mostrando TOP 3 y BOTTOM 3 jugadores en contenedores separados.
+    `ranking` permite pasar (top, bottom) ya resueltos por el motor de percentiles
+    como listas de (jugador, valor); si no se pasa, se calcula desde el DataFrame.
     """
     if df_filtrado.empty or len(df_filtrado) < 3:
         # No mostrar warning si hay pocos datos, simplemente no renderizar el gráfico grande
         return
     
-    # Calcular promedio por jugador
-    df_promedio = df_filtrado.groupby(jugador_col)[valor_col].mean().reset_index()
-    df_promedio = df_promedio.sort_values(valor_col, ascending=False)
-    
-    # Obtener TOP 3 y BOTTOM 3
-    top_3 = df_promedio.head(3).copy()
-    bottom_3 = df_promedio.tail(3).copy()
+    if ranking and ranking[0]:
+        # TOP 3 de mayor a menor y BOTTOM 3 de menor a mayor, tal como los da el motor
+        top_3 = pd.DataFrame(ranking[0], columns=[jugador_col, valor_col])
+        bottom_3 = pd.DataFrame(ranking[1][::-1], columns=[jugador_col, valor_col])
+    else:
+        # Calcular promedio por jugador
+        df_promedio = df_filtrado.groupby(jugador_col)[valor_col].mean().reset_index()
+        df_promedio = df_promedio.sort_values(valor_col, ascending=False)
+        
+        # Obtener TOP 3 y BOTTOM 3
+        top_3 = df_promedio.head(3).copy()
+        bottom_3 = df_promedio.tail(3).copy()
     
     # Obtener nombre del test y unidad
     nombre_test = df_filtrado['Test'].iloc[0] if 'Test' in df_filtrado.columns else "Test"
@@ -188,10 +280,123 @@ def mostrar_grafico_top_bottom(df_filtrado, jugador_col, valor_col):
                 </div>
             """, unsafe_allow_html=True)
 
-def mostrar_tabla_estilizada(df, valor_col, test_col, subtest_col):
+# Columnas de percentil: (etiqueta, contra la categoría, contra el grupo de posición)
+COHORTES_PERCENTIL = [
+    ('Pctl. Categoría', True, False),
+    ('Pctl. Grupo', False, True),
+    ('Pctl. Club', False, False),
+]
+
+# Niveles de rendimiento vs promedio: código -> (estilo CSS, indicador para tablas grandes)
+NIVEL_SIN_DATO = -1
+NIVEL_BAJO = 0
+NIVEL_PROMEDIO = 1
+NIVEL_ALTO = 2
+ESTILOS_NIVEL = np.array([
+    'background-color: #FFCDD2; color: #B71C1C',   # Rojo (Debajo del promedio)
+    'background-color: #FFF9C4; color: #F57F17',   # Amarillo (Promedio)
+    'background-color: #C8E6C9; color: #1B5E20',   # Verde (Encima del promedio)
+    '',
+])
+INDICADORES_NIVEL = np.array(['🔴 Bajo', '🟡 Promedio', '🟢 Alto', ''])
+
+# A partir de este tamaño se deja de renderizar HTML con Styler y se pagina
+MAX_FILAS_STYLER = 1000
+FILAS_POR_PAGINA = 500
+
+def clasificar_rendimiento(valores, promedio, desviacion):
+    """
+    Nivel de cada valor frente a promedio ± 0.5 desviaciones (vectorizado).
+    Devuelve un array con NIVEL_ALTO / NIVEL_PROMEDIO / NIVEL_BAJO / NIVEL_SIN_DATO.
+    """
+    valores = np.asarray(valores, dtype=float)
+    if pd.isna(desviacion) or desviacion == 0:
+        return np.full(valores.shape, NIVEL_SIN_DATO, dtype=np.int8)
+    
+    umbral = 0.5 * desviacion
+    return np.select(
+        [np.isnan(valores), valores > promedio + umbral, valores < promedio - umbral],
+        [NIVEL_SIN_DATO, NIVEL_ALTO, NIVEL_BAJO],
+        default=NIVEL_PROMEDIO
+    ).astype(np.int8)
+
+def matriz_estilos(df_view, niveles):
+    """Matriz de estilos CSS (una fila por nivel, repetida en todas las columnas) para Styler.apply(axis=None)"""
+    estilos_fila = ESTILOS_NIVEL[niveles]
+    return pd.DataFrame(
+        np.repeat(estilos_fila[:, None], df_view.shape[1], axis=1),
+        index=df_view.index,
+        columns=df_view.columns
+    )
+
+def _mostrar_tabla_styler(df_view, valor_col, niveles, cols_percentil):
+    """Render HTML con Styler para tablas chicas (colores por fila)"""
+    styler = df_view.style.apply(lambda _: matriz_estilos(df_view, niveles), axis=None)
+    
+    # Ocultar columna auxiliar 'valor' de forma compatible
+    if hasattr(styler, "hide"):
+        styler.hide(subset=[valor_col], axis=1, names=False) # names=False oculta header tb si es necesario en pandas nuevos
+    elif hasattr(styler, "hide_columns"):
+        styler.hide_columns([valor_col])
+        
+    if cols_percentil:
+        styler.format('P{:.0f}', subset=cols_percentil, na_rep='—')
+        
+    # Formateo general
+    styler.set_properties(**{
+        'text-align': 'center',
+        'font-family': 'Montserrat, Arial'
+    })
+
+    st.dataframe(
+        styler,
+        use_container_width=True,
+        hide_index=True,
+        height=500
+    )
+
+def _mostrar_tabla_paginada(df_view, valor_col, niveles, cols_percentil, unidad):
+    """
+    Render nativo de st.dataframe para tablas grandes: sin HTML de Styler,
+    con indicador de nivel, barras de progreso para percentiles y paginación.
+    """
+    df_grande = df_view.drop(columns=['Resultado'])
+    df_grande.insert(0, 'Nivel', INDICADORES_NIVEL[niveles])
+    
+    total_paginas = max(1, -(-len(df_grande) // FILAS_POR_PAGINA))
+    col_pag, col_info = st.columns([1, 3])
+    with col_pag:
+        pagina = st.number_input(
+            "Página", min_value=1, max_value=total_paginas, value=1, step=1,
+            key="pagina_tabla_fisica"
+        )
+    inicio = (int(pagina) - 1) * FILAS_POR_PAGINA
+    fin = min(inicio + FILAS_POR_PAGINA, len(df_grande))
+    with col_info:
+        st.caption(f"Mostrando filas {inicio + 1}–{fin} de {len(df_grande)} ({total_paginas} páginas)")
+    
+    column_config = {
+        'Nivel': st.column_config.TextColumn('Nivel', width='small'),
+        valor_col: st.column_config.NumberColumn('Resultado', format=f"%.2f {unidad}".strip()),
+    }
+    for col in cols_percentil:
+        column_config[col] = st.column_config.ProgressColumn(col, min_value=0, max_value=100, format="P%d")
+    
+    st.dataframe(
+        df_grande.iloc[inicio:fin],
+        use_container_width=True,
+        hide_index=True,
+        height=500,
+        column_config=column_config
+    )
+
+def mostrar_tabla_estilizada(df, valor_col, test_col, subtest_col, motor=None):
     """
     Muestra una tabla con código de colores según rendimiento vs promedio.
-    Versión robusta que maneja errores de visualización.
+    Si se pasa el motor de percentiles agrega el percentil de cada resultado
+    frente a su categoría, su grupo de posición y todo el club.
+    Los niveles se calculan con máscaras NumPy; hasta MAX_FILAS_STYLER filas se
+    colorea con Styler, por encima se usa column_config nativo con paginación.
     """
     if df.empty:
         st.warning("⚠️ No hay datos para mostrar con los filtros seleccionados")
@@ -224,41 +429,31 @@ def mostrar_tabla_estilizada(df, valor_col, test_col, subtest_col):
     df_view = df_view.rename(columns=cols_map)
     
     # Crear columna de texto formateado "Resultado"
-    df_view['Resultado'] = df_view[valor_col].apply(
-        lambda x: f"{x:.2f} {unidad}" if pd.notna(x) else ""
-    )
+    texto_valor = df_view[valor_col].round(2).map('{:.2f}'.format)
+    df_view['Resultado'] = (texto_valor + f" {unidad}").where(df_view[valor_col].notna(), "")
     
-    # Reordenar columnas: Las renombradas primero, luego Resultado, luego valor (oculto)
-    cols_ordenadas = [cols_map[c] for c in cols_existentes] + ['Resultado', valor_col]
+    # Percentiles por cohorte (búsqueda binaria sobre arrays precalculados)
+    cols_percentil = []
+    if motor is not None and not motor.vacio():
+        for etiqueta, por_categoria, por_grupo in COHORTES_PERCENTIL:
+            df_view[etiqueta] = np.round(motor.percentiles_filas(
+                df_calc, valor_col, test_col, subtest_col, 'Categoría',
+                por_categoria=por_categoria, por_grupo=por_grupo
+            ))
+            cols_percentil.append(etiqueta)
+    
+    # Reordenar columnas: Las renombradas primero, luego Resultado y percentiles, luego valor (oculto)
+    cols_ordenadas = [cols_map[c] for c in cols_existentes] + ['Resultado'] + cols_percentil + [valor_col]
     df_view = df_view[cols_ordenadas]
     
+    # Nivel de cada fila (una sola pasada vectorizada)
+    niveles = clasificar_rendimiento(df_view[valor_col].to_numpy(), promedio, desviacion)
+    
     # Mostrar estadísticas como métricas antes de la tabla
     c1, c2, c3 = st.columns(3)
     c1.metric("Promedio", f"{promedio:.2f} {unidad}")
     if not pd.isna(desviacion):
         c2.metric("Desviación Estándar", f"{desviacion:.2f}")
-    
-    # Función de estilo
-    def aplicar_estilo_fila(row):
-        try:
-            val = row[valor_col]
-            if pd.isna(val) or pd.isna(desviacion) or desviacion == 0:
-                return [''] * len(row)
-                
-            estilo = ''
-            if val > promedio + (0.5 * desviacion):
-                # Verde (Encima del promedio)
-                estilo = 'background-color: #C8E6C9; color: #1B5E20'
-            elif val < promedio - (0.5 * desviacion):
-                # Rojo (Debajo del promedio)
-                estilo = 'background-color: #FFCDD2; color: #B71C1C'
-            else:
-                # Amarillo (Promedio)
-                estilo = 'background-color: #FFF9C4; color: #F57F17'
-                
-            return [estilo] * len(row)
-        except Exception:
-            return [''] * len(row)
 
     st.markdown("### 📋 Tabla de Resultados")
     
@@ -272,27 +467,10 @@ def mostrar_tabla_estilizada(df, valor_col, test_col, subtest_col):
     """, unsafe_allow_html=True)
 
     try:
-        # Aplicar estilo
-        styler = df_view.style.apply(aplicar_estilo_fila, axis=1)
-        
-        # Ocultar columna auxiliar 'valor' de forma compatible
-        if hasattr(styler, "hide"):
-            styler.hide(subset=[valor_col], axis=1, names=False) # names=False oculta header tb si es necesario en pandas nuevos
-        elif hasattr(styler, "hide_columns"):
-            styler.hide_columns([valor_col])
-            
-        # Formateo general
-        styler.set_properties(**{
-            'text-align': 'center',
-            'font-family': 'Montserrat, Arial'
-        })
-
-        st.dataframe(
-            styler,
-            use_container_width=True,
-            hide_index=True,
-            height=500
-        )
+        if len(df_view) > MAX_FILAS_STYLER:
+            _mostrar_tabla_paginada(df_view, valor_col, niveles, cols_percentil, unidad)
+        else:
+            _mostrar_tabla_styler(df_view, valor_col, niveles, cols_percentil)
     except Exception as e:
         st.error(f"Error al aplicar estilos: {e}")
         # Fallback sin estilos de fila pero funcional
@@ -344,21 +522,24 @@ def physical_area():
     sheet_id = "1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI"
     nombre_hoja = "Base Test"
     
-    # Cargar datos
+    # Cargar datos (cacheado: la preparación se hace una vez por carga)
     with st.spinner("📊 Cargando datos desde Google Sheets..."):
-        df = cargar_hoja(sheet_id, nombre_hoja)
+        df, cascada = cargar_base_test(sheet_id, nombre_hoja)
     
     if df.empty:
         st.error("❌ No se pudo cargar la hoja 'Base Test'.")
         return
+    if not cascada:
+        st.error(f"❌ La hoja 'Base Test' no tiene las columnas '{CATEGORIA_COL}' y '{TEST_COL}'.")
+        return
 
     # Definición de Columnas
-    categoria_col = "Categoría"
-    jugador_col = "Nombre y Apellido"
-    test_col = "Test"
-    subtest_col = "Subtest"
-    valor_col = "valor"
-    posicion_col = "Posición del jugador"
+    categoria_col = CATEGORIA_COL
+    jugador_col = JUGADOR_COL
+    test_col = TEST_COL
+    subtest_col = SUBTEST_COL
+    valor_col = VALOR_COL
+    posicion_col = POSICION_COL
 
     # ==========================================
     # SISTEMA DE FILTROS CASCADA
@@ -366,48 +547,40 @@ def physical_area():
     st.markdown("### 🔎 Filtros Interactivos")
     
     # 1. Categoría
-    categorias = sorted(df[categoria_col].dropna().unique())
-    categoria_sel = st.selectbox("📂 Selecciona la categoría", options=categorias)
-    df_cat = df[df[categoria_col] == categoria_sel]
+    categoria_sel = st.selectbox("📂 Selecciona la categoría", options=list(cascada.keys()))
+    mascara = (df[categoria_col] == categoria_sel).to_numpy()
 
     # 2. Test
-    tests = sorted(df_cat[test_col].dropna().unique())
-    test_sel = st.selectbox("🏃 Selecciona el test físico", options=tests)
-    df_test = df_cat[df_cat[test_col] == test_sel]
-
-    # 3. Grupo y Posición (Layout de columnas)
-    col_grupo, col_pos = st.columns(2)
-    
-    # Definición de Grupos de Rugby
-    FORWARDS = ["Pilar", "Hooker", "Segunda Linea", "Segunda Línea", "Tercera Linea", "Tercera Línea", "Octavo", "Pilar Izquierdo", "Pilar Derecho"]
-    BACKS = ["Medio Scrum", "Apertura", "Centro", "Wing", "Fullback"]
-    
-    with col_grupo:
-        grupo_sel = st.radio(
-            "⚡ Selecciona el grupo",
-            ["Todos", "Forwards", "Backs"],
-            horizontal=True
-        )
+    tests_categoria = cascada[categoria_sel]
+    test_sel = st.selectbox("🏃 Selecciona el test físico", options=list(tests_categoria.keys()))
+    mascara = mascara & (df[test_col] == test_sel).to_numpy()
 
-    # Filtrar dataframe por grupo
-    if grupo_sel == "Forwards":
-        # Filtrado flexible (case insensitive y parcial)
-        df_grupo = df_test[df_test[posicion_col].astype(str).str.lower().apply(lambda x: any(f.lower() in x for f in FORWARDS))]
-    elif grupo_sel == "Backs":
-        df_grupo = df_test[df_test[posicion_col].astype(str).str.lower().apply(lambda x: any(b.lower() in x for b in BACKS))]
-    else:
-        df_grupo = df_test
+    # 3. Grupo y Posición (Layout de columnas); sin columna de posición se omiten
+    grupo_sel, posicion_sel = "Todos", "Todas"
+    if posicion_col in df.columns:
+        col_grupo, col_pos = st.columns(2)
+        
+        with col_grupo:
+            grupo_sel = st.radio(
+                "⚡ Selecciona el grupo",
+                ["Todos", "Forwards", "Backs"],
+                horizontal=True
+            )
 
-    with col_pos:
-        # Obtener posiciones disponibles en el grupo filtrado
-        posiciones_disponibles = sorted(df_grupo[posicion_col].astype(str).unique())
-        posicion_sel = st.selectbox("🎯 Selecciona la posición específica", options=["Todas"] + posiciones_disponibles)
+        # Filtrar por grupo (columna categórica precalculada al cargar)
+        if grupo_sel != "Todos":
+            mascara = mascara & (df['grupo_posicion'] == grupo_sel).to_numpy()
 
-    # Filtrar dataframe por posición
-    if posicion_sel != "Todas":
-        df_pos = df_grupo[df_grupo[posicion_col] == posicion_sel]
-    else:
-        df_pos = df_grupo
+        with col_pos:
+            # Posiciones disponibles en el grupo filtrado (desde la cascada cacheada)
+            posiciones_disponibles = tests_categoria[test_sel].get(grupo_sel, [])
+            posicion_sel = st.selectbox("🎯 Selecciona la posición específica", options=["Todas"] + posiciones_disponibles)
+
+        # Filtrar por posición
+        if posicion_sel != "Todas":
+            mascara = mascara & (df[posicion_col] == posicion_sel).to_numpy()
+
+    df_pos = df[mascara]
 
     # 4. Jugadores
     jugadores = sorted(df_pos[jugador_col].dropna().unique())
@@ -431,19 +604,28 @@ def physical_area():
     # ==========================================
     # PROCESAMIENTO Y VISUALIZACIÓN
     # ==========================================
-    
-    # Convertir valores a números para análisis
-    df_final[valor_col] = df_final[valor_col].astype(str).str.replace(',', '.')
-    df_final[valor_col] = pd.to_numeric(df_final[valor_col], errors='coerce')
+    # Los valores ya llegan numéricos desde cargar_base_test
+
+    motor = obtener_motor_base_test(sheet_id, nombre_hoja)
 
     if not df_final.empty:
         st.markdown("<br>", unsafe_allow_html=True)
         # 1. Gráfico de Top/Bottom
-        mostrar_grafico_top_bottom(df_final, jugador_col, valor_col)
+        # Sin filtro de posición ni de jugadores la selección coincide con una cohorte del motor
+        ranking = None
+        if posicion_sel == "Todas" and not jugadores_sel:
+            grupo_cohorte = id_grupo(grupo_sel) if grupo_sel != "Todos" else None
+            subtest_cohorte = df_final[subtest_col].iloc[0] if df_final[subtest_col].nunique() == 1 else None
+            if subtest_cohorte is not None:
+                ranking = (
+                    motor.top(3, test_sel, subtest_cohorte, categoria_sel, grupo_cohorte),
+                    motor.bottom(3, test_sel, subtest_cohorte, categoria_sel, grupo_cohorte)
+                )
+        mostrar_grafico_top_bottom(df_final, jugador_col, valor_col, ranking)
         
         st.markdown("---")
         
         # 2. Tabla Detallada
-        mostrar_tabla_estilizada(df_final, valor_col, test_col, subtest_col)
+        mostrar_tabla_estilizada(df_final, valor_col, test_col, subtest_col, motor)
     else:
         st.info("No hay datos para mostrar con la selección actual.")
@@ -10,6 +10,7 @@ import plotly.graph_objects as go
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional
 import json
+import re
 import sys
 import os
 def get_google_credentials():
@@ -62,6 +63,17 @@ except ImportError:
 import gspread
 from google.oauth2.service_account import Credentials
 
+try:
+    from .analitica_medica import (
+        NIVELES_SEVERIDAD, agregados_medicos, calcular_agregados, datos_preparados,
+        etiqueta_faceta, facetas_medicas, mascara_filtros, preparar_datos_medicos, version_datos
+    )
+except ImportError:
+    from analitica_medica import (
+        NIVELES_SEVERIDAD, agregados_medicos, calcular_agregados, datos_preparados,
+        etiqueta_faceta, facetas_medicas, mascara_filtros, preparar_datos_medicos, version_datos
+    )
+
 # Variables globales
 creds_info = None
 creds = None
@@ -187,21 +199,29 @@ def create_dataframe_from_sheet(sheet_id=None, worksheet_name=None):
     else:
         return None
 
-def mostrar_resumen_datos(df):
+@st.cache_data(ttl=300, show_spinner=False)
+def cargar_df_medico(sheet_id=None, worksheet_name=None):
+    """create_dataframe_from_sheet cacheado para no releer la hoja en cada interacción"""
+    return create_dataframe_from_sheet(sheet_id, worksheet_name)
+
+def obtener_agregados(df, agregados=None):
+    """Agregados de analítica médica: los recibidos o calculados desde el DataFrame crudo"""
+    if agregados is not None:
+        return agregados
+    return calcular_agregados(preparar_datos_medicos(df))
+
+def mostrar_resumen_datos(df, agregados=None):
     """
     Muestra resumen estadístico de los datos con tarjetas métricas
     """
-    # Calcular métricas
-    total_lesionados = len(df)
+    agregados = obtener_agregados(df, agregados)
+    severidad = agregados['por_severidad']
     
-    if 'Severidad de la lesión' in df.columns:
-        en_recuperacion = len(df[df['Severidad de la lesión'].str.contains('Leve|Moderada', case=False, na=False)])
-        recuperados = len(df[df['Severidad de la lesión'].str.contains('Leve \(1-7 días\)', case=False, na=False)])
-        casos_graves = len(df[df['Severidad de la lesión'].str.contains('Grave|Muy grave', case=False, na=False)])
-    else:
-        en_recuperacion = 0
-        recuperados = 0
-        casos_graves = 0
+    # Calcular métricas
+    total_lesionados = agregados['total']
+    en_recuperacion = int(severidad['Leve'] + severidad['Moderada'])
+    recuperados = int(severidad['Leve'])
+    casos_graves = int(severidad['Grave'] + severidad['Muy grave'])
     
     # Tarjetas métricas
     col1, col2, col3, col4 = st.columns(4)
@@ -214,118 +234,6 @@ def mostrar_resumen_datos(df):
     with col4:
         st.metric("⚠️ Casos Graves", casos_graves)
 
-def mostrar_filtros_jugador_categoria(df):
-    """
-    Muestra filtros por categoría y jugador con información detallada
-    """
-    st.markdown("### 🔍 Filtros por Categoría y Jugador")
-    
-    # Nombres de columnas
-    col_categoria = 'Categoría'
-    col_jugador = 'Nombre del Paciente'
-    
-    # Filtros en columnas
-    col_filtro1, col_filtro2 = st.columns(2)
-    
-    with col_filtro1:
-        # FILTRO IZQUIERDO - CATEGORÍAS
-        if col_categoria in df.columns:
-            categorias_disponibles = ['Todas'] + sorted(df[col_categoria].dropna().unique().tolist())
-            categoria_seleccionada = st.selectbox(
-                "🏈 Seleccionar División",
-                categorias_disponibles,
-                key="area_medica_filtro_categoria"
-            )
-        else:
-            categoria_seleccionada = 'Todas'
-    
-    with col_filtro2:
-        # FILTRO DERECHO - JUGADORES (FILTRADOS POR CATEGORÍA)
-        if col_jugador in df.columns:
-            # AQUÍ ESTÁ LA MAGIA: Si hay categoría seleccionada, filtra los jugadores
-            if categoria_seleccionada != 'Todas':
-                jugadores_filtrados = df[df[col_categoria] == categoria_seleccionada][col_jugador].dropna().unique()
-            else:
-                jugadores_filtrados = df[col_jugador].dropna().unique()
-            
-            jugadores_disponibles = ['Todos'] + sorted(jugadores_filtrados.tolist())
-            jugador_seleccionado = st.selectbox(
-                "👤 Seleccionar Jugador",
-                jugadores_disponibles,
-                key="area_medica_filtro_jugador"
-            )
-        else:
-            jugador_seleccionado = 'Todos'
-    
-    # Aplicar filtros al DataFrame
-    df_filtrado = df.copy()
-    
-    # Aplicar filtro de categoría
-    if categoria_seleccionada != 'Todas' and col_categoria in df.columns:
-        df_filtrado = df_filtrado[df_filtrado[col_categoria] == categoria_seleccionada]
-    
-    # Aplicar filtro de jugador específico
-    if jugador_seleccionado != 'Todos' and col_jugador in df.columns:
-        df_filtrado = df_filtrado[df_filtrado[col_jugador] == jugador_seleccionado]
-    
-    # Mostrar información de filtros aplicados
-    info_filtros = []
-    if categoria_seleccionada != 'Todas':
-        info_filtros.append(f"**División:** {categoria_seleccionada}")
-    if jugador_seleccionado != 'Todos':
-        info_filtros.append(f"**Jugador:** {jugador_seleccionado}")
-    
-    if info_filtros:
-        st.info(f"🔍 **Filtros activos:** {' | '.join(info_filtros)}")
-    
-    # Mostrar resultados filtrados
-    if not df_filtrado.empty:
-        st.success(f"✅ **{len(df_filtrado)} registro(s) encontrado(s)**")
-        
-        # Si es un jugador específico, mostrar información detallada
-        if jugador_seleccionado != 'Todos':
-            st.markdown(f"#### 👤 Historial Médico de {jugador_seleccionado}")
-            
-            # Mostrar resumen del jugador
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("📋 Total Lesiones", len(df_filtrado))
-            with col2:
-                if 'Severidad de la lesión' in df_filtrado.columns:
-                    graves = len(df_filtrado[df_filtrado['Severidad de la lesión'].str.contains('Grave', case=False, na=False)])
-                    st.metric("⚠️ Lesiones Graves", graves)
-                else:
-                    st.metric("⚠️ Lesiones Graves", "N/A")
-            with col3:
-                if 'Fecha' in df_filtrado.columns:
-                    try:
-                        fechas = pd.to_datetime(df_filtrado['Fecha'], errors='coerce').dropna()
-                        if not fechas.empty:
-                            ultima_lesion = fechas.max().strftime('%d/%m/%Y')
-                            st.metric("📅 Última Lesión", ultima_lesion)
-                        else:
-                            st.metric("📅 Última Lesión", "N/A")
-                    except:
-                        st.metric("📅 Última Lesión", "N/A")
-        
-        # Mostrar tabla de datos
-        st.dataframe(df_filtrado, use_container_width=True, height=400)
-        
-        # Botón para descargar datos filtrados
-        if len(df_filtrado) > 0:
-            csv = df_filtrado.to_csv(index=False)
-            st.download_button(
-                label="📥 Descargar datos filtrados",
-                data=csv,
-                file_name=f"lesiones_filtradas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                mime="text/csv"
-            )
-    else:
-        st.warning("⚠️ No se encontraron registros con los filtros seleccionados")
-    
-    # Devolver el DataFrame filtrado para uso en otras funciones
-    return df_filtrado
-
 def test_google_connection():
     """
     Prueba la conexión con Google Sheets y muestra información de diagnóstico
@@ -414,8 +322,13 @@ def mostrar_graficos_interactivos(df):
 
 
 
-def append_google_sheet_row(sheet_id, worksheet_name, row_data, credentials_dict):
-    """Agrega una fila a una hoja de Google Sheets. Robustez mejorada para selección de hoja."""
+def append_google_sheet_row(sheet_id, worksheet_name, row_data, credentials_dict, columns=None):
+    """
+    Agrega una fila a una hoja de Google Sheets. Robustez mejorada para selección de hoja.
+    Devuelve el registro agregado como diccionario junto con el número de fila que
+    ocupó, para que quien llama pueda sumarlo a sus datos en memoria sin releer la hoja.
+    Si no se pasan `columns` se leen los encabezados (fila 1) de la hoja.
+    """
     scopes = [
         "https://www.googleapis.com/auth/spreadsheets",
         "https://www.googleapis.com/auth/drive"
@@ -433,70 +346,109 @@ def append_google_sheet_row(sheet_id, worksheet_name, row_data, credentials_dict
             ws = sh.get_worksheet(0)
     else:
         ws = sh.get_worksheet(0)
+    
+    if columns is None:
+        columns = ws.row_values(1)
         
-    ws.append_row(row_data, value_input_option="USER_ENTERED")
-    return True
+    respuesta = ws.append_row(row_data, value_input_option="USER_ENTERED")
+    
+    valores = [str(v) for v in row_data] + [''] * max(0, len(columns) - len(row_data))
+    return {
+        'success': True,
+        'record': dict(zip(columns, valores)),
+        'row_number': numero_fila_actualizada(respuesta),
+        'updated_range': (respuesta or {}).get('updates', {}).get('updatedRange')
+    }
+
+def numero_fila_actualizada(respuesta):
+    """Extrae el número de fila del 'updatedRange' (ej. "'Hoja 1'!A120:Q120") de un append"""
+    rango = (respuesta or {}).get('updates', {}).get('updatedRange', '')
+    coincidencia = re.search(r'![A-Z]+(\d+)', rango)
+    return int(coincidencia.group(1)) if coincidencia else None
+
 # Agregar después de la función mostrar_graficos_interactivos:
 
-def mostrar_timeline_lesiones(df):
+def mostrar_timeline_lesiones(df, agregados=None):
     """
-    Muestra timeline de lesiones por fecha
+    Muestra timeline de lesiones por semana
     """
-    if 'Fecha' in df.columns and not df.empty:
+    agregados = obtener_agregados(df, agregados)
+    por_semana = agregados['por_semana']
+    
+    if not por_semana.empty:
         st.markdown("#### 📅 Timeline de Lesiones")
         
-        # Convertir fechas
-        df_timeline = df.copy()
-        df_timeline['Fecha'] = pd.to_datetime(df_timeline['Fecha'], errors='coerce')
-        df_timeline = df_timeline.dropna(subset=['Fecha'])
+        lesiones_por_semana = por_semana.rename_axis('Semana').reset_index(name='Cantidad')
         
-        if not df_timeline.empty:
-            # Agrupar por fecha
-            lesiones_por_fecha = df_timeline.groupby(df_timeline['Fecha'].dt.date).size().reset_index()
-            lesiones_por_fecha.columns = ['Fecha', 'Cantidad']
-            
-            fig = px.line(
-                lesiones_por_fecha, 
-                x='Fecha', 
-                y='Cantidad',
-                title="Evolución Temporal de Lesiones",
-                markers=True
-            )
-            
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+        fig = px.line(
+            lesiones_por_semana, 
+            x='Semana', 
+            y='Cantidad',
+            title="Evolución Semanal de Lesiones",
+            markers=True
+        )
+        
+        fig.update_layout(height=400)
+        st.plotly_chart(fig, use_container_width=True)
 
-def mostrar_estadisticas_avanzadas(df):
+def mostrar_estadisticas_avanzadas(df, agregados=None):
     """
     Estadísticas avanzadas y alertas
     """
-    if not df.empty:
+    agregados = obtener_agregados(df, agregados)
+    
+    if agregados['total']:
         st.markdown("#### 🚨 Alertas y Estadísticas")
         
         col1, col2 = st.columns(2)
         
         with col1:
             # Jugadores con más lesiones
-            if 'Nombre del Paciente' in df.columns:
-                jugadores_frecuentes = df['Nombre del Paciente'].value_counts().head(5)
-                
-                if len(jugadores_frecuentes) > 0:
-                    st.warning("⚠️ **Jugadores con más lesiones:**")
-                    for jugador, cantidad in jugadores_frecuentes.items():
-                        if cantidad > 2:  # Alerta si tiene más de 2 lesiones
-                            st.write(f"🔴 {jugador}: {cantidad} lesiones")
-                        else:
-                            st.write(f"🟡 {jugador}: {cantidad} lesiones")
+            jugadores_frecuentes = agregados['por_jugador'].head(5)
+            
+            if len(jugadores_frecuentes) > 0:
+                st.warning("⚠️ **Jugadores con más lesiones:**")
+                for jugador, cantidad in jugadores_frecuentes.items():
+                    if cantidad > 2:  # Alerta si tiene más de 2 lesiones
+                        st.write(f"🔴 {jugador}: {cantidad} lesiones")
+                    else:
+                        st.write(f"🟡 {jugador}: {cantidad} lesiones")
         
         with col2:
             # Divisiones más afectadas
-            if 'Categoría' in df.columns:
-                divisiones_afectadas = df['Categoría'].value_counts()
-                
-                st.info("📊 **Divisiones más afectadas:**")
-                for division, cantidad in divisiones_afectadas.items():
-                    porcentaje = (cantidad / len(df)) * 100
-                    st.write(f"🏈 {division}: {cantidad} ({porcentaje:.1f}%)")
+            divisiones_afectadas = agregados['por_categoria']
+            
+            st.info("📊 **Divisiones más afectadas:**")
+            for division, cantidad in divisiones_afectadas[divisiones_afectadas > 0].items():
+                porcentaje = (cantidad / agregados['total']) * 100
+                st.write(f"🏈 {division}: {cantidad} ({porcentaje:.1f}%)")
+        
+        col3, col4 = st.columns(2)
+        
+        with col3:
+            # Lesiones por región corporal
+            por_region = agregados['por_region']
+            por_region = por_region[por_region > 0]
+            if not por_region.empty:
+                st.markdown("#### 🦴 Lesiones por Región")
+                fig_region = px.bar(
+                    x=por_region.index.astype(str),
+                    y=por_region.values,
+                    color_discrete_sequence=['#2563eb']
+                )
+                fig_region.update_layout(showlegend=False, xaxis_title="Región", yaxis_title="Cantidad", height=350)
+                st.plotly_chart(fig_region, use_container_width=True)
+        
+        with col4:
+            # Duración estimada de recuperación (lesión -> próxima evaluación)
+            recuperacion = agregados['recuperacion'].dropna(subset=['count'])
+            recuperacion = recuperacion[recuperacion['count'] > 0]
+            if not recuperacion.empty:
+                st.markdown("#### ⏱️ Recuperación Estimada (días)")
+                st.dataframe(
+                    recuperacion.rename(columns={'count': 'Casos', 'mean': 'Promedio', 'median': 'Mediana'}).round(1),
+                    use_container_width=True
+                )
 
 
 def main_streamlit():
@@ -514,49 +466,40 @@ def main_streamlit():
     # Cargar datos
     with st.spinner("🔄 Cargando datos desde Google Sheets..."):
         try:
-            df = create_dataframe_from_sheet()
+            df = cargar_df_medico()
             
             if df is not None and not df.empty:
-                # Nombres de columnas
-                col_categoria = 'Categoría'
-                col_severidad = 'Severidad de la lesión'
+                # Preparación única por versión de datos (fechas, severidad, región)
+                version = version_datos(df)
+                datos = datos_preparados(df, version)
                 
                 # FILTROS EN FILA HORIZONTAL
                 st.markdown("### 🔍 Filtros")
                 col_filtro1, col_filtro2 = st.columns(2)
                 
+                facetas = facetas_medicas(datos, version)
+                
                 with col_filtro1:
                     # Filtro de Categoría
-                    if col_categoria in df.columns:
-                        categorias_disponibles = ['Todas'] + sorted(df[col_categoria].dropna().unique().tolist())
-                        categoria_seleccionada = st.selectbox(
-                            "🏈 Seleccionar División",
-                            categorias_disponibles,
-                            key="area_medica_filtro_categoria"
-                        )
-                    else:
-                        categoria_seleccionada = 'Todas'
+                    categoria_seleccionada = st.selectbox(
+                        "🏈 Seleccionar División",
+                        ['Todas'] + facetas['categoria'].index.tolist(),
+                        format_func=etiqueta_faceta(facetas['categoria']),
+                        key="area_medica_filtro_categoria"
+                    )
                 
                 with col_filtro2:
-                    # Filtro de Gravedad
-                    if col_severidad in df.columns:
-                        gravedades_disponibles = ['Todas'] + sorted(df[col_severidad].dropna().unique().tolist())
-                        gravedad_seleccionada = st.selectbox(
-                            "⚠️ Seleccionar Gravedad",
-                            gravedades_disponibles,
-                            key="area_medica_filtro_gravedad"
-                        )
-                    else:
-                        gravedad_seleccionada = 'Todas'
+                    # Filtro de Gravedad (niveles ordenados de menor a mayor)
+                    gravedad_seleccionada = st.selectbox(
+                        "⚠️ Seleccionar Gravedad",
+                        ['Todas'] + NIVELES_SEVERIDAD,
+                        format_func=etiqueta_faceta(facetas['severidad']),
+                        key="area_medica_filtro_gravedad"
+                    )
                 
                 # Aplicar filtros al DataFrame
-                df_filtrado = df.copy()
-                
-                if categoria_seleccionada != 'Todas' and col_categoria in df.columns:
-                    df_filtrado = df_filtrado[df_filtrado[col_categoria] == categoria_seleccionada]
-                
-                if gravedad_seleccionada != 'Todas' and col_severidad in df.columns:
-                    df_filtrado = df_filtrado[df_filtrado[col_severidad] == gravedad_seleccionada]
+                df_filtrado = df[mascara_filtros(datos, categoria_seleccionada, gravedad_seleccionada)]
+                agregados = agregados_medicos(datos, version, categoria_seleccionada, gravedad_seleccionada)
                 
                 # Mostrar información de filtros aplicados
                 info_filtros = []
@@ -577,11 +520,11 @@ def main_streamlit():
                 with col_grafico1:
                     # Gráfico por Categoría
                     st.markdown("#### 📊 Lesiones por División")
-                    if col_categoria in df_filtrado.columns and not df_filtrado.empty:
-                        categorias_counts = df_filtrado[col_categoria].value_counts()
-                        
+                    categorias_counts = agregados['por_categoria']
+                    categorias_counts = categorias_counts[categorias_counts > 0]
+                    if not categorias_counts.empty:
                         fig_bar = px.bar(
-                            x=categorias_counts.index,
+                            x=categorias_counts.index.astype(str),
                             y=categorias_counts.values,
                             color_discrete_sequence=['#1e40af', '#2563eb', '#3b82f6', '#60a5fa']
                         )
@@ -600,13 +543,15 @@ def main_streamlit():
                 with col_grafico2:
                     # Gráfico de Torta por Gravedad
                     st.markdown("#### 🎯 Jugadores por Gravedad")
-                    if col_severidad in df_filtrado.columns and not df_filtrado.empty:
-                        severidad_counts = df_filtrado[col_severidad].value_counts()
-                        
+                    severidad_counts = agregados['por_severidad']
+                    severidad_counts = severidad_counts[severidad_counts > 0]
+                    if not severidad_counts.empty:
                         fig_pie = px.pie(
                             values=severidad_counts.values,
                             names=severidad_counts.index,
-                            color_discrete_sequence=['#22c55e', '#eab308', '#ef4444', '#dc2626']
+                            color=severidad_counts.index,
+                            color_discrete_map=dict(zip(NIVELES_SEVERIDAD, ['#22c55e', '#eab308', '#ef4444', '#dc2626'])),
+                            category_orders={'names': NIVELES_SEVERIDAD}
                         )
                         
                         fig_pie.update_layout(height=400)
@@ -614,6 +559,9 @@ def main_streamlit():
                     else:
                         st.info("No hay datos para mostrar")
                 
+                mostrar_timeline_lesiones(df_filtrado, agregados)
+                mostrar_estadisticas_avanzadas(df_filtrado, agregados)
+                
                 st.markdown("---")
                 
                 # TABLA DE LESIONADOS
@@ -622,28 +570,17 @@ def main_streamlit():
                 if not df_filtrado.empty:
                     st.success(f"✅ **{len(df_filtrado)} lesionado(s) encontrado(s)**")
                     
-                    # Mostrar métricas resumidas
+                    # Mostrar métricas resumidas (conteos precalculados por severidad)
+                    severidad = agregados['por_severidad']
                     col_met1, col_met2, col_met3, col_met4 = st.columns(4)
                     with col_met1:
-                        st.metric("📋 Total Lesiones", len(df_filtrado))
+                        st.metric("📋 Total Lesiones", agregados['total'])
                     with col_met2:
-                        if col_severidad in df_filtrado.columns:
-                            leves = len(df_filtrado[df_filtrado[col_severidad].str.contains('Leve', case=False, na=False)])
-                            st.metric("🟢 Leves", leves)
-                        else:
-                            st.metric("🟢 Leves", "N/A")
+                        st.metric("🟢 Leves", int(severidad['Leve']))
                     with col_met3:
-                        if col_severidad in df_filtrado.columns:
-                            moderadas = len(df_filtrado[df_filtrado[col_severidad].str.contains('Moderada', case=False, na=False)])
-                            st.metric("🟡 Moderadas", moderadas)
-                        else:
-                            st.metric("🟡 Moderadas", "N/A")
+                        st.metric("🟡 Moderadas", int(severidad['Moderada']))
                     with col_met4:
-                        if col_severidad in df_filtrado.columns:
-                            graves = len(df_filtrado[df_filtrado[col_severidad].str.contains('Grave', case=False, na=False)])
-                            st.metric("🔴 Graves", graves)
-                        else:
-                            st.metric("🔴 Graves", "N/A")
+                        st.metric("🔴 Graves", int(severidad['Grave'] + severidad['Muy grave']))
                     
                     # Tabla de datos
                     st.dataframe(df_filtrado, use_container_width=True, height=400)
@@ -2,11 +2,18 @@ import streamlit as st
 import pandas as pd
 import requests
 import os
+import hashlib
 import json
+import time
+import threading
 import gspread
 from google.oauth2.service_account import Credentials
 from datetime import datetime
 
+from .indice_contexto import IndiceBM25, construir_contexto, construir_fragmentos
+from .herramientas_bot import enrutar_pregunta, ejecutar_herramienta, resultado_a_texto
+from .cache_respuestas import CacheRespuestas, huella_historial, normalizar_pregunta
+
 # Configuración de página si se ejecuta directo
 def check_standalone():
     try:
@@ -58,70 +65,322 @@ def get_gspread_client():
 # ==========================================
 # CARGA DE DATOS
 # ==========================================
-@st.cache_data(ttl=3600)
-def load_all_data():
-    """Carga y consolida datos de todas las áreas"""
+# Cada cuánto el hilo de fondo vuelve a descargar las hojas y reconstruir el índice
+INTERVALO_REFRESCO = 45 * 60
+
+def descargar_datos_club():
+    """
+    Descarga los DataFrames de todas las áreas.
+    Devuelve {'jugadores', 'medica', 'fisica': DataFrame, 'errores': [str],
+    'fallidas': [nombre de cada hoja que no se pudo leer], 'cargado': str, 'version': str}
+    """
+    datos = {
+        'jugadores': pd.DataFrame(),
+        'medica': pd.DataFrame(),
+        'fisica': pd.DataFrame(),
+        'errores': [],
+        'fallidas': [],
+        'cargado': datetime.now().isoformat(timespec='seconds'),
+    }
+    
     client = get_gspread_client()
     if not client:
-        return "No se pudieron cargar credenciales."
-
-    context_text = "INFORMACIÓN ACTUAL DEL CLUB:\n\n"
+        datos['errores'].append("No se pudieron cargar credenciales.")
+        datos['fallidas'] = ['jugadores', 'medica', 'fisica']
+        datos['version'] = version_datos_club(datos)
+        return datos
 
+    # 1. MÓDULO ADMINISTRACIÓN (Jugadores)
+    # ID: 1Lb-ngyjQQH-CFrrLJMvaVrknTWoGliEyr1-tZAFtQuw
     try:
-        # 1. MÓDULO ADMINISTRACIÓN (Jugadores)
-        # ID: 1Lb-ngyjQQH-CFrrLJMvaVrknTWoGliEyr1-tZAFtQuw
         sheet_admin = client.open_by_key("1Lb-ngyjQQH-CFrrLJMvaVrknTWoGliEyr1-tZAFtQuw")
         ws_jugadores = sheet_admin.worksheet("Jugadores_Maestro")
-        data_jugadores = ws_jugadores.get_all_records()
-        df_jugadores = pd.DataFrame(data_jugadores)
-        
-        context_text += f"=== BASE DE JUGADORES ({len(df_jugadores)} registros) ===\n"
-        # Resumen simplificado para no saturar tokens
-        if not df_jugadores.empty:
-            summary = df_jugadores[['Nombre', 'Apellido', 'Posicion', 'Categoria', 'Estado']].to_string(index=False)
-            context_text += summary + "\n\n"
-        
-        # 2. ÁREA MÉDICA
-        # ID: 1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ (Default en area_medica.py)
-        try:
-            sheet_medica = client.open_by_key("1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ")
-            ws_medica = sheet_medica.get_worksheet(0) # Primera hoja
-            data_medica = ws_medica.get_all_records()
-            df_medica = pd.DataFrame(data_medica)
-            
-            context_text += f"=== REGISTRO MÉDICO/LESIONES ({len(df_medica)} casos) ===\n"
-            if not df_medica.empty:
-                # Filtrar columnas relevantes si existen
-                cols_med = [c for c in ['Nombre del Paciente', 'Diagnóstico', 'Severidad de la lesión', 'Fecha de la lesión', 'Estado'] if c in df_medica.columns]
-                context_text += df_medica[cols_med].to_string(index=False) + "\n\n"
-        except Exception as e:
-            context_text += f"Error cargando Área Médica: {str(e)}\n\n"
-
-        # 3. ÁREA FÍSICA
-        # ID: 1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI
+        datos['jugadores'] = pd.DataFrame(ws_jugadores.get_all_records())
+    except Exception as e:
+        datos['errores'].append(f"Error cargando Jugadores: {str(e)}")
+        datos['fallidas'].append('jugadores')
+    
+    # 2. ÁREA MÉDICA
+    # ID: 1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ (Default en area_medica.py)
+    try:
+        sheet_medica = client.open_by_key("1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ")
+        ws_medica = sheet_medica.get_worksheet(0) # Primera hoja
+        datos['medica'] = pd.DataFrame(ws_medica.get_all_records())
+    except Exception as e:
+        datos['errores'].append(f"Error cargando Área Médica: {str(e)}")
+        datos['fallidas'].append('medica')
+
+    # 3. ÁREA FÍSICA
+    # ID: 1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI
+    try:
+        sheet_fisica = client.open_by_key("1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI")
+        # Buscar hoja "Base Test"
         try:
-            sheet_fisica = client.open_by_key("1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI")
-            # Buscar hoja "Base Test"
+            ws_fisica = sheet_fisica.worksheet("Base Test")
+        except:
+            ws_fisica = sheet_fisica.get_worksheet(0)
+        datos['fisica'] = pd.DataFrame(ws_fisica.get_all_records())
+    except Exception as e:
+        datos['errores'].append(f"Error cargando Área Física: {str(e)}")
+        datos['fallidas'].append('fisica')
+
+    datos['version'] = version_datos_club(datos)
+    return datos
+
+def version_datos_club(datos):
+    """Huella del contenido de las tres hojas, en orden de filas: cambia si cambian o se reordenan los datos"""
+    partes = []
+    for nombre in ('jugadores', 'medica', 'fisica'):
+        df = datos[nombre]
+        if df.empty:
+            partes.append("0")
+            continue
+        huella = hashlib.sha1('|'.join(map(str, df.columns)).encode('utf-8'))
+        huella.update(pd.util.hash_pandas_object(df.astype(str), index=True).to_numpy().tobytes())
+        partes.append(f"{len(df)}:{huella.hexdigest()}")
+    return '-'.join(partes)
+
+def preparar_contexto_club(anterior=None):
+    """
+    Datos del club + índice BM25; si la versión no cambió reutiliza el índice anterior.
+    Las hojas que no se pudieron leer conservan la tabla de la instantánea anterior.
+    """
+    datos = descargar_datos_club()
+    if anterior is not None and datos['fallidas']:
+        for nombre in datos['fallidas']:
+            datos[nombre] = anterior[nombre]
+        datos['version'] = version_datos_club(datos)
+    if anterior is not None and anterior['version'] == datos['version']:
+        datos['indice'] = anterior['indice']
+    else:
+        fragmentos = construir_fragmentos(datos['jugadores'], datos['medica'], datos['fisica'])
+        datos['indice'] = IndiceBM25(fragmentos)
+    return datos
+
+class RefrescadorDatosClub:
+    """
+    Mantiene una instantánea de los datos del club y su índice, y la renueva en
+    un hilo de fondo cada `intervalo` segundos. La instantánea nueva se publica
+    reemplazando una sola referencia, así cada sesión ve la versión anterior
+    completa o la nueva completa, y la toma en su próxima pregunta sin esperar
+    la descarga. Si falla la lectura de alguna hoja se conserva su tabla anterior.
+    """
+
+    def __init__(self, preparar, intervalo=INTERVALO_REFRESCO):
+        self._preparar = preparar
+        self.intervalo = intervalo
+        self._datos = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = None
+        self.ultimo_error = None
+        self.ultimo_refresco = None
+
+    def actual(self):
+        """Instantánea vigente; solo la primera llamada del proceso espera la carga"""
+        if self._datos is None:
+            self.refrescar()
+        self.iniciar()
+        return self._datos
+
+    def refrescar(self):
+        """Recarga ahora y publica el resultado (un refresco a la vez)"""
+        with self._lock:
             try:
-                ws_fisica = sheet_fisica.worksheet("Base Test")
-            except:
-                ws_fisica = sheet_fisica.get_worksheet(0)
-                
-            data_fisica = ws_fisica.get_all_records()
-            df_fisica = pd.DataFrame(data_fisica)
+                nuevos = self._preparar(self._datos)
+            except Exception as e:
+                self.ultimo_error = f"{datetime.now():%H:%M:%S} {e}"
+                if self._datos is None:
+                    raise
+                return self._datos
+            self._datos = nuevos
+            self.ultimo_error = (
+                f"{datetime.now():%H:%M:%S} " + " | ".join(nuevos['errores']) if nuevos['errores'] else None
+            )
+            self.ultimo_refresco = time.time()
+            return self._datos
+
+    def iniciar(self):
+        """Arranca el hilo de fondo si no está corriendo"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="refresco-datos-club", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            self.refrescar()
+
+@st.cache_resource(show_spinner=False)
+def obtener_refrescador():
+    """Refrescador único del proceso, compartido por todas las sesiones"""
+    return RefrescadorDatosClub(preparar_contexto_club)
+
+def load_club_data():
+    """Instantánea vigente de los datos del club (incluye 'indice')"""
+    return obtener_refrescador().actual()
+
+# ==========================================
+# CLIENTE OLLAMA (STREAMING)
+# ==========================================
+# Segundos para conectar y máximo de silencio entre dos fragmentos del stream
+OLLAMA_TIMEOUT_CONEXION = 5
+OLLAMA_TIMEOUT_LECTURA = 120
+# Tope total por respuesta (configurable desde la barra lateral)
+OLLAMA_TIEMPO_MAXIMO = 300
+# Tiempo que Ollama mantiene el modelo cargado en memoria entre preguntas
+OLLAMA_KEEP_ALIVE = "30m"
+# Mensajes previos del chat que se reenvían como máximo; al pasarse se descartan
+# los más viejos de a bloques, así el inicio del historial no se mueve en cada turno.
+# El bloque es par (pregunta + respuesta) para que el historial empiece por el usuario
+HISTORIAL_MAX_MENSAJES = 10
+HISTORIAL_BLOQUE = 4
+
+# Instrucciones fijas: siempre idénticas para que Ollama reutilice su caché KV
+SYSTEM_PROMPT = """Eres el asistente virtual oficial del Club Universitario de La Plata.
+Tu misión es ayudar al cuerpo técnico y directivos respondiendo preguntas basadas en los datos del club.
+
+INSTRUCCIONES:
+- Responde de forma amable, profesional y concisa.
+- Usa solo los DATOS DISPONIBLES que acompañan cada pregunta.
+- Si la respuesta está en los datos, cítala.
+- Si los datos son el resultado de una CONSULTA, redacta exactamente esos resultados sin agregar ni quitar jugadores ni valores.
+- Si no encuentras la información, dilo honestamente.
+- Formatea la respuesta usando Markdown (tablas, listas, negritas) para que sea legible."""
+
+class ErrorOllama(Exception):
+    """Respuesta de error del servidor Ollama"""
+
+@st.cache_resource
+def obtener_cache_respuestas():
+    """Caché de respuestas compartido por todas las sesiones"""
+    return CacheRespuestas()
+
+@st.cache_resource
+def obtener_sesion_ollama():
+    """Sesión HTTP compartida: reutiliza conexiones TCP (keep-alive) entre preguntas"""
+    sesion = requests.Session()
+    adaptador = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+def historial_enviado(historial):
+    """
+    Mensajes previos del chat que acompañan la pregunta (roles y textos).
+    El recorte arranca en un múltiplo de HISTORIAL_BLOQUE: entre un descarte y el
+    siguiente el primer mensaje enviado es el mismo y solo se agregan al final.
+    """
+    inicio = max(0, len(historial) - HISTORIAL_MAX_MENSAJES)
+    inicio = -(-inicio // HISTORIAL_BLOQUE) * HISTORIAL_BLOQUE
+    return [
+        {"role": m["role"], "content": m["content"]}
+        for m in historial[inicio:]
+    ]
+
+def construir_mensajes_chat(historial, pregunta, data_context):
+    """
+    Mensajes para /api/chat: system fijo + historial reciente + pregunta actual.
+    El contexto recuperado va solo en el último mensaje y el historial se recorta
+    de a bloques (ver historial_enviado), así salvo en el turno en que se descarta
+    un bloque todo lo anterior es un prefijo idéntico al del turno previo y el
+    servidor puede reutilizar su caché.
+    """
+    previos = historial_enviado(historial)
+    actual = f"DATOS DISPONIBLES:\n{data_context}\n\nPREGUNTA DEL USUARIO:\n{pregunta}"
+    return [{"role": "system", "content": SYSTEM_PROMPT}] + previos + [{"role": "user", "content": actual}]
+
+def stream_ollama(ollama_url, payload, estado=None, tiempo_maximo=OLLAMA_TIEMPO_MAXIMO):
+    """
+    Generador de texto sobre el stream NDJSON de /api/chat.
+    Cada línea es un JSON con 'message.content' (fragmento) y 'done'; la última trae
+    las métricas del modelo, que se guardan en `estado['final']`. El texto acumulado
+    se va guardando en `estado['texto']` para poder conservarlo si se cancela.
+    Al cerrar el generador (cancelación o error) se corta la conexión y Ollama
+    deja de generar.
+    """
+    estado = estado if estado is not None else {}
+    estado['texto'] = ''
+    inicio = time.monotonic()
+    
+    response = obtener_sesion_ollama().post(
+        f"{ollama_url}/api/chat",
+        json={"keep_alive": OLLAMA_KEEP_ALIVE, **payload, "stream": True},
+        stream=True,
+        timeout=(OLLAMA_TIMEOUT_CONEXION, OLLAMA_TIMEOUT_LECTURA)
+    )
+    try:
+        if response.status_code != 200:
+            raise ErrorOllama(f"Error Ollama ({response.status_code}): {response.text}")
+        
+        for linea in response.iter_lines():
+            if not linea:
+                continue
+            fragmento = json.loads(linea)
+            if fragmento.get('error'):
+                raise ErrorOllama(fragmento['error'])
+            
+            texto = fragmento.get('message', {}).get('content', '')
+            if texto:
+                if 'primer_token' not in estado:
+                    estado['primer_token'] = time.monotonic() - inicio
+                estado['texto'] += texto
+                yield texto
             
-            context_text += f"=== DATOS FÍSICOS/TESTS ({len(df_fisica)} registros) ===\n"
-            if not df_fisica.empty:
-                # Seleccionar columnas clave
-                cols_fis = [c for c in ['Nombre y Apellido', 'Test', 'valor', 'unidad', 'Fecha'] if c in df_fisica.columns]
-                context_text += df_fisica[cols_fis].head(100).to_string(index=False) + "\n(Limitado a los primeros 100 registros físicos por espacio)\n\n"
-        except Exception as e:
-            context_text += f"Error cargando Área Física: {str(e)}\n\n"
+            if fragmento.get('done'):
+                estado['final'] = fragmento
+                break
             
-        return context_text
+            if time.monotonic() - inicio > tiempo_maximo:
+                # El aviso lo muestra la interfaz; no forma parte de la respuesta
+                estado['cortada'] = True
+                break
+    finally:
+        response.close()
 
-    except Exception as e:
-        return f"Error general cargando datos: {str(e)}"
+def formatear_metricas_ollama(estado):
+    """Resumen de tiempos: evaluación del prompt vs. generación (duraciones de Ollama en ns)"""
+    final = estado.get('final') or {}
+    partes = []
+    if 'primer_token' in estado:
+        partes.append(f"primer token {estado['primer_token']:.2f} s")
+    if final.get('prompt_eval_duration') is not None:
+        partes.append(
+            f"prompt {final.get('prompt_eval_count', 0)} tokens en {final['prompt_eval_duration'] / 1e9:.2f} s"
+        )
+    if final.get('eval_duration'):
+        segundos = final['eval_duration'] / 1e9
+        partes.append(
+            f"generación {final.get('eval_count', 0)} tokens en {segundos:.2f} s "
+            f"({final.get('eval_count', 0) / segundos:.1f} tok/s)"
+        )
+    if final.get('load_duration'):
+        partes.append(f"carga del modelo {final['load_duration'] / 1e9:.2f} s")
+    return "⏱️ " + " · ".join(partes) if partes else ""
+
+def cancelar_respuesta():
+    """Callback del botón cancelar: conserva lo generado hasta el momento"""
+    parcial = st.session_state.get('respuesta_en_curso', {}).get('texto', '')
+    if parcial:
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": parcial + "\n\n_⏹️ Respuesta cancelada._"
+        })
+    st.session_state.respuesta_en_curso = {}
+
+def mostrar_fuentes(consulta, tabla_consulta, resultados):
+    """Expander con la consulta ejecutada o los fragmentos usados como contexto"""
+    if consulta:
+        with st.expander(f"🔎 Consulta `{consulta[0]}` ({len(tabla_consulta)} resultados)"):
+            st.dataframe(tabla_consulta, use_container_width=True, hide_index=True)
+    elif resultados:
+        with st.expander(f"📚 Contexto usado ({len(resultados)} fragmentos)"):
+            for doc, puntaje in resultados:
+                st.caption(f"{doc['titulo']} · relevancia {puntaje:.2f}")
 
 # ==========================================
 # INTERFAZ PRINCIPAL
@@ -148,6 +407,32 @@ def main_bot():
         st.markdown("---")
         st.caption("Asegúrate de tener Ollama corriendo (`ollama serve`) y el modelo descargado (`ollama pull llama3.1`).")
 
+        # Cantidad de fragmentos de contexto enviados al modelo
+        top_k = st.slider("Fragmentos de contexto por pregunta", min_value=2, max_value=20, value=8)
+        # Consultas exactas (lesionados, rankings, plantel) antes de la búsqueda libre
+        usar_herramientas = st.checkbox("Usar consultas estructuradas", value=True)
+        # Preguntas repetidas: respuesta guardada mientras no cambien los datos
+        usar_cache = st.checkbox("Usar caché de respuestas", value=True)
+        cache_respuestas = obtener_cache_respuestas()
+        st.caption(
+            f"🗃️ Caché: {len(cache_respuestas)} respuestas · "
+            f"{cache_respuestas.aciertos} aciertos / {cache_respuestas.fallos} fallos"
+        )
+        if st.button("🧹 Vaciar caché de respuestas"):
+            cache_respuestas.vaciar()
+
+        # Datos del club: se renuevan solos en segundo plano
+        refrescador = obtener_refrescador()
+        if st.button("🔄 Recargar datos del club"):
+            with st.spinner("Descargando hojas..."):
+                refrescador.refrescar()
+        if refrescador.ultimo_error:
+            st.caption(f"⚠️ Último refresco fallido: {refrescador.ultimo_error}")
+        tiempo_maximo = st.number_input(
+            "Tiempo máximo de respuesta (s)", min_value=10, max_value=1800,
+            value=OLLAMA_TIEMPO_MAXIMO, step=10
+        )
+        
         # Verificación rápida de conexión (opcional)
         status_placeholder = st.empty()
         
@@ -160,14 +445,20 @@ def main_bot():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
-    # --- Cargar Contexto ---
-    if "data_context" not in st.session_state:
-        with st.spinner("🔄 Conectando con las bases de datos del club..."):
-            st.session_state.data_context = load_all_data()
-            if "Error" not in st.session_state.data_context:
-                st.success("✅ Datos cargados correctamente en la memoria del agente.")
-            else:
-                st.error("⚠️ Hubo problemas cargando algunos datos.")
+    # --- Cargar Datos e Índice de Contexto ---
+    with st.spinner("🔄 Conectando con las bases de datos del club..."):
+        datos_club = load_club_data()
+        indice = datos_club['indice']
+    st.sidebar.caption(
+        f"📦 Datos cargados {datos_club['cargado'].replace('T', ' ')} · "
+        f"refresco automático cada {INTERVALO_REFRESCO // 60} min"
+    )
+    if "data_context_status" not in st.session_state:
+        st.session_state.data_context_status = True
+        if not datos_club['errores']:
+            st.success(f"✅ Datos indexados en la memoria del agente ({len(indice.documentos)} fragmentos).")
+        else:
+            st.error("⚠️ Hubo problemas cargando algunos datos: " + " | ".join(datos_club['errores']))
 
     # --- Mostrar Chat ---
     for message in st.session_state.messages:
@@ -183,48 +474,87 @@ def main_bot():
 
         # 2. Generar respuesta
         with st.chat_message("assistant"):
-            with st.spinner(f"Pensando con {selected_model}..."):
-                try:
-                    # Construir prompt con contexto
-                    full_prompt = f"""
-                    Eres el asistente virtual oficial del Club Universitario de La Plata.
-                    Tu misión es ayudar al cuerpo técnico y directivos respondiendo preguntas basadas en los datos del club.
-                    
-                    DATOS DISPONIBLES:
-                    {st.session_state.data_context}
-                    
-                    PREGUNTA DEL USUARIO:
-                    {prompt}
-                    
-                    INSTRUCCIONES:
-                    - Responde de forma amable, profesional y concisa.
-                    - Si la respuesta está en los datos, cítala.
-                    - Si no encuentras la información, dilo honestamente.
-                    - Formatea la respuesta usando Markdown (tablas, listas, negritas) para que sea legible.
-                    """
-                    
-                    # Llamada a Ollama API
+            try:
+                with st.spinner("Buscando datos relevantes..."):
+                    # 1) Consulta determinista si la pregunta coincide con una herramienta;
+                    # 2) si no, fragmentos BM25 relevantes para la pregunta
+                    resultados = []
+                    tabla_consulta = None
+                    consulta = enrutar_pregunta(prompt, datos_club) if usar_herramientas else None
+                    if consulta:
+                        herramienta, argumentos = consulta
+                        tabla_consulta = ejecutar_herramienta(herramienta, datos_club, **argumentos)
+                        data_context = resultado_a_texto(herramienta, argumentos, tabla_consulta)
+                    else:
+                        resultados = indice.buscar(prompt, k=top_k)
+                        data_context = construir_contexto(resultados) or "No se encontraron datos del club relacionados con la pregunta."
+                
+                # Respuesta guardada para la misma pregunta, modelo, versión de datos e
+                # historial (una repregunta como "¿y en M19?" depende de la conversación)
+                clave_cache = CacheRespuestas.clave(
+                    normalizar_pregunta(prompt, consulta), selected_model, datos_club['version'],
+                    '' if consulta else f"k{top_k}",
+                    huella_historial(historial_enviado(st.session_state.messages[:-1]))
+                )
+                entrada_cache = cache_respuestas.obtener(clave_cache) if usar_cache else None
+                if entrada_cache:
+                    response_text = entrada_cache['respuesta']
+                    st.markdown(response_text)
+                    antiguedad = (time.time() - entrada_cache['guardada']) / 60
+                    st.caption(f"⚡ Respuesta desde caché (generada hace {antiguedad:.0f} min con los datos actuales)")
+                    mostrar_fuentes(consulta, tabla_consulta, resultados)
+                    st.session_state.messages.append({"role": "assistant", "content": response_text})
+                else:
+                    # Llamada a Ollama API (/api/chat con prefijo estable + streaming)
                     payload = {
                         "model": selected_model,
-                        "prompt": full_prompt,
-                        "stream": False
+                        "messages": construir_mensajes_chat(
+                            st.session_state.messages[:-1], prompt, data_context
+                        )
                     }
-                    
+                
+                    # Cancelar = rerun de Streamlit: corta este script, cierra el stream y el
+                    # callback guarda el texto parcial en el historial
+                    st.session_state.respuesta_en_curso = {}
+                    boton_cancelar = st.empty()
+                    boton_cancelar.button("⏹️ Cancelar respuesta", key="cancelar_respuesta", on_click=cancelar_respuesta)
+                
                     try:
-                        response = requests.post(f"{ollama_url}/api/generate", json=payload)
-                        if response.status_code == 200:
-                            response_text = response.json().get('response', "⚠️ La respuesta vino vacía.")
+                        response_text = st.write_stream(
+                            stream_ollama(ollama_url, payload, st.session_state.respuesta_en_curso, tiempo_maximo)
+                        )
+                        boton_cancelar.empty()
+                        if not response_text:
+                            response_text = "⚠️ La respuesta vino vacía."
                             st.markdown(response_text)
-                            st.session_state.messages.append({"role": "assistant", "content": response_text})
-                        else:
-                            st.error(f"Error Ollama ({response.status_code}): {response.text}")
+                        if st.session_state.respuesta_en_curso.get('cortada'):
+                            st.warning(f"⏱️ Respuesta cortada: superó el tiempo máximo de {tiempo_maximo} s.")
+                        metricas = formatear_metricas_ollama(st.session_state.respuesta_en_curso)
+                        if metricas:
+                            st.caption(metricas)
+                        mostrar_fuentes(consulta, tabla_consulta, resultados)
+                        st.session_state.messages.append({"role": "assistant", "content": response_text})
+                        estado_final = st.session_state.respuesta_en_curso
+                        if usar_cache and estado_final.get('final') and not estado_final.get('cortada'):
+                            cache_respuestas.guardar(clave_cache, response_text)
+                    except ErrorOllama as err:
+                        boton_cancelar.empty()
+                        st.error(str(err))
                     except requests.exceptions.ConnectionError:
+                        boton_cancelar.empty()
                         st.error(f"❌ No se pudo conectar a Ollama en {ollama_url}. \n\nAsegurate de:\n1. Tener [Ollama](https://ollama.com/) instalado.\n2. Estar ejecutando la aplicación (`ollama serve`).\n3. Haber descargado el modelo (ej: `ollama pull {selected_model}`).")
+                    except requests.exceptions.Timeout:
+                        boton_cancelar.empty()
+                        st.error(f"⏱️ Ollama no respondió a tiempo (conexión {OLLAMA_TIMEOUT_CONEXION} s / {OLLAMA_TIMEOUT_LECTURA} s sin datos).")
                     except Exception as req_err:
-                         st.error(f"Error en la petición: {req_err}")
+                        boton_cancelar.empty()
+                        st.error(f"Error en la petición: {req_err}")
+                    # Sin `finally`: al cancelar, el rerun de Streamlit (BaseException) corta
+                    # el script aquí y el texto parcial queda para cancelar_respuesta
+                    st.session_state.respuesta_en_curso = {}
 
-                except Exception as e:
-                    st.error(f"Error generando respuesta: {e}")
+            except Exception as e:
+                st.error(f"Error generando respuesta: {e}")
 
     # Botón limpiar historial
     if len(st.session_state.messages) > 0:
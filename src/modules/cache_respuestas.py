@@ -0,0 +1,89 @@
+"""
+Caché de Respuestas del Asistente AI - Club Universitario de La Plata
+Guarda las respuestas completas del modelo por (pregunta normalizada, modelo,
+versión de los datos, historial enviado). Las preguntas repetidas se responden al instante; cuando
+cambian las hojas cambia la versión y las entradas viejas dejan de usarse.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .indice_contexto import tokenizar
+
+# Vida de una respuesta cacheada (segundos) y cantidad máxima de entradas
+TTL_RESPUESTAS = 6 * 3600
+MAX_RESPUESTAS = 256
+
+
+def normalizar_pregunta(pregunta, consulta=None):
+    """
+    Clave semántica de la pregunta:
+    - si la respondió una herramienta, la herramienta y sus argumentos
+      ('¿Qué jugadores están lesionados?' == 'lesionados actuales');
+    - si no, sus tokens normalizados sin orden, tildes, plurales ni stopwords.
+    """
+    if consulta:
+        herramienta, argumentos = consulta
+        return 'herramienta:' + herramienta + ':' + json.dumps(argumentos, sort_keys=True, default=str)
+    return 'texto:' + ' '.join(sorted(set(tokenizar(pregunta))))
+
+
+def huella_historial(mensajes):
+    """Huella de los mensajes previos enviados al modelo ('' sin historial)"""
+    if not mensajes:
+        return ''
+    contenido = json.dumps([[m['role'], m['content']] for m in mensajes], ensure_ascii=False)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+
+class CacheRespuestas:
+    """
+    Caché LRU con vencimiento, compartido entre sesiones (thread-safe).
+    Al guardar una versión de datos nueva descarta las entradas de versiones anteriores.
+    """
+
+    def __init__(self, ttl=TTL_RESPUESTAS, max_entradas=MAX_RESPUESTAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    @staticmethod
+    def clave(pregunta_normalizada, modelo, version, variante='', historial=''):
+        """`historial`: huella_historial de la conversación previa que acompaña la pregunta"""
+        return (pregunta_normalizada, modelo, version, variante, historial)
+
+    def obtener(self, clave):
+        """Entrada {'respuesta', 'guardada', ...} o None si no existe o venció"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or time.time() - entrada['guardada'] > self.ttl:
+                self._entradas.pop(clave, None)
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada
+
+    def guardar(self, clave, respuesta, **extra):
+        version = clave[2]
+        with self._lock:
+            # Datos nuevos: las respuestas de versiones anteriores ya no son válidas
+            for vieja in [c for c in self._entradas if c[2] != version]:
+                del self._entradas[vieja]
+            self._entradas[clave] = {'respuesta': respuesta, 'guardada': time.time(), **extra}
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def vaciar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self):
+        return len(self._entradas)
@@ -0,0 +1,141 @@
+"""
+Catálogo de Tests Físicos y Posiciones - Club Universitario de La Plata
+Asigna a cada registro un ID de test canónico y un grupo de posición (Forwards/Backs)
+con expresiones regulares compiladas una sola vez al importar el módulo.
+"""
+
+import re
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# DEFINICIÓN DEL CATÁLOGO
+# ==========================================
+
+SIN_TEST = 0
+SIN_GRUPO = 0
+GRUPO_FORWARDS = 1
+GRUPO_BACKS = 2
+
+# ID canónico -> (nombre visible, palabras clave sin tildes y en minúsculas)
+CATALOGO_TESTS = {
+    1: ('Banco Plano', ['banco plano', 'pecho', 'banca']),
+    2: ('Dominadas', ['dominadas', 'pullup', 'pull up']),
+    3: ('Test Bronco', ['bronco', 'test bronco']),
+}
+
+# ID de grupo -> (nombre visible, palabras clave de posiciones)
+CATALOGO_GRUPOS = {
+    GRUPO_FORWARDS: ('Forwards', ['pilar', 'hooker', 'segunda linea', 'tercera linea', 'octavo']),
+    GRUPO_BACKS: ('Backs', ['medio scrum', 'apertura', 'centro', 'wing', 'fullback']),
+}
+
+# Columnas de posición usadas en las distintas hojas del club
+COLUMNAS_POSICION = ['Posición del jugador', 'Posicion', 'Posición', 'posicion']
+
+
+def _compilar(palabras_clave):
+    """Compila una lista de palabras clave en una única expresión alternada"""
+    return re.compile('|'.join(re.escape(kw) for kw in palabras_clave))
+
+
+# Matchers compilados una sola vez
+_MATCHERS_TESTS = {test_id: _compilar(kws) for test_id, (_, kws) in CATALOGO_TESTS.items()}
+_MATCHERS_GRUPOS = {grupo_id: _compilar(kws) for grupo_id, (_, kws) in CATALOGO_GRUPOS.items()}
+
+
+# ==========================================
+# CLASIFICACIÓN VECTORIZADA
+# ==========================================
+
+def normalizar_texto(serie):
+    """Pasa una columna a minúsculas y sin tildes (vectorizado)"""
+    return (
+        serie.fillna('').astype(str).str.lower()
+        .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+    )
+
+
+def clasificar_tests(test_serie, subtest_serie=None):
+    """
+    Devuelve un array de IDs canónicos de test (SIN_TEST si no coincide).
+    El Subtest tiene prioridad sobre el Test, igual que en el panel 360.
+    """
+    test_txt = normalizar_texto(test_serie)
+    condiciones = []
+    valores = []
+
+    if subtest_serie is not None:
+        subtest_txt = normalizar_texto(subtest_serie)
+        for test_id, patron in _MATCHERS_TESTS.items():
+            condiciones.append(subtest_txt.str.contains(patron).to_numpy())
+            valores.append(test_id)
+
+    for test_id, patron in _MATCHERS_TESTS.items():
+        condiciones.append(test_txt.str.contains(patron).to_numpy())
+        valores.append(test_id)
+
+    return np.select(condiciones, valores, default=SIN_TEST).astype(np.int8)
+
+
+def clasificar_posiciones(posicion_serie):
+    """Devuelve un array con el ID de grupo (Forwards/Backs) de cada posición"""
+    posicion_txt = normalizar_texto(posicion_serie)
+    condiciones = [posicion_txt.str.contains(patron).to_numpy() for patron in _MATCHERS_GRUPOS.values()]
+    return np.select(condiciones, list(_MATCHERS_GRUPOS.keys()), default=SIN_GRUPO).astype(np.int8)
+
+
+def buscar_columna_posicion(df):
+    """Busca la columna de posición usada por la hoja"""
+    for col in COLUMNAS_POSICION:
+        if col in df.columns:
+            return col
+    return None
+
+
+def asignar_codigos(df, test_col='Test', subtest_col='Subtest'):
+    """
+    Agrega las columnas enteras 'test_id' y 'grupo_id' al DataFrame.
+    Pensado para llamarse una vez al cargar la hoja; los filtros y paneles
+    trabajan luego sobre estos códigos en lugar de buscar texto fila por fila.
+    """
+    if df is None or df.empty:
+        return df
+
+    if test_col in df.columns:
+        subtest = df[subtest_col] if subtest_col in df.columns else None
+        df['test_id'] = clasificar_tests(df[test_col], subtest)
+    else:
+        df['test_id'] = np.int8(SIN_TEST)
+
+    posicion_col = buscar_columna_posicion(df)
+    if posicion_col:
+        df['grupo_id'] = clasificar_posiciones(df[posicion_col])
+    else:
+        df['grupo_id'] = np.int8(SIN_GRUPO)
+
+    return df
+
+
+def grupo_posicion_categorico(grupo_ids):
+    """Convierte los IDs de grupo en un Categorical ('Sin grupo', 'Forwards', 'Backs')"""
+    categorias = ['Sin grupo'] + [nombre for nombre, _ in CATALOGO_GRUPOS.values()]
+    return pd.Categorical.from_codes(np.asarray(grupo_ids, dtype=np.int8), categories=categorias)
+
+
+def nombre_test(test_id):
+    """Nombre visible de un test del catálogo"""
+    return CATALOGO_TESTS.get(test_id, ('', []))[0]
+
+
+def nombre_grupo(grupo_id):
+    """Nombre visible de un grupo de posición"""
+    return CATALOGO_GRUPOS.get(grupo_id, ('', []))[0]
+
+
+def id_grupo(nombre):
+    """ID de grupo a partir de su nombre visible ('Forwards' / 'Backs')"""
+    for grupo_id, (nombre_grupo_cat, _) in CATALOGO_GRUPOS.items():
+        if nombre_grupo_cat == nombre:
+            return grupo_id
+    return None
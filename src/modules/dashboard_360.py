@@ -26,13 +26,7 @@ def filtrar_ultimo_registro_por_jugador(df):
         return df
     
     col_dni = buscar_columna_dni(df)
-    
-    # Buscar columna de fecha
-    col_fecha = None
-    for c in ['Marca temporal', 'Fecha', 'fecha', 'Timestamp']:
-        if c in df.columns:
-            col_fecha = c
-            break
+    col_fecha = buscar_columna_fecha(df)
             
     if col_dni and col_fecha:
         df_copy = df.copy()
@@ -50,6 +44,9 @@ try:
 except ImportError:
     cargar_hoja = None
 
+from .catalogo_tests import CATALOGO_TESTS, SIN_GRUPO, SIN_TEST, asignar_codigos, clasificar_tests
+from .percentiles_fisicos import MotorPercentiles
+
 try:
     from .administracion import JugadoresMaestroManager
 except ImportError:
@@ -105,6 +102,7 @@ def obtener_df_fisica():
         sheet_id = "1sR4wWsA0_nZGS011d6QV84znTnRW4d7iS65y2oBjvYI"
         df = cargar_hoja(sheet_id, "Base Test")
         if df is not None and not df.empty:
+            df = asignar_codigos(df)
             df['origen_modulo'] = 'fisica'
             return df
         return pd.DataFrame()
@@ -134,6 +132,11 @@ def normalizar_dni(dni):
     s = re.sub(r'\D', '', s)
     return s
 
+def normalizar_dni_serie(serie):
+    """Versión vectorizada de normalizar_dni para una columna completa"""
+    s = serie.astype(str).str.strip().str.replace(r'\.0$', '', regex=True)
+    return s.str.replace(r'\D', '', regex=True)
+
 def buscar_columna_dni(df):
     """Busca columna de DNI estandarizada con limpieza de espacios"""
     # Limpiar nombres de columnas para la búsqueda
@@ -180,6 +183,12 @@ def normalizar_valor_numerico(valor):
     except:
         return None
 
+def buscar_columna_fecha(df):
+    """Busca columna de fecha estandarizada"""
+    for col in ['Marca temporal', 'Fecha', 'fecha', 'Timestamp']:
+        if col in df.columns: return col
+    return None
+
 def buscar_columna_flexible(df, palabras_clave):
     """Busca una columna que contenga todas las palabras clave (case insensitive)"""
     for col in df.columns:
@@ -993,7 +1002,101 @@ def mostrar_modulo_fisico(datos_fisicos):
     st.dataframe(datos_fisicos.drop('origen_modulo', axis=1, errors='ignore'), use_container_width=True)
 
 
-def crear_panel_areas_unificado(datos_jugador):
+@st.cache_data(show_spinner=False)
+def construir_ultimos_tests_por_jugador(df_fisica):
+    """
+    Construye la tabla "último valor por test del catálogo" de todos los jugadores.
+    Se calcula una sola vez por carga a partir de los códigos 'test_id' del catálogo
+    y queda indexada por (DNI, test_id) para que cada ficha se lea sin recorrer filas.
+    """
+    tabla_vacia = pd.DataFrame(
+        columns=['valor', 'unidad', 'test', 'subtest', 'grupo_id'],
+        index=pd.MultiIndex.from_tuples([], names=['dni', 'test_id'])
+    )
+    if df_fisica is None or df_fisica.empty:
+        return tabla_vacia
+    if 'Test' not in df_fisica.columns or 'valor' not in df_fisica.columns:
+        return tabla_vacia
+    
+    col_dni = buscar_columna_dni(df_fisica)
+    if not col_dni:
+        return tabla_vacia
+    
+    # Códigos del catálogo (asignados al cargar la hoja; se calculan acá si faltan)
+    if 'test_id' in df_fisica.columns:
+        test_ids = df_fisica['test_id'].fillna(SIN_TEST).astype(int)
+    else:
+        test_ids = clasificar_tests(df_fisica['Test'], df_fisica['Subtest'] if 'Subtest' in df_fisica.columns else None)
+    
+    # Orden cronológico: por fecha si existe, si no por orden de carga en la hoja
+    col_fecha = buscar_columna_fecha(df_fisica)
+    if col_fecha:
+        fechas = pd.to_datetime(df_fisica[col_fecha], errors='coerce', dayfirst=True)
+    else:
+        fechas = pd.Series(pd.NaT, index=df_fisica.index)
+    
+    base = pd.DataFrame({
+        'dni': normalizar_dni_serie(df_fisica[col_dni]),
+        'valor': df_fisica['valor'],
+        'unidad': df_fisica['unidad'] if 'unidad' in df_fisica.columns else None,
+        'test': df_fisica['Test'],
+        'subtest': df_fisica['Subtest'] if 'Subtest' in df_fisica.columns else '',
+        'grupo_id': df_fisica['grupo_id'].fillna(SIN_GRUPO).astype(int) if 'grupo_id' in df_fisica.columns else SIN_GRUPO,
+        'test_id': test_ids,
+        '_fecha': fechas,
+        '_orden': range(len(df_fisica))
+    }, index=df_fisica.index)
+    
+    base = base[(base['test_id'] != SIN_TEST) & (base['dni'] != '')]
+    if base.empty:
+        return tabla_vacia
+    
+    base = base.sort_values(['_fecha', '_orden'], na_position='first', kind='mergesort')
+    ultimos = base.groupby(['dni', 'test_id'], sort=False).tail(1)
+    return ultimos.set_index(['dni', 'test_id'])[['valor', 'unidad', 'test', 'subtest', 'grupo_id']].sort_index()
+
+@st.cache_resource(ttl=600, show_spinner=False)
+def construir_motor_fisico(df_fisica):
+    """Motor de percentiles sobre los tests físicos ya unificados con la Base Central"""
+    return MotorPercentiles(
+        df_fisica,
+        jugador_col=buscar_columna_jugador(df_fisica) or 'Nombre y Apellido',
+        categoria_col=buscar_columna_categoria(df_fisica) or 'Categoría'
+    )
+
+def describir_percentiles(motor, fila, categoria):
+    """Texto corto con el percentil del jugador vs categoría, grupo de posición y club"""
+    if motor is None or motor.vacio():
+        return ''
+    valor = pd.to_numeric(str(fila['valor']).replace(',', '.'), errors='coerce')
+    cohortes = [
+        ('cat.', categoria, None),
+        ('grupo', None, fila['grupo_id'] if fila['grupo_id'] != SIN_GRUPO else None),
+        ('club', None, None),
+    ]
+    partes = []
+    for etiqueta, cat, grupo in cohortes:
+        if etiqueta != 'club' and cat is None and grupo is None:
+            continue
+        p = motor.percentil(valor, fila['test'], fila['subtest'], cat, grupo)
+        if p is not None:
+            partes.append(f"P{p:.0f} {etiqueta}")
+    if not partes:
+        return ''
+    return f' <span style="color: #6c757d; font-size: 0.85em;">({" · ".join(partes)})</span>'
+
+def formatear_resultado_test(valor, unidad):
+    """Formatea el valor de un test con su unidad para el panel"""
+    valor = valor if pd.notna(valor) else 'N/A'
+    unidad = str(unidad).strip() if pd.notna(unidad) else ''
+    
+    if unidad == '"': return f"{valor}\""
+    elif unidad.lower() == 'kg': return f"{valor} kg"
+    elif 'km/h' in unidad.lower(): return f"{valor} km/h"
+    elif unidad.lower() == 's': return f"{valor} s"
+    return f"{valor} {unidad}".strip() if unidad else str(valor)
+
+def crear_panel_areas_unificado(datos_jugador, ultimos_tests=None, dni_jugador=None, motor=None):
     """Crea el panel unificado de las 3 áreas con información específica"""
     
     # Separar datos por módulo
@@ -1017,43 +1120,29 @@ def crear_panel_areas_unificado(datos_jugador):
             contenido_html += '<p style="margin: 0.5rem 0;">• <strong>Test Bronco:</strong> —</p>'
         else:
             tiene_test = 'Test' in datos_fisicos.columns
-            tiene_subtest = 'Subtest' in datos_fisicos.columns
             tiene_valor = 'valor' in datos_fisicos.columns
             tiene_unidad = 'unidad' in datos_fisicos.columns
             
             if tiene_test and tiene_valor:
-                # Mapeo específico según solicitud del usuario
-                tests_mapeo = {
-                    'Banco Plano': ['banco plano', 'pecho', 'banca'],
-                    'Dominadas': ['dominadas', 'pullup', 'pull up'], 
-                    'Test Bronco': ['bronco', 'test bronco']
-                }
+                # Tabla precalculada (último valor por test); si no se recibió, se arma solo para este jugador
+                if ultimos_tests is None:
+                    ultimos_tests = construir_ultimos_tests_por_jugador(datos_fisicos)
+                if dni_jugador is None:
+                    col_dni = buscar_columna_dni(datos_fisicos)
+                    dni_jugador = normalizar_dni(datos_fisicos[col_dni].iloc[0]) if col_dni else ''
                 
-                for test_display, keywords in tests_mapeo.items():
-                    resultado_encontrado = False
-                    
-                    # Priorizar búsqueda en SUBTEST como pidió el usuario
-                    for _, fila in datos_fisicos.iterrows():
-                        test_str = str(fila['Test']).lower() if pd.notna(fila['Test']) else ''
-                        subtest_str = str(fila['Subtest']).lower() if tiene_subtest and pd.notna(fila['Subtest']) else ''
-                        
-                        # Buscar si alguna palabra clave está en Subtest (Prioridad) o Test
-                        if any(kw in subtest_str for kw in keywords) or any(kw in test_str for kw in keywords):
-                            valor = fila['valor'] if pd.notna(fila['valor']) else 'N/A'
-                            unidad = str(fila['unidad']).strip() if tiene_unidad and pd.notna(fila['unidad']) else ''
-                            
-                            # Formatear unidad
-                            if unidad == '"': resultado = f"{valor}\""
-                            elif unidad.lower() == 'kg': resultado = f"{valor} kg"
-                            elif 'km/h' in unidad.lower(): resultado = f"{valor} km/h"
-                            elif unidad.lower() == 's': resultado = f"{valor} s"
-                            else: resultado = f"{valor} {unidad}".strip() if unidad else str(valor)
-                            
-                            contenido_html += f'<p style="margin: 0.5rem 0;">• <strong>{test_display}:</strong> {resultado}</p>'
-                            resultado_encontrado = True
-                            break
-                    
-                    if not resultado_encontrado:
+                col_cat = buscar_columna_categoria(datos_jugador)
+                categorias_jugador = datos_jugador[col_cat].dropna() if col_cat else pd.Series(dtype=object)
+                categoria_jugador = categorias_jugador.iloc[0] if not categorias_jugador.empty else None
+                
+                for test_id, (test_display, _) in CATALOGO_TESTS.items():
+                    clave = (dni_jugador, test_id)
+                    if clave in ultimos_tests.index:
+                        fila = ultimos_tests.loc[clave]
+                        resultado = formatear_resultado_test(fila['valor'], fila['unidad'] if tiene_unidad else None)
+                        resultado += describir_percentiles(motor, fila, categoria_jugador)
+                        contenido_html += f'<p style="margin: 0.5rem 0;">• <strong>{test_display}:</strong> {resultado}</p>'
+                    else:
                         contenido_html += f'<p style="margin: 0.5rem 0;">• <strong>{test_display}:</strong> —</p>'
             else:
                 contenido_html += '<p style="margin: 0.5rem 0;">• <strong>Banco Plano:</strong> —</p>'
@@ -1268,7 +1357,11 @@ def panel_profesional_jugador():
     st.divider()
     
     # ÁREA DE SEGUIMIENTO (ANCHO COMPLETO DEBAJO DE LA FICHA)
-    crear_panel_areas_unificado(datos_jugador)
+    df_fisica = df_combinado[df_combinado['origen_modulo'] == 'fisica']
+    ultimos_tests = construir_ultimos_tests_por_jugador(df_fisica)
+    motor = construir_motor_fisico(df_fisica)
+    dni_seleccionado = normalizar_dni(extraer_dni_de_seleccion(jugador_seleccionado))
+    crear_panel_areas_unificado(datos_jugador, ultimos_tests, dni_seleccionado or None, motor)
     
     # Footer con información adicional
     st.divider()
@@ -0,0 +1,278 @@
+"""
+Tablero de Disponibilidad - Club Universitario de La Plata
+¿Quién puede entrenar hoy? Cruza Jugadores_Maestro con el último estado médico
+y la asistencia del día en una sola pasada vectorizada (merge + groupby).
+"""
+
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .dashboard_360 import normalizar_dni_serie
+from .reportemedico import COLUMNAS_FECHA_MEDICA, parsear_fechas_medicas
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+
+SHEET_ID_MEDICO = '1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ'
+HOJA_ASISTENCIAS = 'Asistencias'
+
+COL_PUEDE_ENTRENAR = '¿Puede participar en entrenamientos?'
+
+# Respuesta del formulario médico -> estado de entrenamiento
+ESTADOS_MEDICOS = {
+    'si': 'Activo',
+    'sí': 'Activo',
+    'solo con entrenamiento diferenciado': 'Diferenciado',
+    'no': 'Inactivo',
+}
+
+# Disponibilidad final (en orden de prioridad de la regla)
+APTO = 'Apto'
+DIFERENCIADO = 'Diferenciado'
+NO_APTO = 'No apto'
+BAJA = 'Baja'
+ORDEN_DISPONIBILIDAD = [APTO, DIFERENCIADO, NO_APTO, BAJA]
+
+ICONOS_DISPONIBILIDAD = {APTO: '✅', DIFERENCIADO: '🟡', NO_APTO: '🔴', BAJA: '⚫'}
+
+# Estado del maestro (administracion.py) que decide la disponibilidad por sí solo
+ESTADOS_MAESTRO_BAJA = ['inactivo', 'baja', 'suspendido']
+ESTADOS_MAESTRO_NO_APTO = ['lesionado']
+
+COLUMNAS_TABLERO = [
+    'DNI', 'Jugador', 'Categoria', 'Posicion', 'Estado',
+    'Estado médico', 'Último registro médico', 'Asistencia hoy', 'Disponibilidad'
+]
+
+# ==========================================
+# CARGA DE DATOS (CACHEADA)
+# ==========================================
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cargar_maestro():
+    """Jugadores_Maestro como DataFrame"""
+    try:
+        from .administracion import JugadoresMaestroManager
+        return JugadoresMaestroManager().get_all_players()
+    except Exception as e:
+        st.error(f"❌ Error cargando Jugadores_Maestro: {e}")
+        return pd.DataFrame()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cargar_registros_medicos():
+    """Registros del Área Médica como DataFrame"""
+    from .areamedica import read_google_sheet_with_headers
+    resultado = read_google_sheet_with_headers(sheet_id=SHEET_ID_MEDICO)
+    if not resultado or not resultado.get('success'):
+        return pd.DataFrame()
+    return pd.DataFrame(resultado.get('data') or [], columns=resultado.get('columns'))
+
+@st.cache_data(ttl=600, show_spinner=False)
+def cargar_asistencias():
+    """Hoja de Asistencias como DataFrame"""
+    try:
+        from .administracion import JugadoresMaestroManager
+        worksheet = JugadoresMaestroManager().connect_to_sheet()
+        if not worksheet:
+            return pd.DataFrame()
+        return pd.DataFrame(worksheet.spreadsheet.worksheet(HOJA_ASISTENCIAS).get_all_records())
+    except Exception as e:
+        st.warning(f"⚠️ No se pudieron cargar las asistencias: {e}")
+        return pd.DataFrame()
+
+# ==========================================
+# CÁLCULO VECTORIZADO
+# ==========================================
+
+def ultimo_estado_medico(df_medico):
+    """
+    Último estado de entrenamiento por DNI: DataFrame con columnas
+    dni, Estado médico y Último registro médico.
+    """
+    columnas = ['dni', 'Estado médico', 'Último registro médico']
+    if df_medico is None or df_medico.empty:
+        return pd.DataFrame(columns=columnas)
+
+    col_dni = next((c for c in ['DNI', 'Dni', 'dni'] if c in df_medico.columns), None)
+    if col_dni is None:
+        return pd.DataFrame(columns=columnas)
+
+    # Primera fecha no vacía según la prioridad de columnas del reporte médico
+    textos = pd.Series(np.nan, index=df_medico.index, dtype=object)
+    for col in COLUMNAS_FECHA_MEDICA:
+        if col in df_medico.columns:
+            vacias = textos.isna()
+            textos[vacias] = df_medico.loc[vacias, col].replace('', np.nan)
+
+    respuesta = (
+        df_medico[COL_PUEDE_ENTRENAR] if COL_PUEDE_ENTRENAR in df_medico.columns
+        else pd.Series('', index=df_medico.index)
+    )
+
+    base = pd.DataFrame({
+        'dni': normalizar_dni_serie(df_medico[col_dni]).to_numpy(),
+        'Estado médico': respuesta.astype(str).str.strip().str.lower().map(ESTADOS_MEDICOS).to_numpy(),
+        'Último registro médico': parsear_fechas_medicas(textos.to_numpy()).to_numpy(),
+    })
+    base = base[base['dni'] != '']
+
+    # El registro más reciente de cada DNI (empates: el último cargado)
+    base = base.iloc[::-1].sort_values('Último registro médico', ascending=False, na_position='last', kind='mergesort')
+    return base.drop_duplicates('dni', keep='first')[columnas]
+
+def asistencia_del_dia(df_asistencias, fecha):
+    """Último estado de asistencia registrado en la fecha, por DNI"""
+    columnas = ['dni', 'Asistencia hoy']
+    if df_asistencias is None or df_asistencias.empty or not {'Fecha', 'DNI'} <= set(df_asistencias.columns):
+        return pd.DataFrame(columns=columnas)
+
+    del_dia = df_asistencias[df_asistencias['Fecha'].astype(str).str.strip() == fecha.strftime('%d/%m/%Y')]
+    estado = (
+        del_dia['Estado_Asistencia'] if 'Estado_Asistencia' in del_dia.columns
+        else pd.Series('Presente', index=del_dia.index)
+    )
+    base = pd.DataFrame({
+        'dni': normalizar_dni_serie(del_dia['DNI']).to_numpy(),
+        'Asistencia hoy': estado.astype(str).to_numpy(),
+    })
+    return base[base['dni'] != ''].drop_duplicates('dni', keep='last')[columnas]
+
+def construir_tablero_disponibilidad(df_maestro, df_medico, df_asistencias, fecha):
+    """
+    Une maestro + último estado médico + asistencia del día (merges por DNI)
+    y resuelve la disponibilidad de cada jugador con np.select.
+    """
+    if df_maestro is None or df_maestro.empty or 'DNI' not in df_maestro.columns:
+        return pd.DataFrame(columns=COLUMNAS_TABLERO)
+
+    maestro = df_maestro.copy()
+    maestro['dni'] = normalizar_dni_serie(maestro['DNI'])
+    for col in ['Nombre', 'Apellido', 'Categoria', 'Posicion', 'Estado']:
+        if col not in maestro.columns:
+            maestro[col] = ''
+    maestro['Jugador'] = (
+        maestro['Nombre'].astype(str).str.strip() + ' ' + maestro['Apellido'].astype(str).str.strip()
+    ).str.strip()
+
+    tablero = (
+        maestro
+        .merge(ultimo_estado_medico(df_medico), on='dni', how='left')
+        .merge(asistencia_del_dia(df_asistencias, fecha), on='dni', how='left')
+    )
+    tablero['Asistencia hoy'] = tablero['Asistencia hoy'].fillna('Sin registro')
+
+    estado_medico = tablero['Estado médico'].to_numpy()
+    estado_maestro = tablero['Estado'].astype(str).str.strip().str.lower()
+    tablero['Disponibilidad'] = pd.Categorical(
+        np.select(
+            [
+                estado_maestro.isin(ESTADOS_MAESTRO_BAJA).to_numpy(),
+                (estado_medico == 'Inactivo')
+                | (tablero['Asistencia hoy'].to_numpy() == 'Lesionado')
+                | estado_maestro.isin(ESTADOS_MAESTRO_NO_APTO).to_numpy(),
+                estado_medico == 'Diferenciado',
+            ],
+            [BAJA, NO_APTO, DIFERENCIADO],
+            default=APTO
+        ),
+        categories=ORDEN_DISPONIBILIDAD,
+        ordered=True
+    )
+    tablero['Estado médico'] = tablero['Estado médico'].fillna('Sin registro')
+    tablero['Categoria'] = tablero['Categoria'].replace('', 'Sin Categoría').fillna('Sin Categoría')
+
+    return tablero[COLUMNAS_TABLERO].sort_values(['Categoria', 'Disponibilidad', 'Jugador']).reset_index(drop=True)
+
+def resumen_por_categoria(tablero):
+    """Cantidad de jugadores por categoría y disponibilidad (groupby único)"""
+    if tablero.empty:
+        return pd.DataFrame(columns=ORDEN_DISPONIBILIDAD)
+    resumen = (
+        tablero.groupby(['Categoria', 'Disponibilidad'], observed=False).size()
+        .unstack('Disponibilidad', fill_value=0)
+        .reindex(columns=ORDEN_DISPONIBILIDAD, fill_value=0)
+    )
+    resumen['Total'] = resumen.sum(axis=1)
+    return resumen
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def tablero_del_dia(fecha_iso):
+    """Tablero y resumen para una fecha; la clave de caché es el día"""
+    fecha = date.fromisoformat(fecha_iso)
+    tablero = construir_tablero_disponibilidad(
+        cargar_maestro(), cargar_registros_medicos(), cargar_asistencias(), fecha
+    )
+    return tablero, resumen_por_categoria(tablero)
+
+# ==========================================
+# INTERFAZ
+# ==========================================
+
+def main_disponibilidad():
+    """Página del tablero de disponibilidad del plantel"""
+    inicio = time.perf_counter()
+
+    st.markdown("""
+    <div style="background: linear-gradient(135deg, #000000, #2C2C2C); padding: 1.5rem;
+                border-radius: 15px; text-align: center; margin-bottom: 1.5rem; border: 2px solid white;">
+        <h1 style="color: white; margin: 0;">🩺 Disponibilidad del Plantel</h1>
+    </div>
+    """, unsafe_allow_html=True)
+
+    col_fecha, col_refrescar = st.columns([3, 1])
+    with col_fecha:
+        fecha = st.date_input("📅 Fecha", value=date.today(), key="disponibilidad_fecha")
+    with col_refrescar:
+        st.write("")
+        if st.button("🔄 Actualizar datos", key="disponibilidad_refrescar", use_container_width=True):
+            for funcion in (cargar_maestro, cargar_registros_medicos, cargar_asistencias, tablero_del_dia):
+                funcion.clear()
+
+    with st.spinner("🔄 Cruzando plantel, área médica y asistencias..."):
+        tablero, resumen = tablero_del_dia(fecha.isoformat())
+
+    if tablero.empty:
+        st.warning("⚠️ No hay jugadores en Jugadores_Maestro")
+        return
+
+    # Métricas globales
+    totales = tablero['Disponibilidad'].value_counts()
+    columnas_metricas = st.columns(len(ORDEN_DISPONIBILIDAD))
+    for col, disponibilidad in zip(columnas_metricas, ORDEN_DISPONIBILIDAD):
+        col.metric(f"{ICONOS_DISPONIBILIDAD[disponibilidad]} {disponibilidad}", int(totales.get(disponibilidad, 0)))
+
+    st.markdown("### 📊 Resumen por Categoría")
+    st.dataframe(resumen, use_container_width=True)
+
+    # Filtros sobre el tablero ya calculado
+    st.markdown("### 📋 Detalle de Jugadores")
+    f1, f2 = st.columns(2)
+    with f1:
+        categorias = st.multiselect("Categoría", sorted(tablero['Categoria'].unique()), key="disponibilidad_categorias")
+    with f2:
+        disponibilidades = st.multiselect("Disponibilidad", ORDEN_DISPONIBILIDAD, key="disponibilidad_estados")
+
+    mascara = np.ones(len(tablero), dtype=bool)
+    if categorias:
+        mascara &= tablero['Categoria'].isin(categorias).to_numpy()
+    if disponibilidades:
+        mascara &= tablero['Disponibilidad'].isin(disponibilidades).to_numpy()
+
+    st.dataframe(
+        tablero[mascara],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Último registro médico': st.column_config.DatetimeColumn('Último registro médico', format="DD/MM/YYYY"),
+        }
+    )
+
+    st.caption(
+        f"📊 {len(tablero)} jugadores • Fuentes: Jugadores_Maestro + Área Médica + Asistencias "
+        f"• Render: {(time.perf_counter() - inicio) * 1000:.0f} ms"
+    )
@@ -0,0 +1,261 @@
+"""
+Herramientas de Consulta del Asistente AI - Club Universitario de La Plata
+Consultas deterministas con pandas para las preguntas frecuentes (lesionados,
+rankings por test, plantel por categoría y posición). El router elige la
+herramienta a partir de la pregunta; el modelo solo redacta el resultado exacto.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from .dashboard_360 import normalizar_dni_serie
+from .disponibilidad import ultimo_estado_medico
+from .indice_contexto import normalizar, tokenizar
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+
+# Estados médicos que cuentan como lesionado / no disponible
+ESTADOS_LESIONADO = ['Inactivo', 'Diferenciado']
+
+# Tests donde un valor menor es mejor (tiempos)
+PALABRAS_MENOR_ES_MEJOR = ['tiempo', 'sprint', '40m', '10m', 'segundos']
+
+PATRON_LESIONADOS = re.compile(
+    r'\blesion(es|ad[oa]s?)?\b|\bno aptos?\b|\bno puede entrenar\b|\bdiferenciad[oa]s?\b|\benfermeria\b|\binactivos?\b'
+)
+PATRON_RANKING = re.compile(r'\b(record|mejor(es)?|top|ranking|maxim[oa]s?|lider(es)?|ganador(es)?|primer[oa]s?)\b')
+PATRON_PLANTEL = re.compile(r'\b(plantel|jugadores|quienes|lista|integrantes|cuantos)\b')
+
+# Columnas con nombres de jugadores en las hojas médica y física
+COLUMNAS_NOMBRE_JUGADOR = ['Nombre del Paciente', 'Nombre y Apellido']
+# Largo mínimo de un apellido para reconocerlo solo ("¿cómo está Gomez?")
+LARGO_MINIMO_APELLIDO = 4
+PATRON_CANTIDAD = re.compile(r'\btop\s*(\d+)|\b(\d+)\s*mejores|\blos\s*(\d+)')
+
+# ==========================================
+# HERRAMIENTAS
+# ==========================================
+
+def _nombre_completo(df):
+    """Nombre y apellido de Jugadores_Maestro"""
+    return (df['Nombre'].astype(str).str.strip() + ' ' + df['Apellido'].astype(str).str.strip()).str.strip()
+
+
+def jugadores_lesionados(datos, categoria=None):
+    """Jugadores cuyo último registro médico indica que no entrenan o entrenan diferenciado"""
+    df_medica = datos.get('medica', pd.DataFrame())
+    ultimos = ultimo_estado_medico(df_medica)
+    ultimos = ultimos[ultimos['Estado médico'].isin(ESTADOS_LESIONADO)]
+
+    jugadores = datos.get('jugadores', pd.DataFrame())
+    if not jugadores.empty and 'DNI' in jugadores.columns:
+        maestro = pd.DataFrame({
+            'dni': normalizar_dni_serie(jugadores['DNI']),
+            'Jugador': _nombre_completo(jugadores) if {'Nombre', 'Apellido'} <= set(jugadores.columns) else '',
+            'Categoria': jugadores['Categoria'] if 'Categoria' in jugadores.columns else '',
+            'Posicion': jugadores['Posicion'] if 'Posicion' in jugadores.columns else '',
+        })
+        resultado = ultimos.merge(maestro, on='dni', how='left')
+    else:
+        resultado = ultimos.assign(Jugador=np.nan, Categoria='', Posicion='')
+
+    # Jugadores que no están en el maestro: nombre del registro médico
+    col_nombre = next((c for c in COLUMNAS_NOMBRE_JUGADOR if c in df_medica.columns), None)
+    col_dni = next((c for c in ['DNI', 'Dni', 'dni'] if c in df_medica.columns), None)
+    if col_nombre and col_dni:
+        nombres_medicos = pd.Series(
+            df_medica[col_nombre].astype(str).to_numpy(),
+            index=normalizar_dni_serie(df_medica[col_dni]).to_numpy()
+        )
+        nombres_medicos = nombres_medicos[~nombres_medicos.index.duplicated(keep='last')]
+        resultado['Jugador'] = resultado['Jugador'].fillna(resultado['dni'].map(nombres_medicos))
+
+    if categoria:
+        resultado = resultado[resultado['Categoria'].astype(str).map(normalizar) == normalizar(categoria)]
+
+    resultado = resultado.rename(columns={'Último registro médico': 'Último registro'})
+    columnas = ['Jugador', 'Categoria', 'Posicion', 'Estado médico', 'Último registro']
+    return resultado[columnas].sort_values(['Categoria', 'Jugador']).reset_index(drop=True)
+
+
+def top_por_test(datos, test, n=5, categoria=None, menor_es_mejor=None):
+    """Mejor marca de cada jugador en un test y los n primeros del ranking"""
+    df_fisica = datos.get('fisica', pd.DataFrame())
+    columnas = ['Jugador', 'Categoría', 'Test', 'Mejor marca', 'unidad']
+    col_nombre = next((c for c in COLUMNAS_NOMBRE_JUGADOR if c in df_fisica.columns), None)
+    if df_fisica.empty or col_nombre is None or not {'Test', 'valor'} <= set(df_fisica.columns):
+        return pd.DataFrame(columns=columnas)
+
+    patron = normalizar(test)
+    texto_test = df_fisica['Test'].astype(str).map(normalizar)
+    if 'Subtest' in df_fisica.columns:
+        texto_test = texto_test + ' ' + df_fisica['Subtest'].astype(str).map(normalizar)
+    mascara = texto_test.str.contains(patron, regex=False).to_numpy()
+    if categoria and 'Categoría' in df_fisica.columns:
+        mascara = mascara & (df_fisica['Categoría'].astype(str).map(normalizar) == normalizar(categoria)).to_numpy()
+
+    fisica = df_fisica[mascara].assign(
+        _valor=lambda d: pd.to_numeric(d['valor'].astype(str).str.replace(',', '.'), errors='coerce')
+    ).dropna(subset=['_valor'])
+    if fisica.empty:
+        return pd.DataFrame(columns=columnas)
+
+    if menor_es_mejor is None:
+        menor_es_mejor = any(p in patron for p in PALABRAS_MENOR_ES_MEJOR)
+
+    # Mejor marca por jugador, luego ranking
+    fisica = fisica.sort_values('_valor', ascending=menor_es_mejor, kind='mergesort')
+    mejores = fisica.drop_duplicates(col_nombre, keep='first').head(n)
+    return pd.DataFrame({
+        'Jugador': mejores[col_nombre].to_numpy(),
+        'Categoría': mejores['Categoría'].to_numpy() if 'Categoría' in mejores.columns else '',
+        'Test': mejores['Test'].to_numpy(),
+        'Mejor marca': mejores['_valor'].to_numpy(),
+        'unidad': mejores['unidad'].to_numpy() if 'unidad' in mejores.columns else '',
+    })
+
+
+def plantel(datos, categoria=None, posicion=None):
+    """Jugadores de una categoría y/o posición según Jugadores_Maestro"""
+    jugadores = datos.get('jugadores', pd.DataFrame())
+    columnas = ['Jugador', 'Categoria', 'Posicion', 'Estado']
+    if jugadores.empty or not {'Nombre', 'Apellido'} <= set(jugadores.columns):
+        return pd.DataFrame(columns=columnas)
+
+    mascara = np.ones(len(jugadores), dtype=bool)
+    if categoria and 'Categoria' in jugadores.columns:
+        mascara &= (jugadores['Categoria'].astype(str).map(normalizar) == normalizar(categoria)).to_numpy()
+    if posicion and 'Posicion' in jugadores.columns:
+        mascara &= (jugadores['Posicion'].astype(str).map(normalizar) == normalizar(posicion)).to_numpy()
+
+    seleccion = jugadores[mascara]
+    resultado = pd.DataFrame({
+        'Jugador': _nombre_completo(seleccion).to_numpy(),
+        'Categoria': seleccion['Categoria'].to_numpy() if 'Categoria' in seleccion.columns else '',
+        'Posicion': seleccion['Posicion'].to_numpy() if 'Posicion' in seleccion.columns else '',
+        'Estado': seleccion['Estado'].to_numpy() if 'Estado' in seleccion.columns else '',
+    })
+    return resultado.sort_values(['Categoria', 'Posicion', 'Jugador']).reset_index(drop=True)
+
+
+HERRAMIENTAS = {
+    'jugadores_lesionados': (jugadores_lesionados, "Jugadores lesionados o con entrenamiento diferenciado"),
+    'top_por_test': (top_por_test, "Ranking de mejores marcas por test"),
+    'plantel': (plantel, "Plantel por categoría y posición"),
+}
+
+# ==========================================
+# ROUTER
+# ==========================================
+
+def _buscar_valor(pregunta_normalizada, tokens, valores):
+    """Valor de la lista (categoría, posición o test) mencionado en la pregunta, el más largo primero"""
+    candidatos = sorted({str(v) for v in valores if str(v).strip()}, key=len, reverse=True)
+    for valor in candidatos:
+        valor_normalizado = normalizar(valor)
+        if valor_normalizado and valor_normalizado in pregunta_normalizada:
+            return valor
+        tokens_valor = tokenizar(valor)
+        if tokens_valor and all(t in tokens for t in tokens_valor):
+            return valor
+    return None
+
+
+def _valores(df, columna):
+    return df[columna].dropna().unique() if columna in df.columns else []
+
+
+def _nombres_jugadores(datos):
+    """Nombres completos de jugadores en el maestro y en las hojas médica y física"""
+    nombres = set()
+    jugadores = datos.get('jugadores', pd.DataFrame())
+    if not jugadores.empty and {'Nombre', 'Apellido'} <= set(jugadores.columns):
+        nombres.update(_nombre_completo(jugadores).dropna().unique())
+    for clave in ['medica', 'fisica']:
+        df = datos.get(clave, pd.DataFrame())
+        for columna in COLUMNAS_NOMBRE_JUGADOR:
+            if columna in df.columns:
+                nombres.update(df[columna].dropna().astype(str).unique())
+    return nombres
+
+
+def jugador_mencionado(pregunta, datos, excluir=()):
+    """
+    Jugador nombrado en la pregunta (nombre completo, nombre + apellido o solo el
+    apellido), o None. `excluir` son palabras que no cuentan como apellido
+    (categorías, posiciones, tests).
+    """
+    texto = normalizar(pregunta)
+    palabras = set(re.findall(r'[a-z0-9]+', texto))
+    excluidas = {t for valor in excluir for t in re.findall(r'[a-z0-9]+', normalizar(valor))}
+    for nombre in sorted(_nombres_jugadores(datos), key=len, reverse=True):
+        partes = re.findall(r'[a-z0-9]+', normalizar(nombre))
+        if not partes:
+            continue
+        if ' '.join(partes) in texto or (len(partes) > 1 and partes[0] in palabras and partes[-1] in palabras):
+            return nombre
+        apellido = partes[-1]
+        if len(partes) > 1 and len(apellido) >= LARGO_MINIMO_APELLIDO and apellido in palabras and apellido not in excluidas:
+            return nombre
+    return None
+
+
+def enrutar_pregunta(pregunta, datos):
+    """
+    Elige la herramienta y sus argumentos para la pregunta.
+    Devuelve (nombre_herramienta, kwargs) o None si conviene la búsqueda libre.
+    Las preguntas sobre un jugador puntual van a la búsqueda libre: las
+    herramientas responden sobre todo el plantel.
+    """
+    texto = normalizar(pregunta)
+    tokens = set(tokenizar(pregunta))
+    jugadores = datos.get('jugadores', pd.DataFrame())
+    fisica = datos.get('fisica', pd.DataFrame())
+
+    valores_filtro = (
+        list(_valores(jugadores, 'Categoria')) + list(_valores(fisica, 'Categoría'))
+        + list(_valores(jugadores, 'Posicion')) + list(_valores(fisica, 'Test')) + list(_valores(fisica, 'Subtest'))
+    )
+    if jugador_mencionado(pregunta, datos, excluir=valores_filtro):
+        return None
+
+    categoria = _buscar_valor(texto, tokens, list(_valores(jugadores, 'Categoria')) + list(_valores(fisica, 'Categoría')))
+
+    if PATRON_LESIONADOS.search(texto):
+        return 'jugadores_lesionados', {'categoria': categoria}
+
+    if PATRON_RANKING.search(texto):
+        test = _buscar_valor(texto, tokens, list(_valores(fisica, 'Test')) + list(_valores(fisica, 'Subtest')))
+        if test:
+            cantidad = PATRON_CANTIDAD.search(texto)
+            n = int(next(g for g in cantidad.groups() if g)) if cantidad else (1 if 'record' in texto else 5)
+            return 'top_por_test', {'test': test, 'n': n, 'categoria': categoria}
+
+    posicion = _buscar_valor(texto, tokens, _valores(jugadores, 'Posicion'))
+    if posicion or (categoria and PATRON_PLANTEL.search(texto)):
+        return 'plantel', {'categoria': categoria, 'posicion': posicion}
+
+    return None
+
+
+def ejecutar_herramienta(nombre, datos, **kwargs):
+    """Ejecuta una herramienta registrada y devuelve su DataFrame"""
+    funcion, _ = HERRAMIENTAS[nombre]
+    return funcion(datos, **kwargs)
+
+
+def resultado_a_texto(nombre, kwargs, resultado, max_filas=50):
+    """Resultado compacto para el prompt: descripción, filtros y tabla en texto"""
+    _, descripcion = HERRAMIENTAS[nombre]
+    filtros = ', '.join(f"{k}={v}" for k, v in kwargs.items() if v is not None)
+    encabezado = f"CONSULTA: {descripcion}" + (f" ({filtros})" if filtros else '') + f" - {len(resultado)} resultado(s)"
+    if resultado.empty:
+        return encabezado + "\nSin resultados."
+    tabla = resultado.head(max_filas).to_string(index=False)
+    if len(resultado) > max_filas:
+        tabla += f"\n... y {len(resultado) - max_filas} más"
+    return encabezado + "\n" + tabla
@@ -0,0 +1,241 @@
+"""
+Índice de Contexto para el Asistente AI - Club Universitario de La Plata
+Divide los datos del club en fragmentos (uno por jugador y uno por tema) y los
+indexa localmente con BM25. Cada pregunta recibe solo los k fragmentos más
+relevantes en lugar de las tablas completas, así el prompt no crece con el club.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# TOKENIZACIÓN
+# ==========================================
+
+STOPWORDS = {
+    'a', 'al', 'algo', 'como', 'con', 'cual', 'cuales', 'cuantos', 'cuantas', 'de', 'del',
+    'donde', 'el', 'ella', 'en', 'entre', 'es', 'esta', 'estan', 'este', 'esto', 'ha', 'hay',
+    'la', 'las', 'le', 'lo', 'los', 'mas', 'me', 'mi', 'muy', 'no', 'o', 'para', 'por', 'que',
+    'quien', 'quienes', 'se', 'si', 'sin', 'sobre', 'son', 'su', 'sus', 'tiene', 'tienen',
+    'un', 'una', 'uno', 'unos', 'y', 'ya',
+}
+
+_PATRON_TOKEN = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes"""
+    texto = unicodedata.normalize('NFKD', str(texto).lower())
+    return texto.encode('ascii', 'ignore').decode('ascii')
+
+
+def _raiz(token):
+    """Stemming mínimo para plurales en español (pilares -> pilar, lesionados -> lesionado)"""
+    if len(token) > 4 and token.endswith('es') and token[-3] not in 'aeiou':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def tokenizar(texto):
+    """Tokens normalizados sin stopwords"""
+    return [_raiz(t) for t in _PATRON_TOKEN.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+# ==========================================
+# ÍNDICE BM25
+# ==========================================
+
+class IndiceBM25:
+    """
+    Índice invertido BM25 en memoria.
+    Cada término guarda (ids de documento, frecuencias) como arrays NumPy;
+    una búsqueda solo recorre las listas de los términos de la consulta.
+    """
+
+    def __init__(self, documentos, k1=1.5, b=0.75, peso_titulo=3):
+        self.documentos = documentos
+        self.k1 = k1
+        self.b = b
+
+        # El título pesa más que el cuerpo: "Plantel M19 - Pilar" debe ganarle a
+        # una ficha individual que solo menciona 'Pilar' y 'M19'. Un fragmento puede
+        # indicar en 'claves' qué indexar en lugar del texto (ej. listas largas de nombres)
+        tokens_por_doc = [
+            tokenizar(doc['titulo']) * peso_titulo + tokenizar(doc.get('claves', doc['texto']))
+            for doc in documentos
+        ]
+        self.longitudes = np.array([len(t) for t in tokens_por_doc], dtype=float)
+        self.longitud_media = self.longitudes.mean() if len(documentos) else 0.0
+
+        postings = defaultdict(lambda: ([], []))
+        for doc_id, tokens in enumerate(tokens_por_doc):
+            for termino, frecuencia in Counter(tokens).items():
+                ids, frecuencias = postings[termino]
+                ids.append(doc_id)
+                frecuencias.append(frecuencia)
+
+        n = len(documentos)
+        self.postings = {}
+        self.idf = {}
+        for termino, (ids, frecuencias) in postings.items():
+            self.postings[termino] = (np.array(ids), np.array(frecuencias, dtype=float))
+            self.idf[termino] = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+
+    def puntajes(self, consulta):
+        """Puntaje BM25 de cada documento para la consulta"""
+        puntajes = np.zeros(len(self.documentos))
+        if not self.documentos:
+            return puntajes
+
+        normalizacion = self.k1 * (1 - self.b + self.b * self.longitudes / self.longitud_media)
+        for termino in set(tokenizar(consulta)):
+            if termino not in self.postings:
+                continue
+            ids, frecuencias = self.postings[termino]
+            puntajes[ids] += self.idf[termino] * frecuencias * (self.k1 + 1) / (frecuencias + normalizacion[ids])
+        return puntajes
+
+    def buscar(self, consulta, k=8):
+        """Los k fragmentos más relevantes como lista de (documento, puntaje)"""
+        puntajes = self.puntajes(consulta)
+        candidatos = np.flatnonzero(puntajes > 0)
+        if candidatos.size == 0:
+            return []
+        mejores = candidatos[np.argsort(-puntajes[candidatos], kind='stable')[:k]]
+        return [(self.documentos[i], float(puntajes[i])) for i in mejores]
+
+
+# ==========================================
+# FRAGMENTOS (CHUNKS)
+# ==========================================
+
+def _columnas(df, candidatas):
+    return [c for c in candidatas if c in df.columns]
+
+
+def _a_texto(df, columnas):
+    """Filas de un DataFrame como líneas 'col: valor | col: valor'"""
+    if df.empty or not columnas:
+        return ''
+    partes = [columna + ': ' + df[columna].astype(str) for columna in columnas]
+    lineas = partes[0]
+    for parte in partes[1:]:
+        lineas = lineas + ' | ' + parte
+    return '\n'.join(lineas.tolist())
+
+
+def _clave_nombre(serie):
+    """Nombre normalizado para cruzar jugadores entre hojas"""
+    return serie.astype(str).map(normalizar).str.split().str.join(' ')
+
+
+def construir_fragmentos(df_jugadores, df_medica, df_fisica):
+    """
+    Fragmentos de contexto:
+    - uno por jugador (ficha + lesiones + últimos tests),
+    - uno por categoría y posición (plantel),
+    - uno por categoría con el resumen de lesiones,
+    - uno por test con los mejores resultados.
+    """
+    fragmentos = []
+    df_jugadores = df_jugadores if df_jugadores is not None else pd.DataFrame()
+    df_medica = df_medica if df_medica is not None else pd.DataFrame()
+    df_fisica = df_fisica if df_fisica is not None else pd.DataFrame()
+
+    cols_med = _columnas(df_medica, ['Nombre del Paciente', 'Diagnóstico', 'Tipo de Lesión', 'Severidad de la lesión',
+                                     'Fecha de la lesión', 'Fecha', 'Estado', '¿Puede participar en entrenamientos?'])
+    cols_fis = _columnas(df_fisica, ['Test', 'Subtest', 'valor', 'unidad', 'Fecha'])
+
+    medica_por_nombre = {}
+    if 'Nombre del Paciente' in df_medica.columns:
+        medica_por_nombre = dict(tuple(df_medica.groupby(_clave_nombre(df_medica['Nombre del Paciente']), sort=False)))
+    fisica_por_nombre = {}
+    if 'Nombre y Apellido' in df_fisica.columns:
+        fisica_por_nombre = dict(tuple(df_fisica.groupby(_clave_nombre(df_fisica['Nombre y Apellido']), sort=False)))
+
+    # 1. Un fragmento por jugador
+    if not df_jugadores.empty and {'Nombre', 'Apellido'} <= set(df_jugadores.columns):
+        jugadores = df_jugadores.assign(
+            _nombre=(df_jugadores['Nombre'].astype(str).str.strip() + ' ' + df_jugadores['Apellido'].astype(str).str.strip())
+        )
+        jugadores['_clave'] = _clave_nombre(jugadores['_nombre'])
+        cols_ficha = _columnas(jugadores, ['Posicion', 'Categoria', 'Estado'])
+
+        for fila in jugadores.to_dict('records'):
+            lineas = [f"Jugador: {fila['_nombre']}"]
+            lineas += [f"{col}: {fila[col]}" for col in cols_ficha]
+
+            lesiones = medica_por_nombre.get(fila['_clave'])
+            if lesiones is not None:
+                lineas.append(f"Lesionado - lesiones / registros médicos ({len(lesiones)}):")
+                lineas.append(_a_texto(lesiones, cols_med))
+            else:
+                lineas.append("Sin registros médicos (sin lesiones registradas)")
+
+            tests = fisica_por_nombre.get(fila['_clave'])
+            if tests is not None:
+                lineas.append(f"Tests físicos ({len(tests)}, últimos 10):")
+                lineas.append(_a_texto(tests.tail(10), cols_fis))
+
+            fragmentos.append({
+                'id': f"jugador:{fila['_clave']}",
+                'tipo': 'jugador',
+                'titulo': f"Ficha de {fila['_nombre']}",
+                'texto': '\n'.join(lineas),
+            })
+
+        # 2. Plantel por categoría y posición (fragmentos cortos, fáciles de recuperar)
+        if 'Categoria' in jugadores.columns:
+            claves = ['Categoria', 'Posicion'] if 'Posicion' in jugadores.columns else ['Categoria']
+            for clave, grupo in jugadores.groupby(claves, sort=True):
+                clave = clave if isinstance(clave, tuple) else (clave,)
+                descripcion = ' - '.join(str(c) for c in clave)
+                fragmentos.append({
+                    'id': 'plantel:' + ':'.join(normalizar(c) for c in clave),
+                    'tipo': 'plantel',
+                    'titulo': f"Plantel {descripcion}",
+                    'texto': f"Jugadores de {descripcion} ({len(grupo)}): " + ', '.join(grupo['_nombre']),
+                    'claves': f"jugadores plantel {descripcion}",
+                })
+
+    # 3. Resumen de lesiones por categoría
+    if not df_medica.empty and cols_med:
+        col_cat = next((c for c in ['Categoría', 'Categoria'] if c in df_medica.columns), None)
+        grupos = df_medica.groupby(col_cat, sort=True) if col_cat else [('Todas', df_medica)]
+        for categoria, grupo in grupos:
+            lineas = [f"Lesiones y registros médicos de la categoría {categoria} ({len(grupo)} casos), lesionados:"]
+            lineas.append(_a_texto(grupo, cols_med))
+            fragmentos.append({
+                'id': f"lesiones:{normalizar(categoria)}",
+                'tipo': 'lesiones',
+                'titulo': f"Lesiones {categoria}",
+                'texto': '\n'.join(lineas),
+            })
+
+    # 4. Mejores resultados por test
+    if not df_fisica.empty and {'Test', 'valor'} <= set(df_fisica.columns):
+        valores = pd.to_numeric(df_fisica['valor'].astype(str).str.replace(',', '.'), errors='coerce')
+        fisica = df_fisica.assign(_valor=valores).dropna(subset=['_valor'])
+        cols_ranking = _columnas(fisica, ['Nombre y Apellido', 'Categoría', 'Subtest', 'valor', 'unidad', 'Fecha'])
+        for test, grupo in fisica.groupby('Test', sort=True):
+            mejores = grupo.nlargest(10, '_valor')
+            fragmentos.append({
+                'id': f"test:{normalizar(test)}",
+                'tipo': 'test',
+                'titulo': f"Récords y mejores resultados de {test}",
+                'texto': f"Mejores 10 resultados del test {test} ({len(grupo)} registros):\n" + _a_texto(mejores, cols_ranking),
+            })
+
+    return fragmentos
+
+
+def construir_contexto(resultados):
+    """Texto de contexto para el prompt a partir de los fragmentos recuperados"""
+    return '\n\n'.join(f"### {doc['titulo']}\n{doc['texto']}" for doc, _ in resultados)
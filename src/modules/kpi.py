@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from .motor_kpi import INDICADORES, motor_kpi, obtener_almacen_partidos
+from .analitica_partidos import PARTIDOS_MINIMOS, factores_victoria
+
 def main_kpi():
     # Configuración de la página y estilos (si se ejecuta standalone, aunque probablemente sea un módulo)
     # Si es módulo, heredará estilos, pero aseguramos consistencia.
@@ -37,16 +39,12 @@ def main_kpi():
     st.title("🏉 Panel de Alto Rendimiento - KPI Pantera")
     st.markdown("### Análisis de Rendimiento y Factores Clave de Victoria")
 
-    # --- 1. Gestión de Datos (Simulada por ahora, idealmente Google Sheets/DB) ---
-    if 'match_data' not in st.session_state:
-        # Datos iniciales de ejemplo
-        st.session_state.match_data = pd.DataFrame([
-            {"Rival": "Los Tilos", "Fecha": "2024-03-15", "Resultado": "G", "Puntos_Favor": 28, "Puntos_Contra": 15, "Tackles_Hechos": 145, "Tackles_Errados": 12, "Entradas_22m": 8, "Puntos_en_22m": 21, "Scrum_Ganados": 8, "Scrum_Perdidos": 1, "Line_Ganados": 12, "Line_Perdidos": 2, "Penales_Cometidos": 8},
-            {"Rival": "San Luis", "Fecha": "2024-03-22", "Resultado": "P", "Puntos_Favor": 14, "Puntos_Contra": 20, "Tackles_Hechos": 110, "Tackles_Errados": 25, "Entradas_22m": 5, "Puntos_en_22m": 7, "Scrum_Ganados": 6, "Scrum_Perdidos": 2, "Line_Ganados": 10, "Line_Perdidos": 4, "Penales_Cometidos": 14},
-            {"Rival": "La Plata", "Fecha": "2024-03-29", "Resultado": "G", "Puntos_Favor": 35, "Puntos_Contra": 10, "Tackles_Hechos": 160, "Tackles_Errados": 8, "Entradas_22m": 10, "Puntos_en_22m": 28, "Scrum_Ganados": 9, "Scrum_Perdidos": 0, "Line_Ganados": 14, "Line_Perdidos": 1, "Penales_Cometidos": 6},
-        ])
-
-    df = st.session_state.match_data
+    # --- 1. Gestión de Datos (almacén local compartido entre sesiones) ---
+    almacen = obtener_almacen_partidos()
+    motor = motor_kpi(almacen.version(), almacen.ruta)
+    df = motor['kpis']
+    if motor['ejemplo']:
+        st.info("ℹ️ Todavía no hay partidos cargados: se muestran partidos de ejemplo (no se guardan).")
 
     # --- 2. Sidebar: Carga de Nuevo Partido ---
     with st.sidebar:
@@ -87,18 +85,16 @@ def main_kpi():
                     "Line_Ganados": line_ok, "Line_Perdidos": line_lost,
                     "Penales_Cometidos": penales
                 }
-                st.session_state.match_data = pd.concat([df, pd.DataFrame([new_data])], ignore_index=True)
-                st.success("Partido guardado exitosamente!")
+                try:
+                    almacen.agregar(new_data)
+                    st.success("Partido guardado exitosamente!")
+                except Exception as e:
+                    st.error(f"❌ Error guardando el partido: {e}")
+                    st.stop()
                 st.rerun()
 
-    # --- 3. Cálculos de KPIs Avanzados ---
-    # Efectividad de Tackle
-    df['Efectividad_Tackle'] = (df['Tackles_Hechos'] / (df['Tackles_Hechos'] + df['Tackles_Errados']) * 100).fillna(0)
-    # Eficiencia en 22m (Puntos por entrada)
-    df['Eficiencia_22m'] = (df['Puntos_en_22m'] / df['Entradas_22m']).fillna(0)
-    # Obtención (Scrum + Line)
-    df['Efectividad_Scrum'] = (df['Scrum_Ganados'] / (df['Scrum_Ganados'] + df['Scrum_Perdidos']) * 100).fillna(0)
-    df['Efectividad_Line'] = (df['Line_Ganados'] / (df['Line_Ganados'] + df['Line_Perdidos']) * 100).fillna(0)
+    # --- 3. KPIs Avanzados: calculados por el motor una vez por versión de datos ---
+    resumen = motor['resumen']
 
     # --- 4. Dashboard Principal ---
     
@@ -106,10 +102,10 @@ def main_kpi():
     st.markdown("### 📊 Resumen de Temporada")
     col1, col2, col3, col4 = st.columns(4)
     
-    avg_tackle = df['Efectividad_Tackle'].mean()
-    avg_eff_22 = df['Eficiencia_22m'].mean()
-    avg_penalties = df['Penales_Cometidos'].mean()
-    win_rate = (df[df['Resultado'] == 'G'].shape[0] / df.shape[0] * 100) if df.shape[0] > 0 else 0
+    avg_tackle = resumen['efectividad_tackle']
+    avg_eff_22 = resumen['eficiencia_22m']
+    avg_penalties = resumen['penales']
+    win_rate = resumen['win_rate']
 
     col1.metric("Efectividad Tackle", f"{avg_tackle:.1f}%")
     col2.metric("Puntos por Entrada a 22m", f"{avg_eff_22:.1f}")
@@ -170,7 +166,7 @@ def main_kpi():
             last_match = df.iloc[-1]
             # Radar chart
             fig_radar = go.Figure(data=go.Scatterpolar(
-                r=[last_match['Efectividad_Scrum'], last_match['Efectividad_Line'], last_match['Efectividad_Tackle'], (last_match['Puntos_Favor']/(last_match['Puntos_Favor']+last_match['Puntos_Contra']+0.1))*100],
+                r=[last_match['Efectividad_Scrum'], last_match['Efectividad_Line'], last_match['Efectividad_Tackle'], last_match['Dominio']],
                 theta=['Scrum %', 'Line %', 'Tackle %', 'Dominio %'],
                 fill='toself',
                 name=last_match['Rival'],
@@ -199,9 +195,85 @@ def main_kpi():
         )
         st.plotly_chart(fig_penales, use_container_width=True)
 
+    st.markdown("---")
+
+    # Fila 3: Tendencia y factores de victoria
+    row3_col1, row3_col2 = st.columns(2)
+
+    with row3_col1:
+        st.markdown("#### 📈 Tendencia (promedio móvil 5 partidos)")
+        indicador = st.selectbox("Indicador", INDICADORES, key="kpi_indicador_movil")
+        fig_movil = go.Figure()
+        fig_movil.add_trace(go.Scatter(x=df['Fecha'], y=df[indicador], name='Partido', mode='markers', marker_color='#888888'))
+        fig_movil.add_trace(go.Scatter(x=df['Fecha'], y=df[f"{indicador}_Movil"], name='Promedio móvil', line=dict(color='#ffffff', width=3)))
+        fig_movil.update_layout(
+            template="plotly_dark",
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
+        st.plotly_chart(fig_movil, use_container_width=True)
+
+    with row3_col2:
+        st.markdown("#### 🏆 Correlación con la Victoria")
+        correlaciones = motor['correlaciones']
+        if correlaciones.empty:
+            st.info("Se necesitan al menos 3 partidos con victorias y derrotas.")
+        else:
+            fig_corr = px.bar(
+                x=correlaciones.values, y=correlaciones.index, orientation='h',
+                labels={'x': 'Correlación (r)', 'y': ''}, range_x=[-1, 1]
+            )
+            fig_corr.update_traces(marker_color=['#ffffff' if r >= 0 else '#666666' for r in correlaciones.values])
+            fig_corr.update_layout(
+                template="plotly_dark",
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                yaxis=dict(autorange='reversed')
+            )
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+    st.markdown("---")
+
+    # Fila 4: Factores de victoria (correlaciones + regresión logística)
+    st.markdown("#### 🔬 Factores de Victoria")
+    factores = factores_victoria(almacen.version(), almacen.ruta)
+    if factores is None:
+        st.info(f"Se necesitan al menos {PARTIDOS_MINIMOS} partidos, con victorias y derrotas, para el análisis.")
+    else:
+        row4_col1, row4_col2 = st.columns(2)
+        with row4_col1:
+            fig_matriz = px.imshow(
+                factores['correlaciones'], text_auto='.2f', zmin=-1, zmax=1,
+                color_continuous_scale='RdBu', title="Matriz de Correlaciones"
+            )
+            fig_matriz.update_layout(
+                template="plotly_dark",
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)'
+            )
+            st.plotly_chart(fig_matriz, use_container_width=True)
+        with row4_col2:
+            st.markdown("**Ranking de factores (regresión logística)**")
+            st.dataframe(
+                factores['ranking'],
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    'Coeficiente': st.column_config.NumberColumn(format="%.2f"),
+                    'Odds por +1 desvío': st.column_config.NumberColumn(format="%.2f"),
+                    'Correlación con victoria': st.column_config.NumberColumn(format="%.2f"),
+                }
+            )
+            st.caption(
+                f"📐 {factores['partidos']} partidos • exactitud en la muestra {factores['exactitud'] * 100:.0f}% "
+                f"• {factores['iteraciones']} iteraciones IRLS • {factores['filas_agregadas']} partido(s) nuevos incorporados"
+            )
+
     # Tabla de Datos Crudos
     with st.expander("Ver Planilla de Datos"):
-        st.dataframe(df.style.highlight_max(axis=0, color='#333333'))
+        st.dataframe(df.drop(columns=[c for c in df.columns if c.endswith('_Movil')]).style.highlight_max(axis=0, color='#333333'))
+        st.caption(f"💾 {resumen['partidos']} partidos en {almacen.ruta}")
 
 if __name__ == "__main__":
     main_kpi()
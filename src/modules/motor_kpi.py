@@ -0,0 +1,195 @@
+"""
+Motor de KPIs de Partidos - Club Universitario de La Plata
+Almacén local de partidos compartido por todas las sesiones (Parquet si hay
+pyarrow, si no CSV) y cálculo vectorizado de los KPIs: efectividades, promedios
+móviles de 5 partidos y correlación de cada indicador con la victoria.
+Los resultados se cachean por versión del archivo.
+"""
+
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+# ==========================================
+# CONFIGURACIÓN
+# ==========================================
+
+# data/ en la raíz del proyecto, sin importar desde dónde se lance la app
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DIRECTORIO_DATOS = os.path.join(RAIZ_PROYECTO, 'data')
+RUTA_PARTIDOS = os.path.join(DIRECTORIO_DATOS, 'partidos.parquet' if PARQUET_DISPONIBLE else 'partidos.csv')
+
+COLUMNAS_CONTEO = [
+    'Puntos_Favor', 'Puntos_Contra', 'Tackles_Hechos', 'Tackles_Errados',
+    'Entradas_22m', 'Puntos_en_22m', 'Scrum_Ganados', 'Scrum_Perdidos',
+    'Line_Ganados', 'Line_Perdidos', 'Penales_Cometidos',
+]
+COLUMNAS_PARTIDO = ['Rival', 'Fecha', 'Resultado'] + COLUMNAS_CONTEO
+
+# KPI -> (numerador, columnas del denominador, escala)
+DEFINICION_KPIS = {
+    'Efectividad_Tackle': ('Tackles_Hechos', ['Tackles_Hechos', 'Tackles_Errados'], 100),
+    'Eficiencia_22m': ('Puntos_en_22m', ['Entradas_22m'], 1),
+    'Efectividad_Scrum': ('Scrum_Ganados', ['Scrum_Ganados', 'Scrum_Perdidos'], 100),
+    'Efectividad_Line': ('Line_Ganados', ['Line_Ganados', 'Line_Perdidos'], 100),
+    'Dominio': ('Puntos_Favor', ['Puntos_Favor', 'Puntos_Contra'], 100),
+}
+# Indicadores que se promedian y se correlacionan con el resultado
+INDICADORES = list(DEFINICION_KPIS) + ['Penales_Cometidos']
+VENTANA_MOVIL = 5
+
+# Partidos de ejemplo para un almacén vacío
+PARTIDOS_EJEMPLO = [
+    {"Rival": "Los Tilos", "Fecha": "2024-03-15", "Resultado": "G", "Puntos_Favor": 28, "Puntos_Contra": 15, "Tackles_Hechos": 145, "Tackles_Errados": 12, "Entradas_22m": 8, "Puntos_en_22m": 21, "Scrum_Ganados": 8, "Scrum_Perdidos": 1, "Line_Ganados": 12, "Line_Perdidos": 2, "Penales_Cometidos": 8},
+    {"Rival": "San Luis", "Fecha": "2024-03-22", "Resultado": "P", "Puntos_Favor": 14, "Puntos_Contra": 20, "Tackles_Hechos": 110, "Tackles_Errados": 25, "Entradas_22m": 5, "Puntos_en_22m": 7, "Scrum_Ganados": 6, "Scrum_Perdidos": 2, "Line_Ganados": 10, "Line_Perdidos": 4, "Penales_Cometidos": 14},
+    {"Rival": "La Plata", "Fecha": "2024-03-29", "Resultado": "G", "Puntos_Favor": 35, "Puntos_Contra": 10, "Tackles_Hechos": 160, "Tackles_Errados": 8, "Entradas_22m": 10, "Puntos_en_22m": 28, "Scrum_Ganados": 9, "Scrum_Perdidos": 0, "Line_Ganados": 14, "Line_Perdidos": 1, "Penales_Cometidos": 6},
+]
+
+# ==========================================
+# ALMACÉN DE PARTIDOS
+# ==========================================
+
+def normalizar_partidos(df):
+    """Columnas y tipos fijos: conteos enteros, fecha ISO y resultado G/P/E"""
+    df = df.reindex(columns=COLUMNAS_PARTIDO)
+    df[COLUMNAS_CONTEO] = df[COLUMNAS_CONTEO].apply(pd.to_numeric, errors='coerce').fillna(0).astype('int64')
+    df['Rival'] = df['Rival'].fillna('').astype(str)
+    df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce').dt.strftime('%Y-%m-%d')
+    df['Resultado'] = df['Resultado'].fillna('').astype(str).str.upper()
+    return df.reset_index(drop=True)
+
+
+class AlmacenPartidos:
+    """
+    Historial de partidos en un archivo columnar local.
+    Las escrituras reemplazan el archivo de forma atómica (archivo temporal + rename)
+    y la versión es la marca de modificación, que sirve de clave de caché.
+    """
+
+    def __init__(self, ruta=RUTA_PARTIDOS):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+
+    def version(self):
+        try:
+            estado = os.stat(self.ruta)
+            return f"{estado.st_mtime_ns}-{estado.st_size}"
+        except FileNotFoundError:
+            return '0'
+
+    def leer(self):
+        """Partidos guardados (vacío si todavía no hay archivo; nunca los de ejemplo)"""
+        if not os.path.exists(self.ruta):
+            return normalizar_partidos(pd.DataFrame(columns=COLUMNAS_PARTIDO))
+        if self.ruta.endswith('.parquet'):
+            return normalizar_partidos(pd.read_parquet(self.ruta))
+        return normalizar_partidos(pd.read_csv(self.ruta))
+
+    def _escribir(self, df):
+        os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+        temporal = self.ruta + '.tmp'
+        if self.ruta.endswith('.parquet'):
+            df.to_parquet(temporal, index=False)
+        else:
+            df.to_csv(temporal, index=False)
+        os.replace(temporal, self.ruta)
+
+    def agregar(self, partido):
+        """Agrega un partido (dict) y devuelve la nueva versión"""
+        with self._lock:
+            df = pd.concat([self.leer(), normalizar_partidos(pd.DataFrame([partido]))], ignore_index=True)
+            self._escribir(df)
+        return self.version()
+
+    def eliminar(self, indices):
+        """Elimina partidos por posición"""
+        with self._lock:
+            df = self.leer()
+            self._escribir(df.drop(index=list(indices)).reset_index(drop=True))
+        return self.version()
+
+
+def partidos_para_mostrar(almacen):
+    """Partidos guardados, o los de ejemplo si el almacén está vacío: (DataFrame, es_ejemplo)"""
+    partidos = almacen.leer()
+    if partidos.empty:
+        return normalizar_partidos(pd.DataFrame(PARTIDOS_EJEMPLO)), True
+    return partidos, False
+
+
+@st.cache_resource
+def obtener_almacen_partidos():
+    """Almacén único por proceso, compartido por todas las sesiones"""
+    return AlmacenPartidos()
+
+# ==========================================
+# MOTOR DE KPIs (VECTORIZADO)
+# ==========================================
+
+def calcular_kpis(partidos):
+    """
+    Partidos ordenados por fecha con los KPIs de cada partido, sus promedios
+    móviles (columnas '<KPI>_Movil') y 'Victoria' (1 si ganó).
+    Un denominador en cero da 0, como en el panel original.
+    """
+    df = partidos.copy()
+    df['_fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
+    df = df.sort_values('_fecha', kind='mergesort', na_position='first').drop(columns='_fecha').reset_index(drop=True)
+
+    for kpi, (numerador, denominador, escala) in DEFINICION_KPIS.items():
+        arriba = df[numerador].to_numpy(dtype=float)
+        abajo = df[denominador].to_numpy(dtype=float).sum(axis=1)
+        df[kpi] = np.divide(arriba * escala, abajo, out=np.zeros(len(df)), where=abajo > 0)
+
+    moviles = df[INDICADORES].rolling(VENTANA_MOVIL, min_periods=1).mean()
+    df[[f"{c}_Movil" for c in INDICADORES]] = moviles.to_numpy()
+    df['Victoria'] = (df['Resultado'] == 'G').astype('int64')
+    return df
+
+
+def correlaciones_victoria(kpis):
+    """Correlación (punto-biserial) de cada indicador con la victoria, de mayor a menor |r|"""
+    if len(kpis) < 3 or kpis['Victoria'].nunique() < 2:
+        return pd.Series(dtype=float, name='r')
+    x = kpis[INDICADORES].to_numpy(dtype=float)
+    y = kpis['Victoria'].to_numpy(dtype=float)
+    xc = x - x.mean(axis=0)
+    yc = y - y.mean()
+    norma = np.sqrt((xc ** 2).sum(axis=0) * (yc ** 2).sum())
+    r = np.divide(xc.T @ yc, norma, out=np.full(x.shape[1], np.nan), where=norma > 0)
+    serie = pd.Series(r, index=INDICADORES, name='r').dropna()
+    return serie.reindex(serie.abs().sort_values(ascending=False).index)
+
+
+def resumen_temporada(kpis):
+    """Promedios globales de la temporada"""
+    total = len(kpis)
+    return {
+        'partidos': total,
+        'efectividad_tackle': kpis['Efectividad_Tackle'].mean() if total else 0.0,
+        'eficiencia_22m': kpis['Eficiencia_22m'].mean() if total else 0.0,
+        'penales': kpis['Penales_Cometidos'].mean() if total else 0.0,
+        'win_rate': kpis['Victoria'].mean() * 100 if total else 0.0,
+    }
+
+
+@st.cache_data(show_spinner=False)
+def motor_kpi(version, ruta=RUTA_PARTIDOS):
+    """KPIs, resumen y correlaciones del historial, calculados una vez por versión del archivo"""
+    partidos, es_ejemplo = partidos_para_mostrar(AlmacenPartidos(ruta))
+    kpis = calcular_kpis(partidos)
+    return {
+        'kpis': kpis,
+        'ejemplo': es_ejemplo,
+        'resumen': resumen_temporada(kpis),
+        'correlaciones': correlaciones_victoria(kpis),
+    }
@@ -0,0 +1,162 @@
+"""
+Motor de Percentiles - Área Física
+Precalcula, por cohorte (test, subtest, categoría, grupo de posición), los valores
+promedio de cada jugador ordenados con NumPy. Los percentiles se responden con
+búsqueda binaria y los rankings Top/Bottom leyendo los extremos del array.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .catalogo_tests import SIN_GRUPO
+
+# Niveles de cohorte precalculados (las claves ausentes funcionan como comodín)
+NIVELES_COHORTE = [
+    ('categoria', 'grupo'),   # misma categoría y grupo de posición
+    ('categoria',),           # toda la categoría
+    ('grupo',),               # mismo grupo de posición en todo el club
+    (),                       # todo el club
+]
+
+
+class MotorPercentiles:
+    """
+    Índice de cohortes para tests físicos.
+
+    Cada cohorte guarda dos arrays alineados: valores promedio por jugador
+    (orden ascendente) y nombres de jugador. Con eso:
+    - percentil(): O(log n) con np.searchsorted
+    - top()/bottom(): lectura directa de los extremos
+    """
+
+    def __init__(self, df, jugador_col='Nombre y Apellido', test_col='Test',
+                 subtest_col='Subtest', categoria_col='Categoría', valor_col='valor'):
+        self.cohortes = {}
+
+        if df is None or df.empty:
+            return
+        if any(c not in df.columns for c in [jugador_col, test_col, valor_col]):
+            return
+
+        valores = df[valor_col]
+        if not pd.api.types.is_numeric_dtype(valores):
+            valores = pd.to_numeric(valores.astype(str).str.replace(',', '.'), errors='coerce')
+
+        n = len(df)
+        base = pd.DataFrame({
+            'test': df[test_col].astype(str).to_numpy(),
+            'subtest': df[subtest_col].fillna('').astype(str).to_numpy() if subtest_col in df.columns else np.full(n, ''),
+            'categoria': df[categoria_col].astype(str).to_numpy() if categoria_col in df.columns else np.full(n, ''),
+            'grupo': df['grupo_id'].fillna(SIN_GRUPO).astype(int).to_numpy() if 'grupo_id' in df.columns else np.full(n, SIN_GRUPO),
+            'jugador': df[jugador_col].astype(str).to_numpy(),
+            'valor': valores.to_numpy(dtype=float),
+        }).dropna(subset=['valor'])
+
+        for nivel in NIVELES_COHORTE:
+            claves = ['test', 'subtest'] + list(nivel)
+            medias = base.groupby(claves + ['jugador'], sort=False)['valor'].mean().reset_index()
+            medias = medias.sort_values('valor', kind='mergesort')
+            array_valores = medias['valor'].to_numpy()
+            array_jugadores = medias['jugador'].to_numpy()
+
+            # Las posiciones de cada grupo quedan en orden ascendente de valor
+            for clave, posiciones in medias.groupby(claves, sort=False).indices.items():
+                partes = dict(zip(claves, clave))
+                self.cohortes[self._clave(
+                    partes['test'], partes['subtest'],
+                    partes.get('categoria'), partes.get('grupo')
+                )] = (array_valores[posiciones], array_jugadores[posiciones])
+
+    @staticmethod
+    def _clave(test, subtest='', categoria=None, grupo=None):
+        """Clave normalizada de cohorte; None = comodín"""
+        return (
+            str(test),
+            '' if subtest is None or pd.isna(subtest) else str(subtest),
+            None if categoria is None else str(categoria),
+            None if grupo is None else int(grupo),
+        )
+
+    def cohorte(self, test, subtest='', categoria=None, grupo=None):
+        """Devuelve (valores_ordenados, jugadores) de la cohorte o None"""
+        return self.cohortes.get(self._clave(test, subtest, categoria, grupo))
+
+    def percentil(self, valor, test, subtest='', categoria=None, grupo=None):
+        """Porcentaje de jugadores de la cohorte con valor menor o igual"""
+        datos = self.cohorte(test, subtest, categoria, grupo)
+        if datos is None or valor is None or pd.isna(valor):
+            return None
+        valores, _ = datos
+        return float(np.searchsorted(valores, valor, side='right') / len(valores) * 100)
+
+    def percentiles(self, valores, test, subtest='', categoria=None, grupo=None):
+        """Versión vectorizada de percentil() para un array de valores (NaN si no hay cohorte)"""
+        valores = np.asarray(valores, dtype=float)
+        datos = self.cohorte(test, subtest, categoria, grupo)
+        if datos is None:
+            return np.full(valores.shape, np.nan)
+        ordenados, _ = datos
+        resultado = np.searchsorted(ordenados, valores, side='right') / len(ordenados) * 100
+        return np.where(np.isnan(valores), np.nan, resultado)
+
+    def percentiles_filas(self, df, valor_col, test_col, subtest_col, categoria_col,
+                          por_categoria=True, por_grupo=False):
+        """
+        Percentil de cada fila del DataFrame contra su cohorte.
+        Recorre solo las combinaciones distintas de claves (pocas), no las filas.
+        """
+        resultado = np.full(len(df), np.nan)
+        if df.empty or self.vacio():
+            return resultado
+
+        n = len(df)
+        claves = pd.DataFrame({
+            'test': df[test_col].astype(str).to_numpy(),
+            'subtest': df[subtest_col].fillna('').astype(str).to_numpy() if subtest_col in df.columns else np.full(n, ''),
+            'categoria': df[categoria_col].astype(str).to_numpy() if por_categoria and categoria_col in df.columns else np.full(n, None),
+            'grupo': df['grupo_id'].to_numpy() if por_grupo and 'grupo_id' in df.columns else np.full(n, None),
+        })
+        valores = pd.to_numeric(df[valor_col], errors='coerce').to_numpy(dtype=float)
+
+        for (test, subtest, categoria, grupo), posiciones in claves.groupby(
+                ['test', 'subtest', 'categoria', 'grupo'], dropna=False, sort=False).indices.items():
+            categoria = None if categoria is None or pd.isna(categoria) else categoria
+            grupo = None if grupo is None or pd.isna(grupo) else grupo
+            resultado[posiciones] = self.percentiles(valores[posiciones], test, subtest, categoria, grupo)
+        return resultado
+
+    def top(self, n, test, subtest='', categoria=None, grupo=None):
+        """Los n mejores promedios de la cohorte como lista de (jugador, valor), de mayor a menor"""
+        datos = self.cohorte(test, subtest, categoria, grupo)
+        if datos is None:
+            return []
+        valores, jugadores = datos
+        return list(zip(jugadores[::-1][:n], valores[::-1][:n]))
+
+    def bottom(self, n, test, subtest='', categoria=None, grupo=None):
+        """Los n promedios más bajos de la cohorte como lista de (jugador, valor), de menor a mayor"""
+        datos = self.cohorte(test, subtest, categoria, grupo)
+        if datos is None:
+            return []
+        valores, jugadores = datos
+        return list(zip(jugadores[:n], valores[:n]))
+
+    def cuartiles(self, test, subtest='', categoria=None, grupo=None):
+        """(Q1, Q3) de la cohorte leídos del array ordenado, o None"""
+        datos = self.cohorte(test, subtest, categoria, grupo)
+        if datos is None:
+            return None
+        valores, _ = datos
+        return _cuantil_ordenado(valores, 0.25), _cuantil_ordenado(valores, 0.75)
+
+    def vacio(self):
+        return not self.cohortes
+
+
+def _cuantil_ordenado(valores, q):
+    """Cuantil con interpolación lineal sobre un array ya ordenado (O(1))"""
+    posicion = q * (len(valores) - 1)
+    inferior = int(np.floor(posicion))
+    superior = min(inferior + 1, len(valores) - 1)
+    return float(valores[inferior] + (valores[superior] - valores[inferior]) * (posicion - inferior))
+
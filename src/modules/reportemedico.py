@@ -155,24 +155,113 @@ def normalizar_dni(dni):
         return ""
     return str(dni).replace('.', '').replace('-', '').replace(' ', '').strip()
 
+# Columnas de fecha en orden de prioridad para ordenar el historial
+COLUMNAS_FECHA_MEDICA = ['Fecha de Atención', 'Marca temporal', 'Fecha']
+
+def parsear_fechas_medicas(textos):
+    """
+    Convierte una lista de fechas en texto a datetime (vectorizado).
+    Acepta ISO ('2024-03-05', como guarda el formulario) y dd/mm/aaaa [hh:mm]
+    (Marca temporal de Google Forms). Lo que no se pueda leer queda como NaT.
+    """
+    serie = pd.Series(textos, dtype=object)
+    fechas = pd.to_datetime(serie, format='ISO8601', errors='coerce')
+    return fechas.fillna(pd.to_datetime(serie, format='mixed', dayfirst=True, errors='coerce'))
+
+class IndiceMedico:
+    """
+    Índice de historiales médicos por DNI normalizado.
+    Se construye una sola vez a partir de los registros del Área Médica:
+    cada historial queda ordenado por fecha real (más reciente primero) y el
+    estado de entrenamiento de cada jugador se memoiza al primer uso.
+    """
+
+    def __init__(self, datos_medicos):
+        self.datos_medicos = list(datos_medicos or [])
+        self.columnas = list(self.datos_medicos[0].keys()) if self.datos_medicos else []
+        self.historiales = {}
+        self._estados = {}
+
+        if not self.datos_medicos:
+            return
+
+        dnis = [normalizar_dni(r.get('DNI', r.get('Dni', ''))) for r in self.datos_medicos]
+        textos_fecha = [
+            next((r.get(col) for col in COLUMNAS_FECHA_MEDICA if r.get(col)), None)
+            for r in self.datos_medicos
+        ]
+        orden = pd.DataFrame({
+            'dni': dnis,
+            'fecha': parsear_fechas_medicas(textos_fecha),
+        })
+        orden = orden[orden['dni'] != '']
+
+        # Más reciente primero; sin fecha al final; empates: el último cargado primero
+        orden = orden.iloc[::-1].sort_values('fecha', ascending=False, na_position='last', kind='mergesort')
+        for dni, posiciones in orden.groupby('dni', sort=False).indices.items():
+            self.historiales[dni] = [self.datos_medicos[i] for i in orden.index[posiciones]]
+
+    def fila_esperada(self):
+        """Número de fila que debería ocupar el próximo registro (fila 1 = encabezados)"""
+        return len(self.datos_medicos) + 2
+
+    def agregar(self, registro, numero_fila=None):
+        """
+        Incorpora un registro recién guardado sin releer la hoja.
+        Devuelve False si el número de fila informado por Google Sheets no coincide
+        con la cantidad de registros en memoria (hay filas que el índice no conoce).
+        """
+        if numero_fila is not None and numero_fila != self.fila_esperada():
+            return False
+
+        self.datos_medicos.append(registro)
+        if not self.columnas:
+            self.columnas = list(registro.keys())
+
+        dni = normalizar_dni(registro.get('DNI', registro.get('Dni', '')))
+        if not dni:
+            return True
+
+        # El nuevo registro va primero para que gane los empates de fecha
+        historial = [registro] + self.historiales.get(dni, [])
+        fechas = parsear_fechas_medicas([
+            next((r.get(col) for col in COLUMNAS_FECHA_MEDICA if r.get(col)), None)
+            for r in historial
+        ])
+        orden = fechas.sort_values(ascending=False, na_position='last', kind='mergesort').index
+        self.historiales[dni] = [historial[i] for i in orden]
+        self._estados.pop(dni, None)
+        return True
+
+    def historial(self, dni):
+        """Historial del jugador (más reciente primero); lista vacía si no tiene registros"""
+        return self.historiales.get(normalizar_dni(dni), [])
+
+    def estado(self, dni):
+        """Estado de entrenamiento actual del jugador (memoizado)"""
+        dni_normalizado = normalizar_dni(dni)
+        if dni_normalizado not in self._estados:
+            self._estados[dni_normalizado] = estado_entrenamiento_actual(self.historiales.get(dni_normalizado))
+        return self._estados[dni_normalizado]
+
+    def estados_plantel(self, jugadores):
+        """Estado de entrenamiento de todo el plantel en una pasada: {dni normalizado: estado}"""
+        return {
+            normalizar_dni(j.get('dni', '')): self.estado(j.get('dni', ''))
+            for j in jugadores
+        }
+
+def obtener_indice_medico(forzar_recarga=False):
+    """Índice médico de la sesión; se recarga desde Google Sheets solo si se pide"""
+    if forzar_recarga or 'indice_medico' not in st.session_state:
+        st.session_state['indice_medico'] = IndiceMedico(conectar_area_medica())
+    return st.session_state['indice_medico']
+
 def obtener_historial_por_dni(dni, datos_medicos):
-    """Obtener historial médico por DNI"""
-    dni_normalizado = normalizar_dni(dni)
-    if not dni_normalizado:
-        return []
-    
-    historial = []
-    for registro in datos_medicos:
-        dni_registro = normalizar_dni(registro.get('DNI', registro.get('Dni', '')))
-        if dni_registro and dni_registro == dni_normalizado:
-            historial.append(registro)
-    
-    # Ordenar por fecha (más reciente primero)
-    historial.sort(
-        key=lambda x: x.get('Fecha de Atención', x.get('Marca temporal', '1900-01-01')),
-        reverse=True
-    )
-    return historial
+    """Obtener historial médico por DNI (acepta un IndiceMedico o la lista de registros)"""
+    if not isinstance(datos_medicos, IndiceMedico):
+        datos_medicos = IndiceMedico(datos_medicos)
+    return datos_medicos.historial(dni)
 
 def diagnosticar_sistema():
     """Función de diagnóstico completo del sistema"""
@@ -268,7 +357,9 @@ def main_reporte_medico():
     # 1. CARGAR DATOS (Esto faltaba y es crucial para que funcionen los filtros)
     with st.spinner("🔄 Cargando base de datos de jugadores y reportes médicos..."):
          jugadores = conectar_base_central()
-         datos_medicos = conectar_area_medica()
+         indice_medico = obtener_indice_medico(
+             forzar_recarga=st.session_state.pop('recargar_datos_medicos', False)
+         )
 
     # 🎨 CSS personalizado
     st.markdown("""
@@ -366,6 +457,19 @@ def main_reporte_medico():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+    # 📊 Estado del plantel filtrado (una sola pasada sobre el índice)
+    if jugadores_filtrados:
+        estados = indice_medico.estados_plantel(jugadores_filtrados)
+        valores_estado = list(estados.values())
+        e1, e2, e3, e4 = st.columns(4)
+        e1.metric("✅ Activos", valores_estado.count('Activo'))
+        e2.metric("🟡 Diferenciados", valores_estado.count('Diferenciado'))
+        e3.metric("🔴 Inactivos", valores_estado.count('Inactivo'))
+        with e4:
+            if st.button("🔄 Actualizar datos médicos", key="recargar_medicos"):
+                st.session_state['recargar_datos_medicos'] = True
+                st.rerun()
+
     # 🎯 Encontrar jugador seleccionado en la lista de jugadores (Base Central)
     jugador_actual = None
     if jugador_seleccionado != 'Seleccionar jugador...':
@@ -471,34 +575,37 @@ def main_reporte_medico():
                     tratamiento                    # Medicamentos recetados (si corresponde)
                 ]
                 google_creds = get_google_credentials()
-        # Guardar el reporte
-        if google_creds:
-            try:
-                try:
-                    from src.modules.areamedica import append_google_sheet_row
-                except ImportError:
-                    from areamedica import append_google_sheet_row
-                append_google_sheet_row(
-                    sheet_id='1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ',
-                    worksheet_name='Respuestas de formulario 1',
-                    row_data=nuevo_reporte,
-                    credentials_dict=google_creds
-                )
-                st.success("✅ Reporte guardado en Google Sheets")
-                # Recargar datos médicos para mostrar el historial actualizado
-                datos_medicos = conectar_area_medica()
-            except Exception as e:
-                st.error(f"❌ Error guardando reporte: {e}")
-        else:
-            st.error("❌ No se pudo obtener credenciales de Google")
-        # Ocultar el formulario
-        st.session_state['mostrar_formulario_reporte'] = False
+                # Guardar el reporte: una sola escritura, sin volver a leer toda la hoja
+                if google_creds:
+                    try:
+                        try:
+                            from src.modules.areamedica import append_google_sheet_row
+                        except ImportError:
+                            from areamedica import append_google_sheet_row
+                        resultado = append_google_sheet_row(
+                            sheet_id='1ham2WSMQa3eEv0V0TtHcAa55R3WLGoBje6pSOoNxcBQ',
+                            worksheet_name='Respuestas de formulario 1',
+                            row_data=nuevo_reporte,
+                            credentials_dict=google_creds,
+                            columns=indice_medico.columnas or None
+                        )
+                        st.success("✅ Reporte guardado en Google Sheets")
+                        # Incorporar el registro al índice en memoria; si la hoja cambió por
+                        # otro lado (número de fila inesperado) se recarga completa
+                        if not indice_medico.agregar(resultado['record'], resultado.get('row_number')):
+                            indice_medico = obtener_indice_medico(forzar_recarga=True)
+                    except Exception as e:
+                        st.error(f"❌ Error guardando reporte: {e}")
+                else:
+                    st.error("❌ No se pudo obtener credenciales de Google")
+                # Ocultar el formulario
+                st.session_state['mostrar_formulario_reporte'] = False
 
 
 
     if jugador_actual:
         dni_jugador = jugador_actual.get('dni', '').strip()
-        historial_medico = obtener_historial_por_dni(dni_jugador, datos_medicos)
+        historial_medico = indice_medico.historial(dni_jugador)
         
         st.markdown('<div class="resumen-card">', unsafe_allow_html=True)
         
@@ -513,7 +620,7 @@ def main_reporte_medico():
         
        
         st.markdown(f"<h2 style='text-align:left; color:#1e3c72;'>{nombre_jugador}</h2>", unsafe_allow_html=True)
-        estado_entrenamiento = estado_entrenamiento_actual(historial_medico)
+        estado_entrenamiento = indice_medico.estado(dni_jugador)
         if estado_entrenamiento == 'Activo':
             st.markdown("### Estado: ✅ Activo (Apto para entrenar)")
         elif estado_entrenamiento == 'Diferenciado':
@@ -0,0 +1,350 @@
+"""
+Almacén de Registros Sincronizados
+Registros importados de Google Sheets (médicos, nutrición, fuerza y campo) en
+archivos JSONL de solo agregado: cada sincronización escribe únicamente las
+líneas nuevas, con un índice en memoria por id y timestamp. La compactación
+reescribe el archivo sin versiones reemplazadas ni registros eliminados.
+Las escrituras y la compactación toman un lock de archivo (<ruta>.lock), así
+varios procesos (Streamlit y el sincronizador por cron) comparten el almacén.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+DIRECTORIO_DATOS = "data"
+
+# Almacén -> clave de la lista en el JSON histórico (para migrarlo)
+ALMACENES = {
+    "medical_records": "injuries",
+    "nutrition_records": "meal_plans",
+    "strength_tests": "tests",
+    "field_tests": "tests",
+}
+
+CAMPO_ELIMINADO = "_eliminado"
+# Huella de contenido de la fila de origen: si cambia, el registro se vuelve a guardar
+CAMPO_HUELLA = "sync_hash"
+# Metadatos de cada sincronización: no cuentan al comparar el contenido de dos registros
+CAMPOS_DE_SYNC = ("id", "sync_date", "created_at", "created_date", CAMPO_HUELLA)
+
+# Compactar cuando las líneas obsoletas superan esta proporción (y este mínimo)
+PROPORCION_COMPACTACION = 0.5
+MINIMO_COMPACTACION = 1000
+
+
+def _linea(registro: Dict) -> bytes:
+    return json.dumps(registro, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+
+
+def _clave_contenido(registro: Dict) -> str:
+    # Las fechas que faltan en la hoja toman el día de la sincronización: no se comparan
+    dia_sync = str(registro.get("sync_date", ""))[:10]
+    return json.dumps(
+        {k: v for k, v in registro.items() if k not in CAMPOS_DE_SYNC and not (dia_sync and v == dia_sync)},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+
+
+class AlmacenRegistros:
+    """
+    Archivo JSONL con índice id -> posición (byte) de la última versión de cada registro.
+    Un registro con un id ya existente reemplaza al anterior (gana la última línea);
+    eliminar agrega una lápida. El índice se actualiza leyendo solo lo agregado
+    desde la última lectura, incluso si otro proceso escribió el archivo.
+    """
+
+    def __init__(self, ruta: str, clave_json: Optional[str] = None):
+        self.ruta = ruta
+        self.clave_json = clave_json
+        self._lock = threading.RLock()
+        self._archivo_lock = None
+        self._posiciones: Dict[str, int] = {}
+        self._timestamps: Dict[str, str] = {}
+        self._huellas: Dict[str, str] = {}
+        # Registros importados antes de los IDs estables (sin huella): contenido -> ids
+        self._heredados: Dict[str, List[str]] = defaultdict(list)
+        self._clave_heredado: Dict[str, str] = {}
+        self._lineas = 0
+        self._leido = 0
+        self._inodo = None
+
+    @contextmanager
+    def _bloqueo(self):
+        """Lock entre hilos y, con fcntl, entre procesos (reentrante dentro del proceso)"""
+        with self._lock:
+            if fcntl is None or self._archivo_lock is not None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            with open(self.ruta + ".lock", "a") as archivo:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+                self._archivo_lock = archivo
+                try:
+                    yield
+                finally:
+                    self._archivo_lock = None
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    # ------------------------------------------
+    # Índice
+    # ------------------------------------------
+
+    def _reiniciar_indice(self):
+        self._posiciones = {}
+        self._timestamps = {}
+        self._huellas = {}
+        self._heredados = defaultdict(list)
+        self._clave_heredado = {}
+        self._lineas = 0
+        self._leido = 0
+
+    def _indexar(self, registro: Dict, posicion: int):
+        self._lineas += 1
+        id_registro = str(registro.get("id", ""))
+        self._olvidar_heredado(id_registro)
+        if registro.get(CAMPO_ELIMINADO):
+            self._posiciones.pop(id_registro, None)
+            self._timestamps.pop(id_registro, None)
+            self._huellas.pop(id_registro, None)
+            return
+        self._posiciones[id_registro] = posicion
+        if registro.get("timestamp"):
+            self._timestamps[id_registro] = str(registro["timestamp"])
+        if registro.get(CAMPO_HUELLA):
+            self._huellas[id_registro] = str(registro[CAMPO_HUELLA])
+        else:
+            self._huellas.pop(id_registro, None)
+            if registro.get("sheet_url"):
+                clave = _clave_contenido(registro)
+                self._heredados[clave].append(id_registro)
+                self._clave_heredado[id_registro] = clave
+
+    def _olvidar_heredado(self, id_registro: str):
+        clave = self._clave_heredado.pop(id_registro, None)
+        if clave is not None:
+            self._heredados[clave].remove(id_registro)
+            if not self._heredados[clave]:
+                del self._heredados[clave]
+
+    def _heredados_reemplazados(self, registros: List[Dict]) -> List[str]:
+        """
+        Ids de registros importados antes de los IDs estables con el mismo contenido
+        que los nuevos: se reemplazan (lápida) en vez de quedar duplicados en la
+        primera sincronización posterior al cambio.
+        """
+        if not self._heredados:
+            return []
+        usados = defaultdict(int)
+        reemplazados = []
+        for registro in registros:
+            if not registro.get(CAMPO_HUELLA):
+                continue
+            clave = _clave_contenido(registro)
+            ids = self._heredados.get(clave, [])
+            if usados[clave] < len(ids):
+                reemplazados.append(ids[usados[clave]])
+                usados[clave] += 1
+        return reemplazados
+
+    def _actualizar_indice(self):
+        """Lee solo las líneas agregadas desde la última vez (todo si el archivo se reemplazó)"""
+        self._migrar_json()
+        try:
+            estado = os.stat(self.ruta)
+        except FileNotFoundError:
+            self._reiniciar_indice()
+            self._inodo = None
+            return
+        if estado.st_ino != self._inodo or estado.st_size < self._leido:
+            self._reiniciar_indice()
+            self._inodo = estado.st_ino
+        if estado.st_size == self._leido:
+            return
+        with open(self.ruta, "rb") as archivo:
+            archivo.seek(self._leido)
+            posicion = self._leido
+            for linea in archivo:
+                if not linea.endswith(b"\n"):
+                    break  # línea a medio escribir: se indexa en la próxima lectura
+                try:
+                    self._indexar(json.loads(linea), posicion)
+                except ValueError:
+                    pass
+                posicion += len(linea)
+            self._leido = posicion
+
+    def _migrar_json(self):
+        """Convierte una sola vez el JSON histórico ({clave: [...]}) a JSONL"""
+        if self.clave_json is None or os.path.exists(self.ruta):
+            return
+        ruta_json = os.path.splitext(self.ruta)[0] + ".json"
+        if not os.path.exists(ruta_json):
+            return
+        with self._bloqueo():
+            if os.path.exists(self.ruta):
+                return  # otro proceso ya migró (y quizás agregó registros)
+            try:
+                with open(ruta_json, "r", encoding="utf-8") as archivo:
+                    registros = json.load(archivo).get(self.clave_json, [])
+            except (ValueError, AttributeError):
+                return
+            self._reemplazar(registros)
+
+    def _reemplazar(self, registros: List[Dict]):
+        os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "wb") as archivo:
+            archivo.writelines(_linea(r) for r in registros)
+        os.replace(temporal, self.ruta)
+
+    # ------------------------------------------
+    # Escritura
+    # ------------------------------------------
+
+    def agregar(self, registros: List[Dict]) -> int:
+        """
+        Agrega los registros al final del archivo (O(nuevos)); devuelve cuántos escribió.
+        Los registros sin huella con el mismo contenido que uno nuevo (importados
+        antes de los IDs estables) quedan eliminados.
+        """
+        if not registros:
+            return 0
+        with self._bloqueo():
+            self._actualizar_indice()
+            lapidas = [{"id": i, CAMPO_ELIMINADO: True} for i in self._heredados_reemplazados(registros)]
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            with open(self.ruta, "ab") as archivo:
+                archivo.write(b"".join(_linea(r) for r in registros + lapidas))
+            self._actualizar_indice()
+            self.compactar_si_conviene()
+        return len(registros)
+
+    def eliminar(self, id_registro: str) -> bool:
+        """Agrega una lápida para el id; la compactación lo quita del archivo"""
+        with self._bloqueo():
+            if not self.contiene_id(id_registro):
+                return False
+            with open(self.ruta, "ab") as archivo:
+                archivo.write(_linea({"id": id_registro, CAMPO_ELIMINADO: True}))
+            self._actualizar_indice()
+        return True
+
+    def lineas_obsoletas(self) -> int:
+        with self._lock:
+            self._actualizar_indice()
+            return self._lineas - len(self._posiciones)
+
+    def compactar_si_conviene(self) -> bool:
+        obsoletas = self.lineas_obsoletas()
+        if obsoletas >= MINIMO_COMPACTACION and obsoletas > self._lineas * PROPORCION_COMPACTACION:
+            self.compactar()
+            return True
+        return False
+
+    def compactar(self) -> int:
+        """
+        Reescribe el archivo con la última versión de cada registro; devuelve líneas
+        eliminadas. Con el lock de archivo ningún otro proceso agrega mientras tanto.
+        """
+        with self._bloqueo():
+            self._actualizar_indice()
+            obsoletas = self._lineas - len(self._posiciones)
+            if obsoletas:
+                self._reemplazar(list(self.iterar()))
+                self._actualizar_indice()
+            return obsoletas
+
+    # ------------------------------------------
+    # Lectura
+    # ------------------------------------------
+
+    def contiene_id(self, id_registro: str) -> bool:
+        with self._lock:
+            self._actualizar_indice()
+            return str(id_registro) in self._posiciones
+
+    def filtrar_nuevos(self, registros: List[Dict]) -> List[Dict]:
+        """
+        Registros cuyo id todavía no está en el almacén, o que está pero con otra
+        huella de contenido (la fila se editó: la nueva versión reemplaza a la
+        anterior). Los repetidos en el mismo lote se guardan una sola vez.
+        """
+        with self._lock:
+            self._actualizar_indice()
+            vistos = set(self._posiciones)
+            huellas = dict(self._huellas)
+        nuevos = []
+        for registro in registros:
+            id_registro = str(registro.get("id", ""))
+            huella = registro.get(CAMPO_HUELLA)
+            if id_registro not in vistos or (huella and huellas.get(id_registro) != str(huella)):
+                vistos.add(id_registro)
+                huellas[id_registro] = str(huella) if huella else ''
+                nuevos.append(registro)
+        return nuevos
+
+    def timestamps(self) -> set:
+        """Timestamps de los registros vigentes (para deduplicar importaciones)"""
+        with self._lock:
+            self._actualizar_indice()
+            return set(self._timestamps.values())
+
+    def obtener(self, id_registro: str) -> Optional[Dict]:
+        """Última versión de un registro, leída directamente desde su posición"""
+        with self._lock:
+            self._actualizar_indice()
+            posicion = self._posiciones.get(str(id_registro))
+            if posicion is None:
+                return None
+            with open(self.ruta, "rb") as archivo:
+                archivo.seek(posicion)
+                return json.loads(archivo.readline())
+
+    def iterar(self) -> Iterator[Dict]:
+        """Recorre los registros vigentes en orden de escritura, sin cargar el archivo entero"""
+        with self._lock:
+            self._actualizar_indice()
+            vigentes = set(self._posiciones.values())
+            limite = self._leido
+            if not vigentes:
+                return
+            # Abierto bajo el lock: una compactación posterior no cambia este archivo
+            archivo = open(self.ruta, "rb")
+        with archivo:
+            posicion = 0
+            for linea in archivo:
+                if posicion >= limite:
+                    break
+                if posicion in vigentes:
+                    yield json.loads(linea)
+                posicion += len(linea)
+
+    def leer_todos(self) -> List[Dict]:
+        return list(self.iterar())
+
+    def __len__(self):
+        with self._lock:
+            self._actualizar_indice()
+            return len(self._posiciones)
+
+
+_almacenes: Dict[str, AlmacenRegistros] = {}
+_lock_almacenes = threading.Lock()
+
+
+def obtener_almacen(nombre: str, directorio: str = DIRECTORIO_DATOS) -> AlmacenRegistros:
+    """Almacén único por proceso para cada tipo de registro (medical_records, nutrition_records, ...)"""
+    ruta = os.path.join(directorio, f"{nombre}.jsonl")
+    with _lock_almacenes:
+        if ruta not in _almacenes:
+            _almacenes[ruta] = AlmacenRegistros(ruta, ALMACENES.get(nombre))
+        return _almacenes[ruta]
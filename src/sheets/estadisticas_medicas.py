@@ -0,0 +1,160 @@
+"""
+Estadísticas de Registros Médicos
+Cálculo vectorizado (pandas) de todos los contadores del tablero médico a partir
+de los registros de Google Sheets: fechas parseadas en bloque, severidad como
+categórico y caché por versión de la hoja.
+"""
+
+import copy
+from datetime import datetime, date
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Severidad canónica, de menor a mayor
+NIVELES_SEVERIDAD = ["Leve", "Moderada", "Grave", "Sin dato"]
+TIPO_SEVERIDAD = pd.CategoricalDtype(NIVELES_SEVERIDAD, ordered=True)
+PATRON_GRAVE = r"grave|cr[ií]tic|sever|serio"
+PATRON_MODERADA = r"moderad|intermedi"
+PATRON_LEVE = r"leve|menor"
+
+# "casos_graves" de cada tablero: columnas y patrón que usaba cada método original,
+# así sus números no cambian (se aplica al texto en minúsculas y, como en todos los
+# contadores, sin espacios alrededor). PATRON_GRAVE solo se usa en "por_severidad".
+CRITERIOS_GRAVE = {
+    # GoogleSheetsManager.get_statistics
+    "registros": (("severidad",), r"grave|crítico|severo"),
+    # FormulariosGoogleSheets.get_statistics (cuenta cada columna que coincide)
+    "formularios": (("severidad", "gravedad"), r"grave|crítico|serio"),
+    # FormulariosGoogleSheets.get_medical_statistics (valor exacto)
+    "resumen": (("severidad",), r"^(?:grave|severa|critica)$"),
+}
+
+ESTADOS_LESION_ACTIVA = ["activa", "active", "en tratamiento"]
+
+FORMATO_FECHA = "%Y-%m-%d"
+FORMATO_TIMESTAMP = "%Y-%m-%d %H:%M:%S"
+
+_ESTADISTICAS_VACIAS = {
+    "total_registros": 0,
+    "registros_hoy": 0,
+    "registros_semana": 0,
+    "profesionales_activos": 0,
+    "casos_graves": 0,
+    "registros_activos": 0,
+    "lesiones_activas": 0,
+    "ultimo_registro": "N/A",
+    "por_severidad": {nivel: 0 for nivel in NIVELES_SEVERIDAD},
+    "por_division": {},
+    "por_estado": {},
+}
+
+
+def estadisticas_vacias() -> Dict:
+    """Contadores en cero (copia independiente)"""
+    return {**copy.deepcopy(_ESTADISTICAS_VACIAS), "ultima_actualizacion": datetime.now().strftime("%Y-%m-%d %H:%M")}
+
+
+def registros_a_dataframe(records: List[Dict]) -> pd.DataFrame:
+    """Registros (lista de dicts) como DataFrame de texto con columnas normalizadas"""
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+    return df.where(df.notna(), "").astype(str).apply(lambda col: col.str.strip())
+
+
+def clasificar_severidad(serie: pd.Series) -> pd.Series:
+    """Texto libre de severidad -> categórico ordenado (clasifica cada valor distinto una sola vez)"""
+    codigos = serie.astype("category")
+    textos = pd.Series(codigos.cat.categories, dtype=object).str.lower()
+    canonicas = np.select(
+        [
+            textos.str.contains(PATRON_GRAVE).to_numpy(),
+            textos.str.contains(PATRON_MODERADA).to_numpy(),
+            textos.str.contains(PATRON_LEVE).to_numpy(),
+        ],
+        ["Grave", "Moderada", "Leve"],
+        default="Sin dato"
+    )
+    mapa = dict(zip(codigos.cat.categories, canonicas))
+    return codigos.map(mapa).astype(TIPO_SEVERIDAD).fillna("Sin dato")
+
+
+def _columna(df: pd.DataFrame, *nombres: str) -> pd.Series:
+    """Primera columna existente entre los nombres, o una serie vacía"""
+    for nombre in nombres:
+        if nombre in df.columns:
+            return df[nombre]
+    return pd.Series("", index=df.index, dtype=object)
+
+
+def contar_casos_graves(df: pd.DataFrame, criterio: str = "registros") -> int:
+    """Casos graves según el criterio histórico del tablero (ver CRITERIOS_GRAVE)"""
+    columnas, patron = CRITERIOS_GRAVE[criterio]
+    return sum(
+        int(df[columna].astype(str).str.lower().str.contains(patron).sum())
+        for columna in columnas if columna in df.columns
+    )
+
+
+def calcular_estadisticas(df: pd.DataFrame, hoy: Optional[date] = None, criterio_grave: str = "registros") -> Dict:
+    """
+    Todos los contadores del tablero en una sola pasada vectorizada.
+    Incluye las claves históricas de get_statistics / get_medical_statistics;
+    `criterio_grave` elige cómo cuenta "casos_graves" cada una.
+    """
+    if df is None or df.empty:
+        return estadisticas_vacias()
+
+    hoy = hoy or datetime.now().date()
+    fechas = pd.to_datetime(_columna(df, "fecha_registro"), format=FORMATO_FECHA, errors="coerce").dt.date
+    severidad = clasificar_severidad(_columna(df, "severidad", "gravedad"))
+    estado = _columna(df, "estado", "status").str.lower()
+    profesionales = _columna(df, "nombre_profesional")
+
+    # Último registro: timestamp de la última fila
+    ultimo_registro = "N/A"
+    ultimo_timestamp = _columna(df, "timestamp").iloc[-1]
+    if ultimo_timestamp:
+        instante = pd.to_datetime(ultimo_timestamp, format=FORMATO_TIMESTAMP, errors="coerce")
+        ultimo_registro = instante.strftime("%d/%m/%Y %H:%M") if pd.notna(instante) else ultimo_timestamp[:16]
+
+    por_severidad = severidad.value_counts(sort=False).reindex(NIVELES_SEVERIDAD, fill_value=0)
+    dias = (pd.Timestamp(hoy) - pd.to_datetime(fechas)).dt.days
+
+    return {
+        "total_registros": len(df),
+        "registros_hoy": int((fechas == hoy).sum()),
+        "registros_semana": int(dias.between(0, 6).sum()),
+        "profesionales_activos": int(profesionales[profesionales != ""].nunique()),
+        "casos_graves": contar_casos_graves(df, criterio_grave),
+        "registros_activos": int(estado.str.contains("activ").sum()),
+        "lesiones_activas": int(estado.isin(ESTADOS_LESION_ACTIVA).sum()),
+        "ultimo_registro": ultimo_registro,
+        "ultima_actualizacion": datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "por_severidad": {nivel: int(n) for nivel, n in por_severidad.items()},
+        "por_division": {k: int(v) for k, v in _columna(df, "division").replace("", "Sin división").value_counts().items()},
+        "por_estado": {k: int(v) for k, v in _columna(df, "estado").replace("", "Sin estado").value_counts().items()},
+    }
+
+
+def version_registros(df: pd.DataFrame) -> str:
+    """Huella del contenido de la hoja para invalidar la caché cuando cambia"""
+    if df is None or df.empty:
+        return "0"
+    return f"{len(df)}-{int(pd.util.hash_pandas_object(df, index=False).sum()) & 0xFFFFFFFF:08x}"
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def estadisticas_por_version(_df: pd.DataFrame, version: str, hoy_iso: str, criterio_grave: str = "registros") -> Dict:
+    """calcular_estadisticas cacheado por versión de la hoja y día (el DataFrame no se hashea)"""
+    return calcular_estadisticas(_df, date.fromisoformat(hoy_iso), criterio_grave)
+
+
+def estadisticas_dataframe(df: pd.DataFrame, criterio_grave: str = "registros") -> Dict:
+    """Estadísticas del tablero para un DataFrame de registros, con caché por versión"""
+    return estadisticas_por_version(df, version_registros(df), datetime.now().date().isoformat(), criterio_grave)
@@ -12,6 +12,9 @@ from typing import List, Dict, Optional, Tuple
 import os
 import json
 
+from .almacen_registros import obtener_almacen
+from .estadisticas_medicas import estadisticas_dataframe, estadisticas_vacias, registros_a_dataframe
+
 
 import os
 
@@ -265,69 +268,6 @@ class FormulariosGoogleSheets:
             # Usar API pública directamente
             return self.get_public_data()
     
-    def get_statistics(self) -> Dict:
-        """
-        Obtener estadísticas de los registros médicos
-        
-        Returns:
-            Dict: Diccionario con estadísticas
-        """
-        success, records = self.read_medical_records()
-        
-        if not success or not records:
-            return {
-                "total_registros": 0,
-                "registros_hoy": 0,
-                "profesionales_activos": 0,
-                "casos_graves": 0,
-                "ultimo_registro": "N/A"
-            }
-        
-        # Calcular estadísticas
-        hoy = datetime.now().date()
-        registros_hoy = 0
-        profesionales = set()
-        casos_graves = 0
-        
-        for record in records:
-            # Profesionales únicos
-            if record.get("nombre_profesional"):
-                profesionales.add(record["nombre_profesional"])
-            
-            # Registros de hoy
-            fecha_str = record.get("fecha_registro", "")
-            if fecha_str:
-                try:
-                    fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-                    if fecha == hoy:
-                        registros_hoy += 1
-                except:
-                    pass
-            
-            # Casos graves
-            severidad = record.get("severidad", "").lower()
-            if any(word in severidad for word in ["grave", "crítico", "severo"]):
-                casos_graves += 1
-        
-        # Último registro
-        ultimo_registro = "N/A"
-        if records:
-            ultimo_timestamp = records[-1].get("timestamp", "")
-            if ultimo_timestamp:
-                try:
-                    dt = datetime.strptime(ultimo_timestamp, "%Y-%m-%d %H:%M:%S")
-                    ultimo_registro = dt.strftime("%d/%m/%Y %H:%M")
-                except:
-                    ultimo_registro = ultimo_timestamp[:16]
-        
-        return {
-            "total_registros": len(records),
-            "registros_hoy": registros_hoy,
-            "profesionales_activos": len(profesionales),
-            "casos_graves": casos_graves,
-            "ultimo_registro": ultimo_registro
-        }
-    
     def _determinar_estado(self, severidad: str) -> str:
         """
         Determinar estado del paciente basado en severidad
@@ -363,16 +303,9 @@ class FormulariosGoogleSheets:
             if not success or not gs_records:
                 return 0
             
-            # Cargar registros existentes del sistema CAR
-            from src.utils import load_json_data, save_medical_data
-            
-            existing_data = load_json_data('data/medical_records.json', {'injuries': []})
-            
-            # Crear set de timestamps existentes para evitar duplicados
-            existing_timestamps = set()
-            for injury in existing_data['injuries']:
-                if 'timestamp' in injury:
-                    existing_timestamps.add(injury['timestamp'])
+            # Timestamps ya importados, desde el índice del almacén (sin leer el historial)
+            almacen = obtener_almacen('medical_records')
+            existing_timestamps = almacen.timestamps()
             
             # Convertir registros de Google Sheets al formato CAR
             nuevos_registros = []
@@ -398,9 +331,7 @@ class FormulariosGoogleSheets:
             
             if nuevos_registros:
                 # Agregar al sistema CAR
-                existing_data['injuries'].extend(nuevos_registros)
-                save_medical_data(existing_data['injuries'])
-                return len(nuevos_registros)
+                return almacen.agregar(nuevos_registros)
             
             return 0
             
@@ -428,16 +359,12 @@ class FormulariosGoogleSheets:
                     "error": "No se pudieron cargar los datos"
                 }
             
-            # Calcular estadísticas
-            lesiones_totales = len(records)
-            lesiones_activas = len([r for r in records if r.get('estado', '').lower() in ['activa', 'active', 'en tratamiento']])
-            casos_graves = len([r for r in records if r.get('severidad', '').lower() in ['grave', 'severa', 'critica']])
-            
+            estadisticas = estadisticas_dataframe(registros_a_dataframe(records), criterio_grave="resumen")
             return {
-                "lesiones_totales": lesiones_totales,
-                "lesiones_activas": lesiones_activas,
-                "registros_google": lesiones_totales,
-                "casos_graves": casos_graves,
+                "lesiones_totales": estadisticas["total_registros"],
+                "lesiones_activas": estadisticas["lesiones_activas"],
+                "registros_google": estadisticas["total_registros"],
+                "casos_graves": estadisticas["casos_graves"],
                 "ultima_actualizacion": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "error": None
             }
@@ -543,6 +470,9 @@ class FormulariosGoogleSheets:
         """
         Obtener estadísticas mejoradas con fallback a API pública
         
+        Todos los contadores del tablero en una sola llamada, calculados con
+        pandas (fechas y severidad vectorizadas) y cacheados por versión de la hoja.
+        
         Returns:
             Dict: Estadísticas médicas
         """
@@ -561,55 +491,24 @@ class FormulariosGoogleSheets:
         Obtener estadísticas usando API pública
         
         Returns:
-            Dict: Estadísticas básicas
+            Dict: Estadísticas del tablero
         """
         try:
             success, data = self.get_public_data()
             
             if not success or not data:
-                return {
-                    'total_registros': 0,
-                    'registros_activos': 0,
-                    'casos_graves': 0,
-                    'ultima_actualizacion': 'Sin datos'
-                }
-            
-            # Calcular estadísticas
-            total_registros = len(data)
-            registros_activos = 0
-            casos_graves = 0
-            
-            for row in data:
-                # Buscar estados activos (adaptable a diferentes columnas)
-                for key, value in row.items():
-                    if isinstance(value, str):
-                        value_lower = value.lower()
-                        if 'activ' in value_lower and key.lower() in ['estado', 'status']:
-                            registros_activos += 1
-                        if any(word in value_lower for word in ['grave', 'crítico', 'serio']) and key.lower() in ['severidad', 'gravedad']:
-                            casos_graves += 1
+                return {**estadisticas_vacias(), 'ultima_actualizacion': 'Sin datos'}
             
-            return {
-                'total_registros': total_registros,
-                'registros_activos': registros_activos,
-                'casos_graves': casos_graves,
-                'ultima_actualizacion': datetime.now().strftime("%Y-%m-%d %H:%M")
-            }
+            return estadisticas_dataframe(registros_a_dataframe(data), criterio_grave="formularios")
             
         except Exception as e:
-            return {
-                'total_registros': 0,
-                'registros_activos': 0,
-                'casos_graves': 0,
-                'ultima_actualizacion': 'Error'
-            }
+            return {**estadisticas_vacias(), 'ultima_actualizacion': 'Error'}
     
     def _get_authenticated_statistics(self) -> Dict:
-        """Estadísticas usando autenticación original"""
-        # Método original existente
-        return {
-            'total_registros': 0,
-            'registros_activos': 0,
-            'casos_graves': 0,
-            'ultima_actualizacion': datetime.now().strftime("%Y-%m-%d %H:%M")
-        }
\ No newline at end of file
+        """Estadísticas usando autenticación (con fallback a API pública en la lectura)"""
+        success, records = self.read_medical_records()
+        
+        if not success or not records:
+            return {**estadisticas_vacias(), 'ultima_actualizacion': 'Sin datos'}
+        
+        return estadisticas_dataframe(registros_a_dataframe(records), criterio_grave="formularios")
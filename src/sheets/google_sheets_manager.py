@@ -5,13 +5,88 @@ Soporte para st.secrets y configuración segura
 """
 
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
 import pandas as pd
 import streamlit as st
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 import os
+import re
 import json
+import time
+import threading
+
+from .estadisticas_medicas import estadisticas_dataframe, estadisticas_vacias
+
+# Segundos que se reutiliza el índice de encabezados / filas antes de releer la hoja
+INDICE_TTL = 300
+
+# Borrado lógico: la columna guarda la fecha de baja; la compactación elimina esas filas
+# (compactar_eliminados, programada con cron: python sincronizar_hojas.py --compactar)
+COLUMNA_ELIMINADO = "Eliminado"
+COMPACTACION_REINTENTOS = 2
+
+
+def normalizar_encabezado(header: str) -> str:
+    """Nombre de columna como clave de campo (ej: 'Fecha Atencion' -> 'fecha_atencion')"""
+    return str(header).strip().lower().replace(' ', '_')
+
+
+def construir_indice_hoja(valores: List[List[str]]) -> Dict:
+    """
+    Índice de una hoja a partir de get_all_values():
+    - 'columnas': campo normalizado -> número de columna (1-indexed)
+    - 'col_id': número de columna del ID (o None)
+    - 'filas': ID -> número de fila en la hoja (sin las filas con borrado lógico)
+    """
+    encabezados = valores[0] if valores else []
+    columnas = {}
+    for i, header in enumerate(encabezados, start=1):
+        columnas.setdefault(normalizar_encabezado(header), i)
+
+    col_id = next((columnas[c] for c in ['id', 'id_registro'] if c in columnas), None)
+    col_eliminado = columnas.get(normalizar_encabezado(COLUMNA_ELIMINADO))
+    filas = {}
+    if col_id is not None:
+        for numero_fila, fila in enumerate(valores[1:], start=2):
+            if col_eliminado and len(fila) >= col_eliminado and str(fila[col_eliminado - 1]).strip():
+                continue  # borrado lógico
+            if len(fila) >= col_id and fila[col_id - 1] != '':
+                filas[str(fila[col_id - 1])] = numero_fila
+
+    return {
+        "encabezados": encabezados,
+        "columnas": columnas,
+        "col_id": col_id,
+        "filas": filas,
+        "total_filas": len(valores),
+    }
+
+
+def filtrar_eliminados(df: pd.DataFrame, columna: str = 'eliminado') -> pd.DataFrame:
+    """Quita (vectorizado) las filas con marca de borrado lógico y la columna de marca"""
+    if columna not in df.columns:
+        return df
+    vivas = df[columna].fillna('').astype(str).str.strip() == ''
+    return df.loc[vivas.to_numpy()].drop(columns=columna)
+
+
+def rangos_contiguos(filas: List[int]) -> List[Tuple[int, int]]:
+    """Agrupa números de fila en rangos [inicio, fin] contiguos, del último al primero"""
+    rangos = []
+    for fila in sorted(set(filas), reverse=True):
+        if rangos and rangos[-1][0] == fila + 1:
+            rangos[-1] = (fila, rangos[-1][1])
+        else:
+            rangos.append((fila, fila))
+    return rangos
+
+
+def fila_de_rango(rango: str) -> Optional[int]:
+    """Número de fila de un rango A1 como 'Hoja!A5:S5'"""
+    coincidencia = re.search(r'![A-Z]+(\d+)', rango or '')
+    return int(coincidencia.group(1)) if coincidencia else None
 
 
 class GoogleSheetsManager:
@@ -45,6 +120,14 @@ class GoogleSheetsManager:
         self.credentials_loaded = False
         self.use_secrets = use_secrets
         
+        # Hoja abierta e índice de encabezados / IDs (evitan releer la hoja en cada operación)
+        self._worksheet = None
+        self._indice = None
+        self._indice_cargado = 0.0
+        
+        # Escrituras que usan posiciones de fila no se solapan con la compactación
+        self._lock = threading.RLock()
+        
         # Configuración por defecto del Google Sheet
         self.sheet_config = {
             "sheet_id": None,  # Se cargará desde secrets o config
@@ -234,7 +317,8 @@ class GoogleSheetsManager:
                 "Nombre_Paciente", "Division", "Diagnostico", "Fecha_Atencion",
                 "Tipo_Lesion", "Severidad", "Parte_Cuerpo", "Tratamiento",
                 "Tiempo_Recuperacion", "Puede_Entrenar", "Medicamentos",
-                "Observaciones", "Proxima_Evaluacion", "Estado", "Fecha_Registro"
+                "Observaciones", "Proxima_Evaluacion", "Estado", "Fecha_Registro",
+                COLUMNA_ELIMINADO
             ]
             
             # Verificar/crear hoja de registros médicos
@@ -265,6 +349,57 @@ class GoogleSheetsManager:
             st.error(f"❌ Error configurando hojas: {str(e)}")
             return False
     
+    def _get_worksheet(self):
+        """Hoja de registros médicos, abierta una sola vez por instancia"""
+        if self._worksheet is None:
+            spreadsheet = self.client.open_by_key(self.sheet_config["sheet_id"])
+            self._worksheet = spreadsheet.worksheet(self.sheet_config["worksheets"]["medical_records"])
+        return self._worksheet
+    
+    def _get_indice(self, forzar: bool = False) -> Dict:
+        """
+        Índice de encabezados y de ID -> fila (ver construir_indice_hoja).
+        Se construye con una sola lectura y se reutiliza durante INDICE_TTL segundos.
+        """
+        vencido = time.time() - self._indice_cargado > INDICE_TTL
+        if forzar or self._indice is None or vencido:
+            self._indice = construir_indice_hoja(self._get_worksheet().get_all_values())
+            self._indice_cargado = time.time()
+        return self._indice
+    
+    def invalidar_indice(self):
+        """Descartar el índice (las posiciones de fila cambiaron)"""
+        self._indice = None
+    
+    def _buscar_fila(self, record_id: str) -> Optional[int]:
+        """Fila del registro según el índice; si no está, relee la hoja una vez"""
+        fila = self._get_indice()["filas"].get(str(record_id))
+        if fila is None and time.time() - self._indice_cargado > 1:
+            # Puede ser un registro agregado por otra sesión
+            fila = self._get_indice(forzar=True)["filas"].get(str(record_id))
+        return fila
+    
+    def _fila_confirmada(self, record_id: str) -> Optional[int]:
+        """
+        Fila del registro verificada contra la hoja antes de escribir: se lee la
+        celda de ID de esa fila y, si no coincide (otra instancia o proceso borró
+        o compactó filas), se reconstruye el índice.
+        
+        Cuesta una lectura de una celda además del batch_update de la escritura:
+        la API no tiene escrituras condicionales y una escritura en la fila
+        equivocada pisa otro registro sin forma de detectarlo después. La lectura
+        consume la cuota de lecturas (la escritura sigue siendo una sola llamada)
+        y se omite si la búsqueda de esta misma llamada releyó la hoja.
+        """
+        cargado_antes = self._indice_cargado if self._indice is not None else None
+        fila = self._buscar_fila(record_id)
+        if fila is None or self._indice_cargado != cargado_antes:
+            return fila
+        id_en_hoja = self._get_worksheet().cell(fila, self._indice["col_id"]).value
+        if str(id_en_hoja or '') != str(record_id):
+            fila = self._get_indice(forzar=True)["filas"].get(str(record_id))
+        return fila
+    
     def test_connection(self) -> Tuple[bool, str]:
         """
         Probar conexión con Google Sheets
@@ -296,13 +431,23 @@ class GoogleSheetsManager:
         Returns:
             Tuple[bool, List[Dict]]: (Success, Records)
         """
+        success, df = self.load_dataframe_from_sheets()
+        return success, df.to_dict('records')
+    
+    def load_dataframe_from_sheets(self) -> Tuple[bool, pd.DataFrame]:
+        """
+        Cargar los registros médicos como DataFrame (sin filas eliminadas)
+        
+        Returns:
+            Tuple[bool, pd.DataFrame]: (Success, Records)
+        """
         if not self.credentials_loaded:
-            return False, []
+            return False, pd.DataFrame()
         
         try:
             # Asegurar que las hojas existen
             if not self._ensure_worksheets_exist():
-                return False, []
+                return False, pd.DataFrame()
             
             spreadsheet = self.client.open_by_key(self.sheet_config["sheet_id"])
             worksheet_name = self.sheet_config["worksheets"]["medical_records"]
@@ -312,34 +457,32 @@ class GoogleSheetsManager:
             records = worksheet.get_all_records()
             
             if not records:
-                return True, []
-            
-            # Procesar y limpiar registros
-            processed_records = []
-            
-            for i, record in enumerate(records):
-                # Limpiar valores vacíos y formatear
-                cleaned_record = {}
-                for key, value in record.items():
-                    # Normalizar nombres de campos
-                    clean_key = key.lower().replace(' ', '_')
-                    cleaned_record[clean_key] = str(value).strip() if value else ""
-                
-                # Agregar ID único si no existe
-                if not cleaned_record.get('id'):
-                    cleaned_record['id'] = f"gs_{i+1}"
-                
-                # Asegurar timestamp
-                if not cleaned_record.get('timestamp'):
-                    cleaned_record['timestamp'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                
-                processed_records.append(cleaned_record)
+                return True, pd.DataFrame()
             
-            return True, processed_records
+            return True, self._procesar_registros(records)
             
         except Exception as e:
             st.error(f"❌ Error leyendo datos: {str(e)}")
-            return False, []
+            return False, pd.DataFrame()
+    
+    def _procesar_registros(self, records: List[Dict]) -> pd.DataFrame:
+        """
+        Registros de get_all_records como DataFrame limpio: campos normalizados,
+        valores como texto, ID y timestamp completos y sin filas eliminadas
+        """
+        df = pd.DataFrame(records)
+        df.columns = [normalizar_encabezado(c) for c in df.columns]
+        df = df.loc[:, ~df.columns.duplicated()]
+        # Valores vacíos / falsy -> "", el resto como texto sin espacios
+        df = df.where(df.astype(bool), '').astype(str).apply(lambda col: col.str.strip())
+        
+        # ID único por posición si no existe (antes de filtrar, para que sea estable)
+        ids_posicion = pd.Series([f"gs_{i + 1}" for i in range(len(df))], index=df.index)
+        df['id'] = df['id'].mask(df['id'] == '', ids_posicion) if 'id' in df.columns else ids_posicion
+        ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        df['timestamp'] = df['timestamp'].replace('', ahora) if 'timestamp' in df.columns else ahora
+        
+        return filtrar_eliminados(df, normalizar_encabezado(COLUMNA_ELIMINADO))
     
     def add_new_record(self, form_data: Dict) -> Tuple[bool, str]:
         """
@@ -371,7 +514,9 @@ class GoogleSheetsManager:
             
             # Generar ID único
             existing_records = worksheet.get_all_values()
-            next_id = len(existing_records)  # Incluye header, así que es el siguiente ID
+            # Siguiente al mayor ID numérico: tras compactar hay menos filas que IDs emitidos
+            ids = pd.to_numeric(pd.Series([fila[0] for fila in existing_records[1:] if fila]), errors='coerce')
+            next_id = max(len(existing_records), int(ids.max()) + 1 if ids.notna().any() else 1)
             
             # Preparar fila de datos
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -400,7 +545,13 @@ class GoogleSheetsManager:
             ]
             
             # Agregar a Google Sheets
-            worksheet.append_row(row_data)
+            respuesta = worksheet.append_row(row_data)
+            
+            # Registrar la fila nueva en el índice, si ya estaba construido
+            fila = fila_de_rango(respuesta.get("updates", {}).get("updatedRange", "")) if respuesta else None
+            if self._indice is not None and fila:
+                self._indice["filas"][str(next_id)] = fila
+                self._indice["total_filas"] = max(self._indice["total_filas"], fila)
             
             return True, f"✅ Registro #{next_id} guardado exitosamente"
             
@@ -421,58 +572,71 @@ class GoogleSheetsManager:
         if not self.credentials_loaded:
             return False, "❌ No hay conexión con Google Sheets"
         
+        with self._lock:
+            return self._update_record(record_id, updated_data)
+    
+    def _update_record(self, record_id: str, updated_data: Dict) -> Tuple[bool, str]:
         try:
-            spreadsheet = self.client.open_by_key(self.sheet_config["sheet_id"])
-            worksheet_name = self.sheet_config["worksheets"]["medical_records"]
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            
-            # Buscar la fila del registro
-            all_records = worksheet.get_all_values()
-            headers = all_records[0]
+            worksheet = self._get_worksheet()
+            indice = self._get_indice()
             
-            # Encontrar índice de columna ID
-            id_col_index = None
-            for i, header in enumerate(headers):
-                if header.lower() in ['id', 'id_registro']:
-                    id_col_index = i
-                    break
-            
-            if id_col_index is None:
+            if indice["col_id"] is None:
                 return False, "❌ No se encontró columna de ID"
             
-            # Buscar fila del registro
-            row_index = None
-            for i, row in enumerate(all_records[1:], start=2):  # Start=2 porque skippeamos header
-                if len(row) > id_col_index and str(row[id_col_index]) == str(record_id):
-                    row_index = i
-                    break
-            
+            # Fila del registro desde el índice ID -> fila, verificada en la hoja
+            # (una lectura de la celda de ID; ver _fila_confirmada)
+            row_index = self._fila_confirmada(record_id)
             if row_index is None:
                 return False, f"❌ No se encontró registro con ID: {record_id}"
             
-            # Actualizar campos específicos
+            # Todas las celdas modificadas en una sola llamada batch_update
+            celdas = []
+            ignorados = []
             for field, value in updated_data.items():
-                # Mapear campo a columna
-                field_col_index = None
-                for i, header in enumerate(headers):
-                    if header.lower().replace(' ', '_') == field.lower():
-                        field_col_index = i + 1  # gspread usa 1-indexed
-                        break
-                
-                if field_col_index:
-                    worksheet.update_cell(row_index, field_col_index, value)
+                col = self._indice["columnas"].get(field.lower())
+                if col:
+                    celdas.append({"range": rowcol_to_a1(row_index, col), "values": [[value]]})
+                else:
+                    ignorados.append(field)
             
+            if not celdas:
+                return False, "❌ Ningún campo coincide con las columnas de la hoja"
+            
+            worksheet.batch_update(celdas, raw=False)
+            
+            if ignorados:
+                return True, f"✅ Registro {record_id} actualizado (campos ignorados: {', '.join(ignorados)})"
             return True, f"✅ Registro {record_id} actualizado"
             
         except Exception as e:
             return False, f"❌ Error actualizando: {str(e)}"
     
-    def delete_record(self, record_id: str) -> Tuple[bool, str]:
+    def _asegurar_columna_eliminado(self) -> int:
+        """Número de columna de la marca de borrado; la agrega al final si la hoja no la tiene"""
+        indice = self._get_indice()
+        clave = normalizar_encabezado(COLUMNA_ELIMINADO)
+        if clave not in indice["columnas"]:
+            columna = len(indice["encabezados"]) + 1
+            worksheet = self._get_worksheet()
+            if worksheet.col_count < columna:
+                worksheet.add_cols(columna - worksheet.col_count)
+            worksheet.update_cell(1, columna, COLUMNA_ELIMINADO)
+            indice["encabezados"].append(COLUMNA_ELIMINADO)
+            indice["columnas"][clave] = columna
+        return indice["columnas"][clave]
+    
+    def delete_record(self, record_id: str, permanente: bool = False) -> Tuple[bool, str]:
         """
         Eliminar registro de Google Sheets
         
+        Por defecto es un borrado lógico: se escribe la fecha en la columna
+        'Eliminado' (una sola escritura, las filas no se desplazan y el índice
+        sigue siendo válido). Los lectores filtran esas filas y
+        compactar_eliminados() las borra físicamente en lote.
+        
         Args:
             record_id (str): ID del registro a eliminar
+            permanente (bool): Borrar la fila de inmediato (desplaza las siguientes)
             
         Returns:
             Tuple[bool, str]: (Success, Message)
@@ -481,94 +645,108 @@ class GoogleSheetsManager:
             return False, "❌ No hay conexión con Google Sheets"
         
         try:
-            spreadsheet = self.client.open_by_key(self.sheet_config["sheet_id"])
-            worksheet_name = self.sheet_config["worksheets"]["medical_records"]
-            worksheet = spreadsheet.worksheet(worksheet_name)
-            
-            # Buscar y eliminar fila
-            all_records = worksheet.get_all_values()
-            headers = all_records[0]
-            
-            # Encontrar fila del registro
-            row_index = None
-            for i, row in enumerate(all_records[1:], start=2):
-                if len(row) > 0 and str(row[0]) == str(record_id):  # Asumiendo ID en primera columna
-                    row_index = i
-                    break
-            
-            if row_index is None:
-                return False, f"❌ No se encontró registro con ID: {record_id}"
-            
-            worksheet.delete_rows(row_index)
+            with self._lock:
+                worksheet = self._get_worksheet()
+                row_index = self._fila_confirmada(record_id) if self._get_indice()["col_id"] else None
+                
+                if row_index is None:
+                    return False, f"❌ No se encontró registro con ID: {record_id}"
+                
+                if permanente:
+                    worksheet.delete_rows(row_index)
+                    # Las filas siguientes se desplazaron
+                    self.invalidar_indice()
+                    return True, f"✅ Registro {record_id} eliminado"
+                
+                columna = self._asegurar_columna_eliminado()
+                worksheet.batch_update(
+                    [{"range": rowcol_to_a1(row_index, columna),
+                      "values": [[datetime.now().strftime("%Y-%m-%d %H:%M:%S")]]}],
+                    raw=False
+                )
+                self._indice["filas"].pop(str(record_id), None)
             
-            return True, f"✅ Registro {record_id} eliminado"
+            return True, f"✅ Registro {record_id} eliminado (pendiente de compactación)"
             
         except Exception as e:
             return False, f"❌ Error eliminando: {str(e)}"
     
+    def compactar_eliminados(self) -> Tuple[bool, str]:
+        """
+        Borrar físicamente las filas marcadas como eliminadas.
+        Una lectura de la hoja y un único batch_update con los rangos de filas
+        (del último al primero, así los índices de las filas pendientes no cambian).
+        Es el trabajo de compactación programado: lo ejecuta
+        `python sincronizar_hojas.py --compactar` desde cron.
+        
+        Returns:
+            Tuple[bool, str]: (Success, Message)
+        """
+        if not self.credentials_loaded:
+            return False, "❌ No hay conexión con Google Sheets"
+        
+        try:
+            with self._lock:
+                worksheet = self._get_worksheet()
+                for intento in range(COMPACTACION_REINTENTOS + 1):
+                    todas = worksheet.get_all_values()
+                    indice = construir_indice_hoja(todas)
+                    columna = indice["columnas"].get(normalizar_encabezado(COLUMNA_ELIMINADO))
+                    if columna is None:
+                        return True, "✅ No hay registros eliminados para compactar"
+                    
+                    valores = pd.DataFrame(todas[1:])
+                    if valores.empty or valores.shape[1] < columna:
+                        return True, "✅ No hay registros eliminados para compactar"
+                    marcas = valores.iloc[:, columna - 1].fillna('').astype(str).str.strip() != ''
+                    filas = (marcas[marcas].index + 2).tolist()
+                    if not filas:
+                        return True, "✅ No hay registros eliminados para compactar"
+                    
+                    # Otra instancia pudo borrar o insertar filas desde la lectura:
+                    # se relee la columna de ID (o la de marcas) justo antes de borrar
+                    col_control = indice["col_id"] or columna
+                    esperado = [fila[col_control - 1] if len(fila) >= col_control else '' for fila in todas]
+                    actual = worksheet.col_values(col_control)
+                    actual += [''] * (len(esperado) - len(actual))
+                    if actual[:len(esperado)] == esperado:
+                        break
+                else:
+                    self.invalidar_indice()
+                    return False, "❌ La hoja cambió durante la compactación; se reintentará más tarde"
+                
+                pedidos = [
+                    {"deleteDimension": {"range": {
+                        "sheetId": worksheet.id, "dimension": "ROWS",
+                        "startIndex": inicio - 1, "endIndex": fin
+                    }}}
+                    for inicio, fin in rangos_contiguos(filas)
+                ]
+                worksheet.spreadsheet.batch_update({"requests": pedidos})
+                self.invalidar_indice()
+            
+            return True, f"✅ {len(filas)} registros eliminados compactados"
+            
+        except Exception as e:
+            return False, f"❌ Error compactando: {str(e)}"
+    
     def get_statistics(self) -> Dict:
         """
         Obtener estadísticas de los registros médicos
         
+        Calcula en una sola llamada todos los contadores del tablero (totales,
+        hoy, semana, profesionales, graves, activos, por severidad / división /
+        estado), vectorizado y cacheado por versión de la hoja.
+        
         Returns:
             Dict: Diccionario con estadísticas
         """
-        success, records = self.load_data_from_sheets()
+        success, df = self.load_dataframe_from_sheets()
         
-        if not success or not records:
-            return {
-                "total_registros": 0,
-                "registros_hoy": 0,
-                "profesionales_activos": 0,
-                "casos_graves": 0,
-                "ultimo_registro": "N/A"
-            }
+        if not success or df.empty:
+            return estadisticas_vacias()
         
-        # Calcular estadísticas
-        hoy = datetime.now().date()
-        registros_hoy = 0
-        profesionales = set()
-        casos_graves = 0
-        
-        for record in records:
-            # Profesionales únicos
-            prof = record.get("nombre_profesional") or record.get("nombre_profesional", "")
-            if prof:
-                profesionales.add(prof)
-            
-            # Registros de hoy
-            fecha_str = record.get("fecha_registro") or record.get("fecha_registro", "")
-            if fecha_str:
-                try:
-                    fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-                    if fecha == hoy:
-                        registros_hoy += 1
-                except:
-                    pass
-            
-            # Casos graves
-            severidad = (record.get("severidad") or record.get("severidad", "")).lower()
-            if any(word in severidad for word in ["grave", "crítico", "severo"]):
-                casos_graves += 1
-        
-        # Último registro
-        ultimo_registro = "N/A"
-        if records:
-            ultimo_timestamp = records[-1].get("timestamp", "")
-            if ultimo_timestamp:
-                try:
-                    dt = datetime.strptime(ultimo_timestamp, "%Y-%m-%d %H:%M:%S")
-                    ultimo_registro = dt.strftime("%d/%m/%Y %H:%M")
-                except:
-                    ultimo_registro = ultimo_timestamp[:16]
-        
-        return {
-            "total_registros": len(records),
-            "registros_hoy": registros_hoy,
-            "profesionales_activos": len(profesionales),
-            "casos_graves": casos_graves,
-            "ultimo_registro": ultimo_registro
-        }
+        return estadisticas_dataframe(df)
     
     def _determine_status(self, severidad: str) -> str:
         """
@@ -4,16 +4,399 @@ Integra Google Sheets con el sistema de gestión del club
 """
 
 import gspread
+from gspread.utils import rowcol_to_a1
 from google.oauth2.service_account import Credentials
+import numpy as np
 import pandas as pd
 import streamlit as st
 from datetime import datetime
+import hashlib
 import json
 import re
 import os
+import threading
+import time
+
+# ==========================================
+# MAPEOS DE COLUMNAS
+# ==========================================
+
+MAPEO_MEDICO = {
+    'jugador': 'player_name',
+    'nombre': 'player_name',
+    'player': 'player_name',
+    'division': 'division',
+    'categoria': 'division',
+    'lesion': 'injury_type',
+    'tipo_lesion': 'injury_type',
+    'injury': 'injury_type',
+    'severidad': 'severity',
+    'gravedad': 'severity',
+    'fecha': 'date_occurred',
+    'fecha_lesion': 'date_occurred',
+    'recuperacion': 'expected_recovery',
+    'fecha_recuperacion': 'expected_recovery',
+    'estado': 'status',
+    'tratamiento': 'treatment',
+    'observaciones': 'notes',
+    'notas': 'notes'
+}
+
+MAPEO_NUTRICION = {
+    'jugador': 'player_name',
+    'nombre': 'player_name',
+    'division': 'division',
+    'categoria': 'division',
+    'plan': 'plan_type',
+    'tipo_plan': 'plan_type',
+    'calorias': 'calories_target',
+    'proteinas': 'protein_target',
+    'carbohidratos': 'carbs_target',
+    'grasas': 'fat_target',
+    'peso': 'current_weight',
+    'altura': 'height',
+    'objetivo': 'goal',
+    'observaciones': 'notes',
+    'notas': 'notes'
+}
+
+MAPEO_FUERZA = {
+    'jugador': 'player_name',
+    'nombre': 'player_name',
+    'division': 'division',
+    'categoria': 'division',
+    'fecha': 'test_date',
+    'test_fecha': 'test_date',
+    'tipo_test': 'test_type',
+    'test_tipo': 'test_type',
+    'ejercicio': 'test_type',
+    'peso': 'weight',
+    'kg': 'weight',
+    'repeticiones': 'repetitions',
+    'reps': 'repetitions',
+    'series': 'series',
+    'peso_corporal': 'body_weight',
+    'altura': 'height',
+    'grasa_corporal': 'body_fat',
+    'masa_muscular': 'muscle_mass',
+    'preparador': 'tester',
+    'entrenador': 'tester',
+    'observaciones': 'notes',
+    'notas': 'notes'
+}
+
+MAPEO_CAMPO = {
+    'jugador': 'player_name',
+    'nombre': 'player_name',
+    'division': 'division',
+    'categoria': 'division',
+    'fecha': 'test_date',
+    'test_fecha': 'test_date',
+    'tipo_test': 'test_type',
+    'test_tipo': 'test_type',
+    'prueba': 'test_type',
+    'resultado': 'result',
+    'tiempo': 'result',
+    'distancia': 'result',
+    'marca': 'result',
+    'unidad': 'unit',
+    'clima': 'weather',
+    'temperatura': 'temperature',
+    'superficie': 'surface',
+    'humedad': 'humidity',
+    'preparador': 'tester',
+    'entrenador': 'tester',
+    'observaciones': 'notes',
+    'notas': 'notes'
+}
+
+# ==========================================
+# TRANSFORMACIONES VECTORIZADAS (columna a columna)
+# ==========================================
+
+def preparar_columnas(df, mapeo):
+    """
+    Normaliza y renombra columnas y deja solo las filas con jugador.
+    Si dos columnas quedan con el mismo nombre se usa la primera.
+    """
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.lower().str.strip().str.replace(' ', '_')
+    df = df.rename(columns=mapeo)
+    df = df.loc[:, ~df.columns.duplicated()]
+    if 'player_name' not in df.columns:
+        return df.iloc[0:0]
+    jugador = df['player_name']
+    return df[(jugador.notna() & (jugador.astype(str).str.strip() != '')).to_numpy()]
+
+
+def columna_texto(df, columna, default='', recortar=True):
+    """Columna como texto (sin espacios si `recortar`); el valor por defecto si la columna no existe"""
+    if columna not in df.columns:
+        texto = str(default)
+        return pd.Series(texto.strip() if recortar else texto, index=df.index, dtype=object)
+    texto = df[columna].astype(str)
+    return texto.str.strip() if recortar else texto
+
+
+def columna_numero(df, columna, default=0):
+    """
+    Equivalente vectorizado de safe_float(row.get(columna, default)): si la columna
+    no existe vale `default`; si existe, los vacíos e inválidos valen 0.
+    """
+    if columna not in df.columns:
+        return pd.Series(float(default), index=df.index)
+    texto = df[columna].astype(str).str.strip().str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto, errors='coerce').fillna(0).astype(float)
+
+
+def cero_a_none(serie):
+    """0 -> None (como `valor or None`)"""
+    return serie.astype(object).where(serie != 0, None)
+
+
+def ids_de_sync(prefijo, sello, indice, identidades=None, huellas=None):
+    """
+    Campo "id" de los registros: 'gs_<tipo>_<fecha>_<fila>' a partir del índice
+    original de la hoja o, si se pasan, 'gs_<tipo>_<identidad>' con la identidad
+    estable de cada fila (ver identidades_de_filas). Con `huellas` se agrega
+    "sync_hash", la huella de contenido que indica si la fila cambió.
+    """
+    if identidades is None:
+        return {"id": prefijo + sello + '_' + pd.Series(indice, index=indice).astype(str)}
+    campos = {"id": prefijo + identidades.loc[indice]}
+    if huellas is not None:
+        campos["sync_hash"] = huellas.loc[indice]
+    return campos
+
+
+# Columnas con la fecha y hora de envío del formulario (no cambian al editar la respuesta)
+COLUMNAS_MARCA_TEMPORAL = ['marca_temporal', 'timestamp', 'fecha_y_hora']
+
+
+def identidades_de_filas(df, fuente=''):
+    """
+    Identidad estable de cada fila, precedida por una huella corta de la fuente:
+    la marca temporal del formulario si la hoja la tiene (con un sufijo si se
+    repite) o, si no, la posición de la fila en la hoja. Editar una fila no
+    cambia su identidad, así que la nueva versión reemplaza a la anterior.
+    """
+    prefijo = hashlib.sha1(fuente.encode('utf-8')).hexdigest()[:6] + '_' if fuente else ''
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    posicion = 'f' + pd.Series(df.index, index=df.index).astype(str)
+    columnas = df.columns.astype(str).str.lower().str.strip().str.replace(' ', '_').tolist()
+    columna = next((c for c in COLUMNAS_MARCA_TEMPORAL if c in columnas), None)
+    if columna is None:
+        return prefijo + posicion
+    marca = df.iloc[:, columnas.index(columna)].astype(str).str.strip()
+    identidad = 't' + pd.util.hash_pandas_object(marca, index=False).map('{:016x}'.format).astype(str)
+    repeticion = marca.groupby(marca).cumcount()
+    identidad = identidad.where(repeticion == 0, identidad + '_' + repeticion.astype(str))
+    return prefijo + identidad.where(marca != '', posicion)
+
+
+def huellas_de_filas(df, fuente=''):
+    """
+    Huella de contenido por fila (hash de pandas, estable entre ejecuciones),
+    precedida por una huella corta de la fuente para no mezclar hojas distintas.
+    Se hashean los pares columna=valor no vacíos en orden de columna, así que
+    agregar una columna vacía o reordenar columnas no cambia las huellas.
+    """
+    prefijo = hashlib.sha1(fuente.encode('utf-8')).hexdigest()[:6] + '_' if fuente else ''
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    contenido = pd.Series('', index=df.index, dtype=object)
+    for posicion, columna in sorted(enumerate(df.columns.astype(str)), key=lambda c: c[1]):
+        texto = df.iloc[:, posicion].astype(str).str.strip()
+        contenido = contenido + (columna + '=' + texto + '\x1f').where(texto != '', '')
+    valores = pd.util.hash_pandas_object(contenido, index=False)
+    return prefijo + valores.map('{:016x}'.format).astype(str)
+
+
+def estimar_1rm(peso, repeticiones):
+    """1RM (Brzycki) sobre arrays: peso * 36 / (37 - reps); sin ajuste desde 37 repeticiones"""
+    peso = np.asarray(peso, dtype=float)
+    repeticiones = np.asarray(repeticiones, dtype=float)
+    divisor = np.where(repeticiones < 37, 37 - repeticiones, 36)
+    one_rm = np.where(repeticiones < 37, peso * (36 / divisor), peso)
+    # round() de Python: redondeo decimal exacto (np.round difiere en los casos .x5)
+    return [round(valor, 1) for valor in one_rm.tolist()]
+
+
+def armar_registros(columnas, filas):
+    """
+    Registros (lista de dicts) a partir de columnas ya calculadas.
+    Los valores fijos (médico, URL, fecha de sync) se repiten en cada registro.
+    Más rápido que DataFrame.to_dict('records'): cada columna se convierte
+    a tipos nativos de Python una sola vez.
+    """
+    claves = list(columnas)
+    valores = [
+        v.tolist() if isinstance(v, (pd.Series, np.ndarray)) else v if isinstance(v, list) else [v] * filas
+        for v in columnas.values()
+    ]
+    return [dict(zip(claves, fila)) for fila in zip(*valores)]
+
+
+def transformar_datos_medicos(df, doctor_name, sheet_url, ahora=None, identidades=None, huellas=None):
+    """Registros médicos a partir de la hoja (DataFrame) en una sola pasada"""
+    ahora = ahora or datetime.now()
+    df = preparar_columnas(df, MAPEO_MEDICO)
+    return armar_registros({
+        **ids_de_sync("gs_", ahora.strftime('%Y%m%d_%H%M%S'), df.index, identidades, huellas),
+        "player_name": columna_texto(df, 'player_name'),
+        "division": columna_texto(df, 'division'),
+        "injury_type": columna_texto(df, 'injury_type'),
+        "severity": columna_texto(df, 'severity', 'Moderada'),
+        "date_occurred": columna_texto(df, 'date_occurred', ahora.date(), recortar=False),
+        "expected_recovery": columna_texto(df, 'expected_recovery', recortar=False),
+        "status": columna_texto(df, 'status', 'En tratamiento'),
+        "treatment": columna_texto(df, 'treatment'),
+        "doctor": doctor_name,
+        "notes": columna_texto(df, 'notes'),
+        "sync_source": "Google Sheets",
+        "sync_date": ahora.isoformat(),
+        "sheet_url": sheet_url
+    }, len(df))
+
+
+def transformar_datos_nutricion(df, nutritionist_name, sheet_url, ahora=None, identidades=None, huellas=None):
+    """Planes nutricionales a partir de la hoja (DataFrame) en una sola pasada"""
+    ahora = ahora or datetime.now()
+    df = preparar_columnas(df, MAPEO_NUTRICION)
+    return armar_registros({
+        **ids_de_sync("gs_nut_", ahora.strftime('%Y%m%d_%H%M%S'), df.index, identidades, huellas),
+        "player_name": columna_texto(df, 'player_name'),
+        "division": columna_texto(df, 'division'),
+        "plan_type": columna_texto(df, 'plan_type', 'Plan General'),
+        "calories_target": columna_numero(df, 'calories_target', 2500),
+        "protein_target": columna_numero(df, 'protein_target', 150),
+        "carbs_target": columna_numero(df, 'carbs_target', 300),
+        "fat_target": columna_numero(df, 'fat_target', 80),
+        "current_weight": columna_numero(df, 'current_weight', 0),
+        "height": columna_numero(df, 'height', 0),
+        "goal": columna_texto(df, 'goal', 'Mantener peso'),
+        "nutritionist": nutritionist_name,
+        "notes": columna_texto(df, 'notes'),
+        "created_date": ahora.date().isoformat(),
+        "sync_source": "Google Sheets",
+        "sync_date": ahora.isoformat(),
+        "sheet_url": sheet_url
+    }, len(df))
+
+
+def transformar_datos_fuerza(df, trainer_name, sheet_url, ahora=None, identidades=None, huellas=None):
+    """Tests de fuerza con 1RM estimado (NumPy sobre los arrays de peso y repeticiones)"""
+    ahora = ahora or datetime.now()
+    df = preparar_columnas(df, MAPEO_FUERZA)
+    peso = columna_numero(df, 'weight', 0)
+    repeticiones = np.maximum(1, np.trunc(columna_numero(df, 'repetitions', 1))).astype('int64')
+    series = np.maximum(1, np.trunc(columna_numero(df, 'series', 1))).astype('int64')
+    return armar_registros({
+        **ids_de_sync("gs_str_", ahora.strftime('%Y%m%d_%H%M%S'), df.index, identidades, huellas),
+        "player_name": columna_texto(df, 'player_name'),
+        "division": columna_texto(df, 'division'),
+        "test_date": columna_texto(df, 'test_date', ahora.date(), recortar=False),
+        "test_type": columna_texto(df, 'test_type', 'Bench Press'),
+        "weight": peso,
+        "repetitions": repeticiones,
+        "series": series,
+        "one_rm_estimated": estimar_1rm(peso, repeticiones),
+        "body_weight": cero_a_none(columna_numero(df, 'body_weight', 0)),
+        "height": cero_a_none(columna_numero(df, 'height', 0)),
+        "body_fat": cero_a_none(columna_numero(df, 'body_fat', 0)),
+        "muscle_mass": cero_a_none(columna_numero(df, 'muscle_mass', 0)),
+        "tester": trainer_name,
+        "notes": columna_texto(df, 'notes'),
+        "sync_source": "Google Sheets",
+        "sync_date": ahora.isoformat(),
+        "sheet_url": sheet_url,
+        "created_at": ahora.isoformat()
+    }, len(df))
+
+
+def transformar_datos_campo(df, trainer_name, sheet_url, ahora=None, identidades=None, huellas=None):
+    """Tests de campo; la unidad faltante se deduce del tipo de test con np.select"""
+    ahora = ahora or datetime.now()
+    df = preparar_columnas(df, MAPEO_CAMPO)
+    tipo_test = columna_texto(df, 'test_type')
+    unidad = df['unit'].astype(str) if 'unit' in df.columns else pd.Series('', index=df.index, dtype=object)
+    tipo = tipo_test.str.lower()
+    unidad_deducida = np.select(
+        [
+            (tipo.str.contains('sprint', regex=False) | tipo.str.contains('velocidad', regex=False)).to_numpy(),
+            tipo.str.contains('salto', regex=False).to_numpy(),
+            (tipo.str.contains('yo-yo', regex=False) | tipo.str.contains('cooper', regex=False)).to_numpy(),
+        ],
+        ['segundos', 'cm', 'metros'],
+        default='unidades'
+    )
+    return armar_registros({
+        **ids_de_sync("gs_field_", ahora.strftime('%Y%m%d_%H%M%S'), df.index, identidades, huellas),
+        "player_name": columna_texto(df, 'player_name'),
+        "division": columna_texto(df, 'division'),
+        "test_date": columna_texto(df, 'test_date', ahora.date(), recortar=False),
+        "test_type": tipo_test,
+        "result": columna_numero(df, 'result', 0),
+        "unit": unidad.where(unidad != '', unidad_deducida),
+        "weather": columna_texto(df, 'weather', 'No especificado'),
+        "temperature": cero_a_none(columna_numero(df, 'temperature', 0)),
+        "surface": columna_texto(df, 'surface', 'No especificado'),
+        "humidity": cero_a_none(columna_numero(df, 'humidity', 0)),
+        "tester": trainer_name,
+        "notes": columna_texto(df, 'notes'),
+        "sync_source": "Google Sheets",
+        "sync_date": ahora.isoformat(),
+        "sheet_url": sheet_url,
+        "created_at": ahora.isoformat()
+    }, len(df))
+
+
+# ==========================================
+# CUOTA DE LA API DE GOOGLE SHEETS
+# ==========================================
+
+# Cuota de lectura de la API por cuenta de servicio (pedidos por minuto)
+LECTURAS_POR_MINUTO = 60
+
+
+class LimitadorCuota:
+    """
+    Balde de fichas compartido entre hilos: cada pedido a la API toma una ficha.
+    El balde guarda como mucho una ráfaga de `por_minuto // 10` fichas y se
+    repone a `por_minuto - ráfaga` por minuto, así en cualquier ventana de 60 s
+    se hacen como mucho ráfaga + reposición = por_minuto pedidos. Si no hay, espera.
+    """
+
+    def __init__(self, por_minuto=LECTURAS_POR_MINUTO):
+        if por_minuto < 2:
+            raise ValueError("El limitador necesita al menos 2 pedidos por minuto")
+        self.por_minuto = por_minuto
+        self.rafaga = max(1, por_minuto // 10)
+        self.reposicion = (por_minuto - self.rafaga) / 60  # fichas por segundo
+        self.fichas = float(self.rafaga)
+        self._ultima = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self.fichas = min(self.rafaga, self.fichas + (ahora - self._ultima) * self.reposicion)
+                self._ultima = ahora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.reposicion + 1e-3
+            time.sleep(espera)
+
+
+# Un limitador por proceso: la cuota es de la cuenta de servicio, no de cada hoja
+LIMITADOR_SHEETS = LimitadorCuota()
+
 
 class GoogleSheetsCAR:
-    def __init__(self):
+    def __init__(self, limitador=None):
         """Inicializar conexión con Google Sheets"""
         self.scope = [
             "https://spreadsheets.google.com/feeds",
@@ -21,13 +404,21 @@ class GoogleSheetsCAR:
             "https://www.googleapis.com/auth/spreadsheets"
         ]
         self.client = None
+        self.limitador = limitador or LIMITADOR_SHEETS
+        # Marcas de agua leídas y todavía no confirmadas, por fuente
+        self.marcas_pendientes = {}
         self.setup_credentials()
     
     def setup_credentials(self):
         """Configurar credenciales de Google desde st.secrets o archivo local"""
         try:
             # Primero intentar obtener desde st.secrets (para Streamlit Cloud)
-            if hasattr(st, 'secrets') and "google" in st.secrets:
+            try:
+                secretos_google = hasattr(st, 'secrets') and "google" in st.secrets
+            except Exception:
+                # Sin secrets.toml (p. ej. ejecución por línea de comandos)
+                secretos_google = False
+            if secretos_google:
                 creds = Credentials.from_service_account_info(
                     dict(st.secrets["google"]), 
                     scopes=self.scope
@@ -71,18 +462,20 @@ class GoogleSheetsCAR:
         except Exception as e:
             return False, f"Error de conexión: {e}"
 
+    def _abrir_hoja(self, sheet_url, worksheet_name=None):
+        """Hoja de trabajo de la URL (cada pedido de metadatos consume cuota)"""
+        self.limitador.esperar()
+        spreadsheet = self.client.open_by_key(self.extract_sheet_id(sheet_url))
+        self.limitador.esperar()
+        return spreadsheet.worksheet(worksheet_name) if worksheet_name else spreadsheet.sheet1
+
     def get_sheet_data(self, sheet_url, worksheet_name=None):
         """Obtener datos de la hoja"""
         try:
-            sheet_id = self.extract_sheet_id(sheet_url)
-            spreadsheet = self.client.open_by_key(sheet_id)
-            
-            if worksheet_name:
-                worksheet = spreadsheet.worksheet(worksheet_name)
-            else:
-                worksheet = spreadsheet.sheet1
+            worksheet = self._abrir_hoja(sheet_url, worksheet_name)
             
             # Obtener todos los registros
+            self.limitador.esperar()
             records = worksheet.get_all_records()
             
             if records:
@@ -94,278 +487,112 @@ class GoogleSheetsCAR:
         except Exception as e:
             return False, f"Error al leer datos: {e}"
 
-    def sync_medical_data(self, sheet_url, doctor_name, worksheet_name=None):
-        """Sincronizar datos médicos desde Google Sheets"""
-        success, data = self.get_sheet_data(sheet_url, worksheet_name)
-        
+    def get_sheet_data_incremental(self, sheet_url, worksheet_name=None, marca=None):
+        """
+        Leer solo las filas agregadas desde la marca de agua (cantidad de filas ya
+        sincronizadas). Se vuelve a leer la última fila sincronizada como ancla: si
+        cambiaron los encabezados o esa fila, la hoja se lee completa: las filas
+        conservan su identidad y solo se guardan las que cambiaron.
+        Devuelve (éxito, DataFrame de filas nuevas o mensaje, nueva marca).
+        El índice del DataFrame es la posición de la fila de datos en la hoja.
+        """
+        try:
+            worksheet = self._abrir_hoja(sheet_url, worksheet_name)
+
+            self.limitador.esperar()
+            encabezados = worksheet.row_values(1)
+            if not encabezados:
+                return False, "Hoja vacía o sin encabezados", None
+            huella_encabezados = hashlib.sha1('\x1f'.join(encabezados).encode('utf-8')).hexdigest()
+
+            marca = marca or {}
+            filas_previas = marca.get('filas', 0) if marca.get('encabezados') == huella_encabezados else 0
+            # Fila de la hoja donde empieza la lectura: el ancla (1 encabezado + filas previas) o la primera de datos
+            desde = filas_previas + 1 if filas_previas else 2
+            ultima_columna = re.sub(r'\d', '', rowcol_to_a1(1, len(encabezados)))
+            self.limitador.esperar()
+            valores = worksheet.get(f"{rowcol_to_a1(desde, 1)}:{ultima_columna}")
+
+            df = self._filas_a_dataframe(valores, encabezados, inicio=desde - 2)
+            if filas_previas:
+                ancla = huellas_de_filas(df.iloc[:1]).tolist()
+                if ancla != [marca.get('huella_ultima')]:
+                    # Se editaron o borraron filas ya sincronizadas: lectura completa
+                    return self.get_sheet_data_incremental(sheet_url, worksheet_name, marca=None)
+                df = df.iloc[1:]
+
+            total = filas_previas + len(df)
+            nueva_marca = {
+                'filas': total,
+                'encabezados': huella_encabezados,
+                'huella_ultima': huellas_de_filas(df.iloc[-1:]).iloc[0] if len(df) else marca.get('huella_ultima'),
+                'last_sync': datetime.now().isoformat()
+            }
+            return True, df, nueva_marca
+
+        except Exception as e:
+            return False, f"Error al leer datos: {e}", None
+
+    @staticmethod
+    def _filas_a_dataframe(valores, encabezados, inicio=0):
+        """Valores crudos de la API (filas de largo variable) como DataFrame de texto"""
+        ancho = len(encabezados)
+        filas = [list(fila[:ancho]) + [''] * (ancho - len(fila)) for fila in valores]
+        df = pd.DataFrame(filas, columns=encabezados, dtype=object)
+        df.index = pd.RangeIndex(inicio, inicio + len(df))
+        return df
+
+    def _sync(self, transformar, sheet_url, responsable, worksheet_name=None, incremental=False):
+        """
+        Lectura + transformación comunes a los sync_*.
+        Incremental: solo filas nuevas, IDs por identidad estable de la fila (con la
+        huella de contenido para detectar cambios) y la nueva marca queda pendiente
+        hasta confirmar_sincronizacion (cuando los datos ya se guardaron).
+        """
+        if not incremental:
+            success, data = self.get_sheet_data(sheet_url, worksheet_name)
+            if not success:
+                return False, data
+            return True, transformar(data, responsable, sheet_url)
+
+        clave = clave_fuente(sheet_url, worksheet_name)
+        success, data, marca = self.get_sheet_data_incremental(
+            sheet_url, worksheet_name, obtener_marca(load_sync_config(), sheet_url, worksheet_name)
+        )
         if not success:
             return False, data
-        
-        df = data
-        medical_records = []
-        
-        # Mapeo de columnas (flexible)
-        column_mapping = {
-            'jugador': 'player_name',
-            'nombre': 'player_name',
-            'player': 'player_name',
-            'division': 'division',
-            'categoria': 'division',
-            'lesion': 'injury_type',
-            'tipo_lesion': 'injury_type',
-            'injury': 'injury_type',
-            'severidad': 'severity',
-            'gravedad': 'severity',
-            'fecha': 'date_occurred',
-            'fecha_lesion': 'date_occurred',
-            'recuperacion': 'expected_recovery',
-            'fecha_recuperacion': 'expected_recovery',
-            'estado': 'status',
-            'tratamiento': 'treatment',
-            'observaciones': 'notes',
-            'notas': 'notes'
-        }
-        
-        # Normalizar nombres de columnas
-        df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
-        
-        # Renombrar columnas
-        df = df.rename(columns=column_mapping)
-        
-        # Procesar cada fila
-        for index, row in df.iterrows():
-            if pd.notna(row.get('player_name')) and row.get('player_name').strip():
-                record = {
-                    "id": f"gs_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{index}",
-                    "player_name": str(row.get('player_name', '')).strip(),
-                    "division": str(row.get('division', '')).strip(),
-                    "injury_type": str(row.get('injury_type', '')).strip(),
-                    "severity": str(row.get('severity', 'Moderada')).strip(),
-                    "date_occurred": str(row.get('date_occurred', datetime.now().date())),
-                    "expected_recovery": str(row.get('expected_recovery', '')),
-                    "status": str(row.get('status', 'En tratamiento')).strip(),
-                    "treatment": str(row.get('treatment', '')).strip(),
-                    "doctor": doctor_name,
-                    "notes": str(row.get('notes', '')).strip(),
-                    "sync_source": "Google Sheets",
-                    "sync_date": datetime.now().isoformat(),
-                    "sheet_url": sheet_url
-                }
-                medical_records.append(record)
-        
-        return True, medical_records
-
-    def sync_nutrition_data(self, sheet_url, nutritionist_name, worksheet_name=None):
+        self.marcas_pendientes[clave] = marca
+        return True, transformar(
+            data, responsable, sheet_url,
+            identidades=identidades_de_filas(data, clave), huellas=huellas_de_filas(data)
+        )
+
+    def confirmar_sincronizacion(self, sheet_url, worksheet_name=None):
+        """Guardar la marca de agua de la última lectura incremental de la hoja"""
+        marca = self.marcas_pendientes.pop(clave_fuente(sheet_url, worksheet_name), None)
+        if marca is None:
+            return False
+        def guardar_marca(config):
+            config.setdefault('watermarks', {})[clave_fuente(sheet_url, worksheet_name)] = marca
+
+        actualizar_sync_config(guardar_marca)
+        return True
+
+    def sync_medical_data(self, sheet_url, doctor_name, worksheet_name=None, incremental=False):
+        """Sincronizar datos médicos desde Google Sheets"""
+        return self._sync(transformar_datos_medicos, sheet_url, doctor_name, worksheet_name, incremental)
+
+    def sync_nutrition_data(self, sheet_url, nutritionist_name, worksheet_name=None, incremental=False):
         """Sincronizar datos nutricionales desde Google Sheets"""
-        success, data = self.get_sheet_data(sheet_url, worksheet_name)
-        
-        if not success:
-            return False, data
-        
-        df = data
-        nutrition_records = []
-        
-        # Mapeo de columnas nutricionales
-        column_mapping = {
-            'jugador': 'player_name',
-            'nombre': 'player_name',
-            'division': 'division',
-            'categoria': 'division',
-            'plan': 'plan_type',
-            'tipo_plan': 'plan_type',
-            'calorias': 'calories_target',
-            'proteinas': 'protein_target',
-            'carbohidratos': 'carbs_target',
-            'grasas': 'fat_target',
-            'peso': 'current_weight',
-            'altura': 'height',
-            'objetivo': 'goal',
-            'observaciones': 'notes',
-            'notas': 'notes'
-        }
-        
-        # Normalizar y renombrar
-        df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
-        df = df.rename(columns=column_mapping)
-        
-        # Procesar cada fila
-        for index, row in df.iterrows():
-            if pd.notna(row.get('player_name')) and row.get('player_name').strip():
-                record = {
-                    "id": f"gs_nut_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{index}",
-                    "player_name": str(row.get('player_name', '')).strip(),
-                    "division": str(row.get('division', '')).strip(),
-                    "plan_type": str(row.get('plan_type', 'Plan General')).strip(),
-                    "calories_target": self.safe_float(row.get('calories_target', 2500)),
-                    "protein_target": self.safe_float(row.get('protein_target', 150)),
-                    "carbs_target": self.safe_float(row.get('carbs_target', 300)),
-                    "fat_target": self.safe_float(row.get('fat_target', 80)),
-                    "current_weight": self.safe_float(row.get('current_weight', 0)),
-                    "height": self.safe_float(row.get('height', 0)),
-                    "goal": str(row.get('goal', 'Mantener peso')).strip(),
-                    "nutritionist": nutritionist_name,
-                    "notes": str(row.get('notes', '')).strip(),
-                    "created_date": datetime.now().date().isoformat(),
-                    "sync_source": "Google Sheets",
-                    "sync_date": datetime.now().isoformat(),
-                    "sheet_url": sheet_url
-                }
-                nutrition_records.append(record)
-        
-        return True, nutrition_records
-
-    def sync_strength_data(self, sheet_url, trainer_name, worksheet_name=None):
+        return self._sync(transformar_datos_nutricion, sheet_url, nutritionist_name, worksheet_name, incremental)
+
+    def sync_strength_data(self, sheet_url, trainer_name, worksheet_name=None, incremental=False):
         """Sincronizar datos de tests de fuerza desde Google Sheets"""
-        success, data = self.get_sheet_data(sheet_url, worksheet_name)
-        
-        if not success:
-            return False, data
-        
-        df = data
-        strength_records = []
-        
-        # Mapeo de columnas para tests de fuerza
-        column_mapping = {
-            'jugador': 'player_name',
-            'nombre': 'player_name',
-            'division': 'division',
-            'categoria': 'division',
-            'fecha': 'test_date',
-            'test_fecha': 'test_date',
-            'tipo_test': 'test_type',
-            'test_tipo': 'test_type',
-            'ejercicio': 'test_type',
-            'peso': 'weight',
-            'kg': 'weight',
-            'repeticiones': 'repetitions',
-            'reps': 'repetitions',
-            'series': 'series',
-            'peso_corporal': 'body_weight',
-            'altura': 'height',
-            'grasa_corporal': 'body_fat',
-            'masa_muscular': 'muscle_mass',
-            'preparador': 'tester',
-            'entrenador': 'tester',
-            'observaciones': 'notes',
-            'notas': 'notes'
-        }
-        
-        # Normalizar y renombrar
-        df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
-        df = df.rename(columns=column_mapping)
-        
-        # Procesar cada fila
-        for index, row in df.iterrows():
-            if pd.notna(row.get('player_name')) and row.get('player_name').strip():
-                # Calcular 1RM estimado
-                weight = self.safe_float(row.get('weight', 0))
-                reps = max(1, int(self.safe_float(row.get('repetitions', 1))))
-                one_rm = weight * (36 / (37 - reps)) if reps < 37 else weight
-                
-                record = {
-                    "id": f"gs_str_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{index}",
-                    "player_name": str(row.get('player_name', '')).strip(),
-                    "division": str(row.get('division', '')).strip(),
-                    "test_date": str(row.get('test_date', datetime.now().date())),
-                    "test_type": str(row.get('test_type', 'Bench Press')).strip(),
-                    "weight": weight,
-                    "repetitions": reps,
-                    "series": max(1, int(self.safe_float(row.get('series', 1)))),
-                    "one_rm_estimated": round(one_rm, 1),
-                    "body_weight": self.safe_float(row.get('body_weight', 0)) or None,
-                    "height": self.safe_float(row.get('height', 0)) or None,
-                    "body_fat": self.safe_float(row.get('body_fat', 0)) or None,
-                    "muscle_mass": self.safe_float(row.get('muscle_mass', 0)) or None,
-                    "tester": trainer_name,
-                    "notes": str(row.get('notes', '')).strip(),
-                    "sync_source": "Google Sheets",
-                    "sync_date": datetime.now().isoformat(),
-                    "sheet_url": sheet_url,
-                    "created_at": datetime.now().isoformat()
-                }
-                strength_records.append(record)
-        
-        return True, strength_records
-
-    def sync_field_data(self, sheet_url, trainer_name, worksheet_name=None):
+        return self._sync(transformar_datos_fuerza, sheet_url, trainer_name, worksheet_name, incremental)
+
+    def sync_field_data(self, sheet_url, trainer_name, worksheet_name=None, incremental=False):
         """Sincronizar datos de tests de campo desde Google Sheets"""
-        success, data = self.get_sheet_data(sheet_url, worksheet_name)
-        
-        if not success:
-            return False, data
-        
-        df = data
-        field_records = []
-        
-        # Mapeo de columnas para tests de campo
-        column_mapping = {
-            'jugador': 'player_name',
-            'nombre': 'player_name',
-            'division': 'division',
-            'categoria': 'division',
-            'fecha': 'test_date',
-            'test_fecha': 'test_date',
-            'tipo_test': 'test_type',
-            'test_tipo': 'test_type',
-            'prueba': 'test_type',
-            'resultado': 'result',
-            'tiempo': 'result',
-            'distancia': 'result',
-            'marca': 'result',
-            'unidad': 'unit',
-            'clima': 'weather',
-            'temperatura': 'temperature',
-            'superficie': 'surface',
-            'humedad': 'humidity',
-            'preparador': 'tester',
-            'entrenador': 'tester',
-            'observaciones': 'notes',
-            'notas': 'notes'
-        }
-        
-        # Normalizar y renombrar
-        df.columns = df.columns.str.lower().str.strip().str.replace(' ', '_')
-        df = df.rename(columns=column_mapping)
-        
-        # Procesar cada fila
-        for index, row in df.iterrows():
-            if pd.notna(row.get('player_name')) and row.get('player_name').strip():
-                # Determinar unidad según tipo de test
-                test_type = str(row.get('test_type', '')).strip()
-                unit = str(row.get('unit', ''))
-                
-                if not unit:
-                    if "sprint" in test_type.lower() or "velocidad" in test_type.lower():
-                        unit = "segundos"
-                    elif "salto" in test_type.lower():
-                        unit = "cm"
-                    elif "yo-yo" in test_type.lower() or "cooper" in test_type.lower():
-                        unit = "metros"
-                    else:
-                        unit = "unidades"
-                
-                record = {
-                    "id": f"gs_field_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{index}",
-                    "player_name": str(row.get('player_name', '')).strip(),
-                    "division": str(row.get('division', '')).strip(),
-                    "test_date": str(row.get('test_date', datetime.now().date())),
-                    "test_type": test_type,
-                    "result": self.safe_float(row.get('result', 0)),
-                    "unit": unit,
-                    "weather": str(row.get('weather', 'No especificado')).strip(),
-                    "temperature": self.safe_float(row.get('temperature', 0)) or None,
-                    "surface": str(row.get('surface', 'No especificado')).strip(),
-                    "humidity": self.safe_float(row.get('humidity', 0)) or None,
-                    "tester": trainer_name,
-                    "notes": str(row.get('notes', '')).strip(),
-                    "sync_source": "Google Sheets",
-                    "sync_date": datetime.now().isoformat(),
-                    "sheet_url": sheet_url,
-                    "created_at": datetime.now().isoformat()
-                }
-                field_records.append(record)
-        
-        return True, field_records
+        return self._sync(transformar_datos_campo, sheet_url, trainer_name, worksheet_name, incremental)
 
     def safe_float(self, value, default=0):
         """Convertir valor a float de forma segura"""
@@ -403,4 +630,33 @@ def load_sync_config():
             "nutrition_sheets": [],
             "strength_sheets": [],
             "field_sheets": []
-        }
\ No newline at end of file
+        }
+
+_lock_config = threading.Lock()
+
+def actualizar_sync_config(modificar):
+    """Leer, modificar y guardar la configuración sin pisar cambios de otros hilos"""
+    with _lock_config:
+        config = load_sync_config()
+        modificar(config)
+        save_sync_config(config)
+        return config
+
+def clave_fuente(sheet_url, worksheet_name=None):
+    """Clave de una fuente de sincronización: (URL, hoja)"""
+    return f"{sheet_url}|{worksheet_name or ''}"
+
+def obtener_marca(config, sheet_url, worksheet_name=None):
+    """Marca de agua guardada para la fuente (None si nunca se sincronizó)"""
+    return config.get('watermarks', {}).get(clave_fuente(sheet_url, worksheet_name))
+
+def registrar_fuente(config, tipo, entrada):
+    """Agrega la fuente a config[tipo] o actualiza la existente con la misma URL y hoja"""
+    fuentes = config.setdefault(tipo, [])
+    clave = clave_fuente(entrada['url'], entrada.get('worksheet'))
+    for i, fuente in enumerate(fuentes):
+        if clave_fuente(fuente['url'], fuente.get('worksheet')) == clave:
+            fuentes[i] = {**fuente, **entrada}
+            return config
+    fuentes.append(entrada)
+    return config
\ No newline at end of file
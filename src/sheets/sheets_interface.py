@@ -4,11 +4,11 @@ Integración completa con Streamlit para CAR Rugby Club
 """
 
 import streamlit as st
-from google_sheets_sync import GoogleSheetsCAR, save_sync_config, load_sync_config
-from utils import save_medical_data, save_nutrition_data, load_json_data
+from google_sheets_sync import GoogleSheetsCAR, save_sync_config, load_sync_config, registrar_fuente
+from almacen_registros import obtener_almacen
+from sincronizador import fuentes_configuradas, sincronizar_todas
 import pandas as pd
 from datetime import datetime
-import json
 
 def google_sheets_page():
     """Página principal de Google Sheets"""
@@ -207,20 +207,26 @@ def nutrition_sync_interface(gs):
 def sync_medical_data(gs, sheet_url, doctor_name, worksheet):
     """Ejecutar sincronización de datos médicos"""
     with st.spinner("🔄 Sincronizando datos médicos..."):
-        success, records = gs.sync_medical_data(sheet_url, doctor_name, worksheet)
+        success, records = gs.sync_medical_data(sheet_url, doctor_name, worksheet, incremental=True)
         
         if success:
+            # Solo filas nuevas o editadas; cada fila conserva su ID y la huella detecta cambios
+            almacen = obtener_almacen('medical_records')
+            records = almacen.filtrar_nuevos(records)
+            almacen.agregar(records)
+            gs.confirmar_sincronizacion(sheet_url, worksheet)
+            
+            # Guardar configuración
+            config = load_sync_config()
+            registrar_fuente(config, 'medical_sheets', {
+                'url': sheet_url,
+                'doctor': doctor_name,
+                'worksheet': worksheet,
+                'last_sync': datetime.now().isoformat()
+            })
+            save_sync_config(config)
+            
             if records:
-                # Cargar datos existentes
-                existing_data = load_json_data('medical_records.json', {'injuries': []})
-                
-                # Agregar nuevos registros
-                existing_data['injuries'].extend(records)
-                
-                # Guardar usando la función de utils
-                with open('medical_records.json', 'w') as f:
-                    json.dump(existing_data, f, indent=2)
-                
                 st.success(f"✅ {len(records)} registros médicos sincronizados correctamente!")
                 
                 # Mostrar resumen
@@ -228,39 +234,35 @@ def sync_medical_data(gs, sheet_url, doctor_name, worksheet):
                     df_summary = pd.DataFrame(records)
                     st.dataframe(df_summary[['player_name', 'injury_type', 'severity', 'doctor']])
                 
-                # Guardar configuración
-                config = load_sync_config()
-                config['medical_sheets'].append({
-                    'url': sheet_url,
-                    'doctor': doctor_name,
-                    'worksheet': worksheet,
-                    'last_sync': datetime.now().isoformat()
-                })
-                save_sync_config(config)
-                
                 st.balloons()
             else:
-                st.warning("⚠️ No se encontraron datos para sincronizar")
+                st.info("ℹ️ No hay filas nuevas desde la última sincronización")
         else:
             st.error(f"❌ Error en sincronización: {records}")
 
 def sync_nutrition_data(gs, sheet_url, nutritionist, worksheet):
     """Ejecutar sincronización de datos nutricionales"""
     with st.spinner("🔄 Sincronizando datos nutricionales..."):
-        success, records = gs.sync_nutrition_data(sheet_url, nutritionist, worksheet)
+        success, records = gs.sync_nutrition_data(sheet_url, nutritionist, worksheet, incremental=True)
         
         if success:
+            # Solo filas nuevas o editadas; cada fila conserva su ID y la huella detecta cambios
+            almacen = obtener_almacen('nutrition_records')
+            records = almacen.filtrar_nuevos(records)
+            almacen.agregar(records)
+            gs.confirmar_sincronizacion(sheet_url, worksheet)
+            
+            # Guardar configuración
+            config = load_sync_config()
+            registrar_fuente(config, 'nutrition_sheets', {
+                'url': sheet_url,
+                'nutritionist': nutritionist,
+                'worksheet': worksheet,
+                'last_sync': datetime.now().isoformat()
+            })
+            save_sync_config(config)
+            
             if records:
-                # Cargar datos existentes
-                existing_data = load_json_data('nutrition_records.json', {'meal_plans': []})
-                
-                # Agregar nuevos registros
-                existing_data['meal_plans'].extend(records)
-                
-                # Guardar usando la función de utils
-                with open('nutrition_records.json', 'w') as f:
-                    json.dump(existing_data, f, indent=2)
-                
                 st.success(f"✅ {len(records)} registros nutricionales sincronizados correctamente!")
                 
                 # Mostrar resumen
@@ -268,19 +270,9 @@ def sync_nutrition_data(gs, sheet_url, nutritionist, worksheet):
                     df_summary = pd.DataFrame(records)
                     st.dataframe(df_summary[['player_name', 'plan_type', 'calories_target', 'nutritionist']])
                 
-                # Guardar configuración
-                config = load_sync_config()
-                config['nutrition_sheets'].append({
-                    'url': sheet_url,
-                    'nutritionist': nutritionist,
-                    'worksheet': worksheet,
-                    'last_sync': datetime.now().isoformat()
-                })
-                save_sync_config(config)
-                
                 st.balloons()
             else:
-                st.warning("⚠️ No se encontraron datos para sincronizar")
+                st.info("ℹ️ No hay filas nuevas desde la última sincronización")
         else:
             st.error(f"❌ Error en sincronización: {records}")
 
@@ -389,20 +381,26 @@ def field_sync_interface(gs):
 def sync_strength_data(gs, sheet_url, trainer, worksheet):
     """Ejecutar sincronización de datos de tests de fuerza"""
     with st.spinner("🔄 Sincronizando tests de fuerza..."):
-        success, records = gs.sync_strength_data(sheet_url, trainer, worksheet)
+        success, records = gs.sync_strength_data(sheet_url, trainer, worksheet, incremental=True)
         
         if success:
+            # Solo filas nuevas o editadas; cada fila conserva su ID y la huella detecta cambios
+            almacen = obtener_almacen('strength_tests')
+            records = almacen.filtrar_nuevos(records)
+            almacen.agregar(records)
+            gs.confirmar_sincronizacion(sheet_url, worksheet)
+            
+            # Guardar configuración
+            config = load_sync_config()
+            registrar_fuente(config, 'strength_sheets', {
+                'url': sheet_url,
+                'trainer': trainer,
+                'worksheet': worksheet,
+                'last_sync': datetime.now().isoformat()
+            })
+            save_sync_config(config)
+            
             if records:
-                # Cargar datos existentes
-                existing_data = load_json_data('strength_tests.json', {'tests': []})
-                
-                # Agregar nuevos registros
-                existing_data['tests'].extend(records)
-                
-                # Guardar
-                with open('strength_tests.json', 'w') as f:
-                    json.dump(existing_data, f, indent=2)
-                
                 st.success(f"✅ {len(records)} tests de fuerza sincronizados correctamente!")
                 
                 # Mostrar resumen
@@ -410,39 +408,35 @@ def sync_strength_data(gs, sheet_url, trainer, worksheet):
                     df_summary = pd.DataFrame(records)
                     st.dataframe(df_summary[['player_name', 'test_type', 'weight', 'one_rm_estimated']])
                 
-                # Guardar configuración
-                config = load_sync_config()
-                config['strength_sheets'].append({
-                    'url': sheet_url,
-                    'trainer': trainer,
-                    'worksheet': worksheet,
-                    'last_sync': datetime.now().isoformat()
-                })
-                save_sync_config(config)
-                
                 st.balloons()
             else:
-                st.warning("⚠️ No se encontraron datos para sincronizar")
+                st.info("ℹ️ No hay filas nuevas desde la última sincronización")
         else:
             st.error(f"❌ Error en sincronización: {records}")
 
 def sync_field_data(gs, sheet_url, trainer, worksheet):
     """Ejecutar sincronización de datos de tests de campo"""
     with st.spinner("🔄 Sincronizando tests de campo..."):
-        success, records = gs.sync_field_data(sheet_url, trainer, worksheet)
+        success, records = gs.sync_field_data(sheet_url, trainer, worksheet, incremental=True)
         
         if success:
+            # Solo filas nuevas o editadas; cada fila conserva su ID y la huella detecta cambios
+            almacen = obtener_almacen('field_tests')
+            records = almacen.filtrar_nuevos(records)
+            almacen.agregar(records)
+            gs.confirmar_sincronizacion(sheet_url, worksheet)
+            
+            # Guardar configuración
+            config = load_sync_config()
+            registrar_fuente(config, 'field_sheets', {
+                'url': sheet_url,
+                'trainer': trainer,
+                'worksheet': worksheet,
+                'last_sync': datetime.now().isoformat()
+            })
+            save_sync_config(config)
+            
             if records:
-                # Cargar datos existentes
-                existing_data = load_json_data('field_tests.json', {'tests': []})
-                
-                # Agregar nuevos registros
-                existing_data['tests'].extend(records)
-                
-                # Guardar
-                with open('field_tests.json', 'w') as f:
-                    json.dump(existing_data, f, indent=2)
-                
                 st.success(f"✅ {len(records)} tests de campo sincronizados correctamente!")
                 
                 # Mostrar resumen
@@ -450,19 +444,9 @@ def sync_field_data(gs, sheet_url, trainer, worksheet):
                     df_summary = pd.DataFrame(records)
                     st.dataframe(df_summary[['player_name', 'test_type', 'result', 'unit']])
                 
-                # Guardar configuración
-                config = load_sync_config()
-                config['field_sheets'].append({
-                    'url': sheet_url,
-                    'trainer': trainer,
-                    'worksheet': worksheet,
-                    'last_sync': datetime.now().isoformat()
-                })
-                save_sync_config(config)
-                
                 st.balloons()
             else:
-                st.warning("⚠️ No se encontraron datos para sincronizar")
+                st.info("ℹ️ No hay filas nuevas desde la última sincronización")
         else:
             st.error(f"❌ Error en sincronización: {records}")
 
@@ -566,10 +550,43 @@ def connection_status(gs):
                     if st.button(f"🔄 Sync", key=f"resync_field_{i}"):
                         sync_field_data(gs, sheet['url'], sheet['trainer'], sheet.get('worksheet'))
 
+def sync_all_sources(gs, fuentes):
+    """Sincronizar en paralelo todas las fuentes configuradas, con avance por fuente"""
+    barra = st.progress(0.0, text="🔄 Sincronizando fuentes...")
+    tabla = st.empty()
+    estados = {f['etiqueta']: {'Fuente': f['etiqueta'], 'Estado': 'pendiente', 'Filas': 0, 'Nuevos': 0, 'Filas/s': 0.0}
+               for f in fuentes}
+    
+    def al_progresar(evento):
+        estados[evento['etiqueta']].update({
+            'Estado': evento['estado'] if evento['estado'] != 'error' else f"error: {evento['error'][:60]}",
+            'Filas': evento.get('filas', estados[evento['etiqueta']]['Filas']),
+            'Nuevos': evento.get('nuevos', 0),
+            'Filas/s': round(evento.get('filas_por_segundo', 0.0), 1),
+        })
+        terminadas = sum(e['Estado'] == 'ok' or e['Estado'].startswith('error') for e in estados.values())
+        barra.progress(terminadas / len(fuentes), text=f"🔄 {terminadas}/{len(fuentes)} fuentes sincronizadas")
+        tabla.dataframe(pd.DataFrame(list(estados.values())), use_container_width=True, hide_index=True)
+    
+    _, resumen = sincronizar_todas(gs, al_progresar=al_progresar)
+    
+    mensaje = (f"{resumen['nuevos']} registros nuevos de {resumen['filas']} filas leídas en "
+               f"{resumen['segundos']:.1f}s ({resumen['filas_por_segundo']:.0f} filas/s)")
+    if resumen['errores']:
+        st.warning(f"⚠️ {resumen['ok']}/{resumen['fuentes']} fuentes sincronizadas - {mensaje}")
+    else:
+        st.success(f"✅ {resumen['fuentes']} fuentes sincronizadas - {mensaje}")
+
 def sync_configuration(gs):
     """Configuración de sincronización"""
     st.subheader("⚙️ Configuración de Sincronización")
     
+    # Sincronización de todas las fuentes en paralelo
+    fuentes = fuentes_configuradas(load_sync_config())
+    st.write(f"**🚀 Sincronizar todas las fuentes** ({len(fuentes)} configuradas)")
+    if fuentes and st.button("🚀 Sincronizar todas", key="sync_all"):
+        sync_all_sources(gs, fuentes)
+    
     # Sincronización automática
     auto_sync = st.checkbox("🔄 Sincronización automática", value=False)
     
@@ -579,7 +596,10 @@ def sync_configuration(gs):
             ["Cada hora", "Cada 6 horas", "Diario", "Semanal"]
         )
         
-        st.info(f"⏰ Sincronización configurada: {sync_interval}")
+        cron = {"Cada hora": "0 * * * *", "Cada 6 horas": "0 */6 * * *",
+                "Diario": "0 6 * * *", "Semanal": "0 6 * * 1"}[sync_interval]
+        st.info(f"⏰ Sincronización configurada: {sync_interval}. Programar en el servidor (cron):")
+        st.code(f"{cron} cd /ruta/al/proyecto && python sincronizar_hojas.py", language="bash")
     
     # Configuración de mapeo de columnas
     with st.expander("🗂️ Mapeo de Columnas Personalizado"):
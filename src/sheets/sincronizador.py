@@ -0,0 +1,140 @@
+"""
+Sincronizador de Fuentes de Google Sheets
+Sincroniza en paralelo todas las hojas configuradas (médicas, nutricionales,
+de fuerza y de campo) con lectura incremental, respetando la cuota compartida
+de la API. Informa el avance y el rendimiento de cada fuente; se usa desde la
+interfaz de Streamlit o por línea de comandos (sincronizar_hojas.py).
+"""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from google_sheets_sync import actualizar_sync_config, load_sync_config, registrar_fuente
+from almacen_registros import obtener_almacen
+
+# Tipo de fuente en sync_config.json -> (almacén, método de GoogleSheetsCAR, campo del responsable, nombre)
+TIPOS_FUENTE = {
+    'medical_sheets': ('medical_records', 'sync_medical_data', 'doctor', 'Médica'),
+    'nutrition_sheets': ('nutrition_records', 'sync_nutrition_data', 'nutritionist', 'Nutrición'),
+    'strength_sheets': ('strength_tests', 'sync_strength_data', 'trainer', 'Fuerza'),
+    'field_sheets': ('field_tests', 'sync_field_data', 'trainer', 'Campo'),
+}
+
+HILOS = 4
+REINTENTOS_CUOTA = 3
+ESPERA_CUOTA = 20  # segundos antes de reintentar tras un 429
+
+
+def fuentes_configuradas(config):
+    """Todas las fuentes de la configuración, con su tipo y una etiqueta legible"""
+    fuentes = []
+    for tipo, (_, _, campo_responsable, nombre) in TIPOS_FUENTE.items():
+        for entrada in config.get(tipo, []):
+            responsable = entrada.get(campo_responsable, '')
+            hoja = entrada.get('worksheet') or 'Hoja 1'
+            fuentes.append({
+                'tipo': tipo,
+                'url': entrada['url'],
+                'worksheet': entrada.get('worksheet'),
+                'responsable': responsable,
+                'etiqueta': f"{nombre} - {responsable} ({hoja})",
+            })
+    return fuentes
+
+
+def _es_error_de_cuota(mensaje):
+    return "RATE_LIMIT_EXCEEDED" in mensaje or "429" in mensaje or "Quota exceeded" in mensaje
+
+
+def sincronizar_fuente(gs, fuente, eventos=None):
+    """
+    Lectura incremental, deduplicación y guardado de una fuente.
+    Publica eventos de avance en `eventos` (cola) y devuelve el resultado final.
+    """
+    almacen_nombre, metodo, campo_responsable, _ = TIPOS_FUENTE[fuente['tipo']]
+    inicio = time.perf_counter()
+
+    def publicar(estado, **datos):
+        evento = {
+            'etiqueta': fuente['etiqueta'],
+            'tipo': fuente['tipo'],
+            'estado': estado,
+            'segundos': time.perf_counter() - inicio,
+            **datos,
+        }
+        if eventos is not None:
+            eventos.put(evento)
+        return evento
+
+    try:
+        publicar('leyendo')
+        for intento in range(REINTENTOS_CUOTA + 1):
+            success, records = getattr(gs, metodo)(
+                fuente['url'], fuente['responsable'], fuente['worksheet'], incremental=True
+            )
+            if success or not _es_error_de_cuota(str(records)) or intento == REINTENTOS_CUOTA:
+                break
+            publicar('esperando cuota', intento=intento + 1)
+            time.sleep(ESPERA_CUOTA * (intento + 1))
+
+        if not success:
+            return publicar('error', error=str(records), filas=0, nuevos=0, filas_por_segundo=0.0)
+
+        publicar('guardando', filas=len(records))
+        almacen = obtener_almacen(almacen_nombre)
+        nuevos = almacen.filtrar_nuevos(records)
+        almacen.agregar(nuevos)
+        gs.confirmar_sincronizacion(fuente['url'], fuente['worksheet'])
+        actualizar_sync_config(lambda config: registrar_fuente(config, fuente['tipo'], {
+            'url': fuente['url'],
+            campo_responsable: fuente['responsable'],
+            'worksheet': fuente['worksheet'],
+            'last_sync': datetime.now().isoformat(),
+        }))
+
+        segundos = time.perf_counter() - inicio
+        return publicar(
+            'ok', filas=len(records), nuevos=len(nuevos),
+            filas_por_segundo=len(records) / segundos if segundos > 0 else 0.0
+        )
+    except Exception as e:
+        return publicar('error', error=str(e), filas=0, nuevos=0, filas_por_segundo=0.0)
+
+
+def sincronizar_todas(gs, config=None, hilos=HILOS, al_progresar=None):
+    """
+    Sincroniza todas las fuentes configuradas en paralelo (la cuota la controla
+    el limitador de `gs`). `al_progresar(evento)` se llama en el hilo que invoca
+    esta función, así que puede actualizar la interfaz de Streamlit.
+    Devuelve (resultados por fuente, resumen).
+    """
+    fuentes = fuentes_configuradas(config if config is not None else load_sync_config())
+    inicio = time.perf_counter()
+    resultados = []
+
+    if fuentes:
+        eventos = queue.Queue()
+        with ThreadPoolExecutor(max_workers=max(1, min(hilos, len(fuentes)))) as ejecutor:
+            for fuente in fuentes:
+                ejecutor.submit(sincronizar_fuente, gs, fuente, eventos)
+            while len(resultados) < len(fuentes):
+                evento = eventos.get()
+                if evento['estado'] in ('ok', 'error'):
+                    resultados.append(evento)
+                if al_progresar:
+                    al_progresar(evento)
+
+    segundos = time.perf_counter() - inicio
+    filas = sum(r['filas'] for r in resultados)
+    resumen = {
+        'fuentes': len(fuentes),
+        'ok': sum(r['estado'] == 'ok' for r in resultados),
+        'errores': sum(r['estado'] == 'error' for r in resultados),
+        'filas': filas,
+        'nuevos': sum(r['nuevos'] for r in resultados),
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos > 0 else 0.0,
+    }
+    return resultados, resumen